@@ -17,6 +17,9 @@ public class ExportMeshScript : MonoBehaviour
     [SerializeField] private TextMeshProUGUI sliderYText;
     [SerializeField] private TextMeshProUGUI sliderZText;
 
+    // When toggled the server computes the bounding box from the camera poses and the sliders are ignored
+    [SerializeField] private PressableButton autoBoundsToggle;
+
     private bool isExporting = false;
     private const int MaxRetries = 5;
     private const float RetryDelay = 5f;
@@ -60,8 +63,9 @@ public class ExportMeshScript : MonoBehaviour
         float yValue = sliderY.Value;
         float zValue = sliderZ.Value;
 
-        // Create JSON for the x, y, z parameters
-        string jsonData = $"{{\"x\":{xValue},\"y\":{yValue},\"z\":{zValue}}}";
+        // Create JSON for the x, y, z parameters (empty object: automatic scene bounds)
+        bool autoBounds = autoBoundsToggle != null && autoBoundsToggle.IsToggled.Active;
+        string jsonData = autoBounds ? "{}" : $"{{\"x\":{xValue},\"y\":{yValue},\"z\":{zValue}}}";
 
         statusText.text = "Starting mesh export...";
 
@@ -101,7 +105,9 @@ public class ExportMeshScript : MonoBehaviour
         }
         else if (www.responseCode == 200)
         {
-            statusText.text = "Mesh export in progress...";
+            // The server reports "Anteprima disponibile" once the point-cloud preview can be downloaded
+            bool previewReady = www.downloadHandler.text.Contains("Anteprima disponibile");
+            statusText.text = previewReady ? "Point cloud preview available, mesh export in progress..." : "Mesh export in progress...";
         }
         else if (www.responseCode == 400)
         {
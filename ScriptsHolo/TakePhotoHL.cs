@@ -6,6 +6,7 @@ using MixedReality.Toolkit.UX;
 using TMPro;
 using UnityEngine.Windows.WebCam;
 using System.Linq;
+using UnityEngine.Networking;
 
 public class ScreenshotHandlerHL : MonoBehaviour
 {
@@ -28,6 +29,15 @@ public class ScreenshotHandlerHL : MonoBehaviour
     public PhotoCapture photoCaptureObject = null;
     private bool isCapturingPhoto = false;
 
+    // Invio live dei frame al server durante l'acquisizione
+    private readonly Queue<KeyValuePair<int, string>> pendingFrames = new Queue<KeyValuePair<int, string>>();
+    private Coroutine frameUploadCoroutine = null;
+    public static int liveFramesAcknowledged = -1;  // -1 = acquisizione live non avviata sul server
+    private const float FrameRetryDelay = 2f;
+
+    // True se tutti i frame acquisiti sono già stati elaborati dal server: il training può partire senza upload
+    public static bool IsLiveCaptureSynced => liveFramesAcknowledged > 0 && liveFramesAcknowledged == screenshotCounter;
+
 
     private void Awake()
     {
@@ -206,7 +216,8 @@ public class ScreenshotHandlerHL : MonoBehaviour
             statusText.text = $"Screenshot {screenshotCounter} saved successfully";
             screenshotCounter++;
             screenshotButtonText.text = screenshotCounter.ToString();
-            SaveCoordinates();
+            string poseRow = SaveCoordinates();
+            EnqueueLiveFrame(screenshotCounter - 1, poseRow);
             PlaceMarker();
         }
         else if (!isScreenshotModeActive)
@@ -219,7 +230,7 @@ public class ScreenshotHandlerHL : MonoBehaviour
         }
     }
 
-    private void SaveCoordinates()
+    private string SaveCoordinates()
     {
         Vector3 position = Camera.main.transform.position;
         Quaternion rotation = Camera.main.transform.rotation;
@@ -235,6 +246,68 @@ public class ScreenshotHandlerHL : MonoBehaviour
         File.AppendAllText(path, matrixLine);
 
         statusText.text = $"Coordinates saved to: {path}";
+        return matrixLine;
+    }
+
+    private void EnqueueLiveFrame(int index, string poseRow)
+    {
+        pendingFrames.Enqueue(new KeyValuePair<int, string>(index, poseRow));
+        if (frameUploadCoroutine == null)
+            frameUploadCoroutine = StartCoroutine(UploadPendingFrames());
+    }
+
+    private IEnumerator UploadPendingFrames()
+    {
+        string serverUrl = StartStopTrainingScript.ServerUrl;
+        while (pendingFrames.Count > 0)
+        {
+            KeyValuePair<int, string> frame = pendingFrames.Peek();
+            if (frame.Key == 0)
+            {
+                // Nuova acquisizione: il server svuota i dati precedenti e riceve gli intrinseci
+                string intrinsicsPath = Path.Combine(Path.GetDirectoryName(screenshotFolder), "intrinsics.txt");
+                using (UnityWebRequest start = new UnityWebRequest($"{serverUrl}/capture", "POST"))
+                {
+                    start.uploadHandler = new UploadHandlerRaw(File.ReadAllBytes(intrinsicsPath));
+                    start.downloadHandler = new DownloadHandlerBuffer();
+                    start.SetRequestHeader("Content-Type", "text/plain");
+                    yield return start.SendWebRequest();
+                    if (start.responseCode == 0)
+                    {
+                        yield return new WaitForSeconds(FrameRetryDelay);
+                        continue;
+                    }
+                    liveFramesAcknowledged = start.responseCode == 201 ? 0 : -1;
+                }
+            }
+            if (liveFramesAcknowledged < 0)
+            {
+                // Il server non ha un'acquisizione live: i dati verranno inviati con lo ZIP
+                pendingFrames.Clear();
+                break;
+            }
+
+            WWWForm form = new WWWForm();
+            form.AddBinaryData("image", File.ReadAllBytes(Path.Combine(screenshotFolder, $"{frame.Key:D6}.jpg")),
+                $"{frame.Key:D6}.jpg", "image/jpeg");
+            form.AddField("pose", frame.Value);
+            using (UnityWebRequest www = UnityWebRequest.Post($"{serverUrl}/capture/frames", form))
+            {
+                yield return www.SendWebRequest();
+                if (www.responseCode == 0)
+                {
+                    // Rete non disponibile: il frame viene reinviato
+                    yield return new WaitForSeconds(FrameRetryDelay);
+                    continue;
+                }
+                pendingFrames.Dequeue();
+                if (www.responseCode == 200)
+                    liveFramesAcknowledged = Mathf.Max(liveFramesAcknowledged, frame.Key + 1);
+                else
+                    liveFramesAcknowledged = -1;
+            }
+        }
+        frameUploadCoroutine = null;
     }
 
     private void UpdateScreenshotCounter()
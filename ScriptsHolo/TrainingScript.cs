@@ -5,6 +5,7 @@ using System.IO;
 using TMPro;
 using MixedReality.Toolkit.UX;
 using System.IO.Compression;
+using System.Security.Cryptography;
 
 public class StartStopTrainingScript : MonoBehaviour
 {
@@ -13,8 +14,14 @@ public class StartStopTrainingScript : MonoBehaviour
     private TextMeshPro buttonText;
     [SerializeField] public static string ServerUrl = "http://172.24.137.101:5000";
     private bool isTraining = false;
+    private bool dataReady = false;
+    private bool preprocessing = false;
     private const int MaxRetries = 5;
     private const float RetryDelay = 5f;
+    private const int UploadChunkSize = 8 * 1024 * 1024;
+    private string uploadId;
+    private int uploadChunkSize;
+    private int[] missingChunks = new int[0];
 
     private void Start()
     {
@@ -66,12 +73,28 @@ public class StartStopTrainingScript : MonoBehaviour
 
      private IEnumerator TrainingProcess()
     {
+        if (ScreenshotHandlerHL.IsLiveCaptureSynced)
+        {
+            // I frame sono già stati elaborati dal server durante l'acquisizione
+            statusText.text = "Data already on server. Starting training...";
+            yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/start_training", "GET", OnStartTrainingComplete));
+            yield break;
+        }
         string zipPath = CreateZipFile();
         if (zipPath != null)  // Verifichiamo che la creazione dello zip sia avvenuta con successo
         {
             statusText.text = "Uploading data";
+            dataReady = false;
+            preprocessing = false;
             yield return StartCoroutine(UploadZipFile(zipPath));
-            yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/start_training", "GET", OnStartTrainingComplete));
+            // Il server elabora i dati in background: il training parte quando sono pronti
+            while (preprocessing && isTraining)
+            {
+                yield return new WaitForSeconds(2f);
+                yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/upload_status", "GET", OnUploadStatusReceived));
+            }
+            if (dataReady && isTraining)
+                yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/start_training", "GET", OnStartTrainingComplete));
         }
         else
         {
@@ -110,15 +133,83 @@ public class StartStopTrainingScript : MonoBehaviour
 
     private IEnumerator UploadZipFile(string zipPath)
     {
-        WWWForm form = new WWWForm();
-        form.AddBinaryData("file", File.ReadAllBytes(zipPath), "data.zip", "application/zip");
-        yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/upload_data", "POST", OnUploadComplete, null, form));
+        // Upload riprendibile: dopo un'interruzione vengono reinviati solo i blocchi mancanti
+        long size = new FileInfo(zipPath).Length;
+        uploadId = null;
+        string sessionJson = $"{{\"size\": {size}, \"chunk_size\": {UploadChunkSize}}}";
+        yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/uploads", "POST", OnUploadSessionCreated,
+            null, null, System.Text.Encoding.UTF8.GetBytes(sessionJson), "application/json"));
+        if (uploadId == null)
+        {
+            statusText.text = "Error: Failed to upload data.";
+            isTraining = false;
+            UpdateButtonText();
+            yield break;
+        }
+
+        using (FileStream file = File.OpenRead(zipPath))
+        using (SHA256 sha256 = SHA256.Create())
+        {
+            for (int attempt = 0; attempt <= MaxRetries && isTraining; attempt++)
+            {
+                yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/uploads/{uploadId}", "GET", OnUploadSessionStatus));
+                if (missingChunks.Length == 0 || attempt == MaxRetries)
+                    break;
+                foreach (int index in missingChunks)
+                {
+                    long offset = (long)index * uploadChunkSize;
+                    byte[] chunk = new byte[(int)System.Math.Min(uploadChunkSize, size - offset)];
+                    file.Seek(offset, SeekOrigin.Begin);
+                    int read = 0;
+                    while (read < chunk.Length)
+                        read += file.Read(chunk, read, chunk.Length - read);
+                    string checksum = System.BitConverter.ToString(sha256.ComputeHash(chunk)).Replace("-", "").ToLowerInvariant();
+                    statusText.text = $"Uploading data ({index + 1}/{(size + uploadChunkSize - 1) / uploadChunkSize})";
+                    yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/uploads/{uploadId}/chunks/{index}", "PUT",
+                        null, null, null, chunk, "application/octet-stream", checksum));
+                }
+            }
+        }
+
+        if (missingChunks.Length > 0)
+        {
+            statusText.text = "Error: Failed to upload data.";
+            isTraining = false;
+            UpdateButtonText();
+            yield break;
+        }
+        yield return StartCoroutine(SendRequestWithRetry($"{ServerUrl}/uploads/{uploadId}/commit", "POST", OnUploadComplete));
     }
 
-    private void OnUploadComplete(UnityWebRequest www)
+    private void OnUploadSessionCreated(UnityWebRequest www)
+    {
+        if (www.responseCode == 201)
+        {
+            UploadSessionData session = JsonUtility.FromJson<UploadSessionData>(www.downloadHandler.text);
+            uploadId = session.upload_id;
+            uploadChunkSize = session.chunk_size;
+            missingChunks = session.missing_chunks;
+        }
+    }
+
+    private void OnUploadSessionStatus(UnityWebRequest www)
     {
         if (www.responseCode == 200)
+            missingChunks = JsonUtility.FromJson<UploadSessionData>(www.downloadHandler.text).missing_chunks;
+    }
+
+    private void OnUploadComplete(UnityWebRequest www)
+    {
+        if (www.responseCode == 202)
+        {
+            preprocessing = true;
+            statusText.text = "Data uploaded. Preprocessing images...";
+        }
+        else if (www.responseCode == 200)
+        {
+            dataReady = true;
             statusText.text = "Data uploaded. Executing transform script...";
+        }
         else
         {
             statusText.text = "Error: Failed to upload data.";
@@ -127,6 +218,24 @@ public class StartStopTrainingScript : MonoBehaviour
         }
     }
 
+    private void OnUploadStatusReceived(UnityWebRequest www)
+    {
+        if (www.responseCode == 202)
+            return;
+        preprocessing = false;
+        if (www.responseCode == 200)
+        {
+            dataReady = true;
+            statusText.text = "Data ready. Starting training...";
+        }
+        else
+        {
+            statusText.text = "Error: Failed to process uploaded data.";
+            isTraining = false;
+            UpdateButtonText();
+        }
+    }
+
     private void OnStartTrainingComplete(UnityWebRequest www)
     {
         if (www.responseCode == 200)
@@ -173,7 +282,8 @@ public class StartStopTrainingScript : MonoBehaviour
         }
     }
 
-    private IEnumerator SendRequestWithRetry(string url, string method, System.Action<UnityWebRequest> callback = null, string downloadPath = null, WWWForm form = null)
+    private IEnumerator SendRequestWithRetry(string url, string method, System.Action<UnityWebRequest> callback = null, string downloadPath = null, WWWForm form = null,
+        byte[] body = null, string contentType = null, string checksum = null)
     {
         int retries = 0;
         bool success = false;
@@ -186,6 +296,13 @@ public class StartStopTrainingScript : MonoBehaviour
                     www.downloadHandler = new DownloadHandlerFile(downloadPath);
                 else if (form == null)
                     www.downloadHandler = new DownloadHandlerBuffer();
+                if (body != null)
+                {
+                    www.uploadHandler = new UploadHandlerRaw(body);
+                    www.SetRequestHeader("Content-Type", contentType);
+                }
+                if (checksum != null)
+                    www.SetRequestHeader("X-Chunk-SHA256", checksum);
 
                 yield return www.SendWebRequest();
 
@@ -209,6 +326,14 @@ public class StartStopTrainingScript : MonoBehaviour
         }
     }
 
+    [System.Serializable]
+    private class UploadSessionData
+    {
+        public string upload_id;
+        public int chunk_size;
+        public int[] missing_chunks;
+    }
+
     [System.Serializable]
     private class ProgressData
     {
@@ -0,0 +1,289 @@
+"""
+Benchmark della pipeline di preparazione dati e pacchettizzazione del server.
+
+Genera acquisizioni sintetiche nel formato HoloLens (JPEG, coordinates.txt con decimali a
+virgola, intrinsics.txt) e misura separatamente ogni fase del server, poi l'intero percorso
+/upload_data -> /start_training -> /start_export -> /get_mesh tramite il test client di Flask,
+con ns-train e ns-export sostituiti dagli stub di stub_nerfstudio.py. I risultati vengono scritti
+in JSON per confrontare esecuzioni diverse.
+
+Uso:
+    python benchmarks/bench_pipeline.py [--frames 60 200] [--size 3840x2160] [--repeat 3]
+                                        [--output bench_pipeline.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import PIL
+from PIL import Image
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+import serverHoloNerf as server  # noqa: E402  pylint: disable=wrong-import-position
+import stub_nerfstudio  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def hololens_number(value: float) -> str:
+    """Formatta un numero come il client HoloLens (separatore decimale virgola)."""
+    return f"{value:.7g}".replace(".", ",")
+
+
+def synthetic_capture(num_frames: int, size: tuple[int, int], seed: int = 0) -> dict[str, bytes]:
+    """
+    Genera un'acquisizione sintetica: frame JPEG lungo una traiettoria circolare, coordinates.txt
+    (timestamp in tick e matrice 4x4 per riga, separati da tab) e intrinsics.txt.
+
+    Returns:
+        dict[str, bytes]: Contenuto dei file per percorso relativo, come nello ZIP del client
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    files = {}
+    base = rng.random((height // 32, width // 32, 3))
+    lines = []
+    for index in range(num_frames):
+        # Texture morbida diversa per ogni frame (comprimibile come una foto reale)
+        noise = np.clip(base + rng.normal(0, 0.05, base.shape), 0, 1)
+        image = Image.fromarray((noise * 255).astype(np.uint8)).resize(size, Image.Resampling.BICUBIC)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        files[f"images/{index:06d}.jpg"] = buffer.getvalue()
+
+        angle = 2 * np.pi * index / num_frames
+        matrix = np.eye(4)
+        matrix[:3, :3] = [[np.cos(angle), 0, np.sin(angle)], [0, 1, 0], [-np.sin(angle), 0, np.cos(angle)]]
+        matrix[:3, 3] = [2 * np.sin(angle), 1.6, 2 * np.cos(angle)]
+        ticks = 638000000000000000 + index * 10_000_000
+        lines.append("\t".join([str(ticks)] + [hololens_number(value) for value in matrix.flatten()]))
+    files["images/coordinates.txt"] = ("\n".join(lines) + "\n").encode()
+
+    focal = (width / 2) / np.tan(np.radians(64.69) / 2)
+    intrinsics = [focal, 0, width / 2, 0, focal, height / 2, 0, 0, 1]
+    files["intrinsics.txt"] = ("\t".join(hololens_number(value) for value in intrinsics)
+                               + f"\t{width}\t{height}").encode()
+    return files
+
+
+def zip_capture(files: dict[str, bytes]) -> bytes:
+    """Crea lo ZIP dell'acquisizione come il client (deflate)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def write_files(files: dict[str, bytes], folder: str) -> None:
+    """Scrive i file dell'acquisizione in una cartella."""
+    for name, data in files.items():
+        path = os.path.join(folder, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+
+def reset_folder(folder: str) -> str:
+    """Svuota (o crea) una cartella."""
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    return folder
+
+
+def isolate_server(workdir: str, stub_prefix: str) -> None:
+    """Punta cartelle, cache, registro e ambiente nerfstudio del server alla cartella di lavoro."""
+    server.config.JOBS_FOLDER = os.path.join(workdir, "jobs")
+    server.config.UPLOAD_SPOOL_FOLDER = os.path.join(workdir, "uploads")
+    server.export_cache = server.ExportCache(os.path.join(workdir, "cache", "exports"),
+                                             server.config.EXPORT_CACHE_MAX_BYTES)
+    server.run_registry = server.RunRegistry(os.path.join(workdir, "runs.db"))
+    server.launcher = server.NerfstudioLauncher(stub_prefix)
+
+
+def resize_folder(folder_path: str) -> list[tuple[str, str]]:
+    """
+    Ridimensiona sul posto le immagini di una cartella di originali, come faceva il server prima
+    dell'ingestione in streaming: resta come riferimento per confrontare i due percorsi.
+
+    Returns:
+        list[tuple[str, str]]: Immagini che non è stato possibile elaborare, con il relativo errore
+    """
+    batch = server.ImageResizeBatch()
+    pyramid_folders = {f"_{factor}" for factor in server.config.DOWNSCALE_FACTORS}
+    for root, dirs, names in os.walk(folder_path):
+        # Le versioni ridotte vengono rigenerate insieme al frame a risoluzione piena
+        dirs[:] = [folder for folder in dirs if not any(folder.endswith(suffix) for suffix in pyramid_folders)]
+        for name in names:
+            if name.lower().endswith(server.config.SUPPORTED_IMAGE_FORMATS):
+                path = os.path.join(root, name)
+                batch.submit(path, path)
+    return batch.wait()
+
+
+def time_stage(timings: dict[str, float], name: str, func, *args):
+    """Esegue func registrando il tempo migliore della fase in timings."""
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    timings[name] = min(elapsed, timings.get(name, float("inf")))
+    return result
+
+
+def bench_stages(files: dict[str, bytes], archive: bytes, workdir: str, timings: dict[str, float]) -> None:
+    """Misura le singole fasi del server in processo."""
+    data_folder = reset_folder(os.path.join(workdir, "stages", "DATA"))
+
+    # Ingestione in streaming con cache dei frame vuota e poi calda
+    server.frame_cache = server.FrameCache(reset_folder(os.path.join(workdir, "stages", "cache")),
+                                           server.config.FRAME_CACHE_MAX_BYTES)
+    time_stage(timings, "ingest_zip_cold", server.ingest_zip_stream, io.BytesIO(archive), data_folder)
+    server.clear_data_folder(data_folder)
+    time_stage(timings, "ingest_zip_cached", server.ingest_zip_stream, io.BytesIO(archive), data_folder)
+
+    # Riferimento: ridimensionamento di una cartella di originali già estratti
+    raw_folder = reset_folder(os.path.join(workdir, "stages", "raw"))
+    write_files(files, raw_folder)
+    time_stage(timings, "resize_images", resize_folder, os.path.join(raw_folder, "images"))
+
+    rgb_dir = os.path.join(data_folder, "images", "*.jpg")
+    intrinsics_path = os.path.join(data_folder, "intrinsics.txt")
+    extrinsics_path = os.path.join(data_folder, "images", "coordinates.txt")
+    data = time_stage(timings, "load_and_process_data", server.load_and_process_data,
+                      rgb_dir, intrinsics_path, extrinsics_path)
+    time_stage(timings, "convert_poses", server.convert_poses, data[1])
+    time_stage(timings, "create_transforms_json", server.create_transforms_json,
+               rgb_dir, intrinsics_path, extrinsics_path, data_folder)
+
+    # Pacchettizzazione della mesh
+    export_folder = reset_folder(os.path.join(workdir, "stages", "exports", "mesh"))
+    stub_nerfstudio.write_synthetic_export(export_folder)
+    time_stage(timings, "build_mesh_lods", server.build_mesh_lods, export_folder)
+    zip_folder = reset_folder(os.path.join(workdir, "stages", "zip"))
+    time_stage(timings, "create_zip_file", server.create_zip_file, export_folder, zip_folder, "mesh.zip")
+    time_stage(timings, "write_glb", lambda: server.write_glb(
+        server.load_obj(os.path.join(export_folder, "mesh.obj")), os.path.join(zip_folder, "mesh.glb"),
+        os.path.join(export_folder, "material_0.png")))
+
+
+def wait_phase(client, job_id: str, phases: tuple[str, ...], timeout: float = 600) -> str:
+    """Attende che il job raggiunga una delle fasi indicate."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        phase = client.get(f"/jobs/{job_id}").get_json()["job"]["phase"]
+        if phase in phases:
+            return phase
+        time.sleep(0.01)
+    raise SystemExit(f"Timeout in attesa delle fasi {phases} del job {job_id}")
+
+
+def bench_end_to_end(archive: bytes, workdir: str, timings: dict[str, float]) -> None:
+    """Misura il percorso completo tramite le route Flask, con ns-train/ns-export stub."""
+    # Ogni esecuzione parte con la cache dei frame vuota, come al primo upload di un'acquisizione
+    server.frame_cache = server.FrameCache(reset_folder(os.path.join(workdir, "cache", "frames")),
+                                           server.config.FRAME_CACHE_MAX_BYTES)
+    client = server.app.test_client()
+    start = time.perf_counter()
+    job_id = client.post("/jobs").get_json()["job_id"]
+
+    def upload():
+        response = client.post(f"/upload_data?job_id={job_id}", data=archive,
+                               content_type="application/zip")
+        if response.status_code != 202:
+            raise SystemExit(f"/upload_data: {response.status_code} {response.get_data(as_text=True)}")
+        # Il preprocessing prosegue in background: l'upload termina quando i dati sono pronti
+        while (response := client.get(f"/upload_status?job_id={job_id}")).status_code == 202:
+            time.sleep(0.01)
+        if response.status_code != 200:
+            raise SystemExit(f"/upload_status: {response.status_code} {response.get_data(as_text=True)}")
+
+    def train():
+        client.get(f"/start_training?job_id={job_id}")
+        if wait_phase(client, job_id, ("trained", "error")) != "trained":
+            raise SystemExit(f"Training fallito: {client.get(f'/training_log?job_id={job_id}').get_json()}")
+
+    def export():
+        client.post(f"/start_export?job_id={job_id}", json={"x": 1.0, "y": 1.0, "z": 1.0})
+        if wait_phase(client, job_id, ("exported", "error")) != "exported":
+            raise SystemExit("Export fallito")
+
+    def download():
+        response = client.get(f"/get_mesh?job_id={job_id}")
+        if response.status_code != 200:
+            raise SystemExit(f"/get_mesh: {response.status_code}")
+        return len(response.get_data())
+
+    time_stage(timings, "e2e_upload", upload)
+    time_stage(timings, "e2e_training", train)
+    time_stage(timings, "e2e_export", export)
+    time_stage(timings, "e2e_get_mesh", download)
+    timings["e2e_total"] = min(time.perf_counter() - start, timings.get("e2e_total", float("inf")))
+
+
+def parse_size(value: str) -> tuple[int, int]:
+    """Converte una stringa LARGHEZZAxALTEZZA in tupla."""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[60, 200])
+    parser.add_argument("--size", type=parse_size, nargs="+", default=[(3840, 2160)])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--workdir", default=None, help="Cartella di lavoro (default: temporanea)")
+    args = parser.parse_args()
+    if min(args.frames) < 50:
+        parser.error("il training richiede almeno 50 frame per acquisizione")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pillow": PIL.__version__,
+            "resize_workers": server.config.RESIZE_WORKERS or os.cpu_count(),
+        },
+        "parameters": {"frames": args.frames, "sizes": [list(size) for size in args.size], "repeat": args.repeat},
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        stub_prefix = stub_nerfstudio.install_stubs(os.path.join(workdir, "stub-env"))
+        isolate_server(workdir, stub_prefix)
+        for size in args.size:
+            for num_frames in args.frames:
+                files = synthetic_capture(num_frames, size)
+                archive = zip_capture(files)
+                timings: dict[str, float] = {}
+                for _ in range(args.repeat):
+                    bench_stages(files, archive, workdir, timings)
+                    bench_end_to_end(archive, workdir, timings)
+                report["results"].append({
+                    "frames": num_frames,
+                    "size": list(size),
+                    "archive_bytes": len(archive),
+                    "seconds": timings,
+                })
+                print(f"{num_frames:>5d} frame {size[0]}x{size[1]}: " + ", ".join(
+                    f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+        server.get_resize_pool().shutdown()
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Risultati salvati in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
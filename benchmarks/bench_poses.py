@@ -0,0 +1,117 @@
+"""
+Benchmark della conversione delle pose e della scrittura del transforms.json.
+
+Confronta l'implementazione originale (conversione posa per posa e json.dump con indent=4)
+con il percorso vettoriale e in streaming, verificando che l'output sia numericamente identico.
+
+Uso:
+    python benchmarks/bench_poses.py [--frames 10000 50000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import serverHoloNerf as server  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def legacy_transform_pose(pose: np.ndarray) -> np.ndarray:
+    """Conversione originale di una singola posa (riferimento)."""
+    R = pose[:3, :3]
+    t = pose[:3, 3]
+    R_z_reflection = np.array([
+        [-1, 0, 0],
+        [0, -1, 0],
+        [0, 0, 1]
+    ])
+    pose_new = np.eye(4)
+    pose_new[:3, :3] = np.dot(R, R_z_reflection)
+    pose_new[:3, 3] = -t.copy()
+    return pose_new
+
+
+def legacy_write(image_paths, poses, timestamps, json_path):
+    """Percorso originale: loop Python, dizionario completo e json.dump con indent=4."""
+    converted = [legacy_transform_pose(pose) for pose in poses]
+    frames = [
+        {
+            "file_path": "images\\{}".format(path.split('\\')[-1]),
+            "transform_matrix": pose.tolist(),
+            "timestamp": timestamp
+        }
+        for path, pose, timestamp in zip(image_paths, converted, timestamps)
+    ]
+    transforms = {
+        "fl_x": 1011.5, "fl_y": 1011.5, "cx": 640.0, "cy": 360.0, "w": 1280, "h": 720,
+        "k1": 0.0, "k2": 0.0, "p1": 0.0, "p2": 0.0, "frames": frames
+    }
+    with open(json_path, "w", encoding="utf-8") as outfile:
+        json.dump(transforms, outfile, indent=4)
+
+
+def batched_write(image_paths, poses, timestamps, json_path):
+    """Percorso vettoriale con scrittura in streaming."""
+    converted = server.convert_poses(poses)
+    transforms = server.create_transforms_dict(
+        image_paths, converted, timestamps, 1011.5, 1011.5, 640.0, 360.0, 1280, 720
+    )
+    server.write_transforms_json(transforms, json_path)
+
+
+def synthetic_poses(num_frames: int, seed: int = 0):
+    """Genera pose rigide casuali, percorsi e timestamps nel formato HoloLens."""
+    rng = np.random.default_rng(seed)
+    q = rng.normal(size=(num_frames, 4))
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    w, x, y, z = q.T
+    poses = np.zeros((num_frames, 4, 4))
+    poses[:, 0] = np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w), rng.normal(size=num_frames)], 1)
+    poses[:, 1] = np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w), rng.normal(size=num_frames)], 1)
+    poses[:, 2] = np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y), rng.normal(size=num_frames)], 1)
+    poses[:, 3, 3] = 1.0
+    image_paths = [f"images\\{i + 1:06d}.jpg" for i in range(num_frames)]
+    timestamps = 6.38e17 + np.arange(num_frames, dtype=np.float64) * 1e7
+    return image_paths, poses, timestamps
+
+
+def best_of(func, repeat: int, *args) -> float:
+    """Restituisce il tempo migliore su repeat esecuzioni."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        batched_path = os.path.join(tmp, "batched.json")
+        for num_frames in args.frames:
+            data = synthetic_poses(num_frames)
+            legacy = best_of(legacy_write, args.repeat, *data, legacy_path)
+            batched = best_of(batched_write, args.repeat, *data, batched_path)
+
+            with open(legacy_path, encoding="utf-8") as f1, open(batched_path, encoding="utf-8") as f2:
+                # Confronto sulla serializzazione canonica: distingue anche 0.0 da -0.0
+                if json.dumps(json.load(f1)) != json.dumps(json.load(f2)):
+                    raise SystemExit(f"Output diverso tra le due implementazioni con {num_frames} frame")
+
+            print(f"{num_frames:>7d} frame: originale {legacy * 1000:8.1f} ms | "
+                  f"vettoriale {batched * 1000:8.1f} ms | speedup {legacy / batched:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
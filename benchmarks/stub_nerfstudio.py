@@ -0,0 +1,155 @@
+"""
+Sostituti minimi di ns-train e ns-export usati dai benchmark.
+
+Producono gli stessi file che il server si aspetta da nerfstudio (config.yml,
+dataparser_transforms.json, checkpoint e tabella di avanzamento per il training; mesh.obj,
+material_0.mtl e material_0.png per l'export Poisson; point_cloud.ply per quello della nuvola
+di punti) senza GPU, così da misurare solo il costo della pipeline del server.
+
+Uso (tramite gli eseguibili creati da install_stubs):
+    ns-train nerfacto --data DATA --output-dir outputs [--timestamp ID] [...]
+    ns-export poisson|pointcloud --load-config CONFIG --output-dir EXPORT [...]
+"""
+
+import argparse
+import json
+import os
+import stat
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+STEPS = int(os.environ.get("STUB_TRAIN_STEPS", "10"))
+STEP_SLEEP = float(os.environ.get("STUB_TRAIN_SLEEP", "0.01"))
+MESH_FACES = int(os.environ.get("STUB_MESH_FACES", "50000"))
+TEXTURE_SIZE = int(os.environ.get("STUB_TEXTURE_SIZE", "2048"))
+
+
+def write_synthetic_export(folder: str, faces: int = MESH_FACES, texture_size: int = TEXTURE_SIZE) -> None:
+    """Scrive una sfera texturizzata di circa faces triangoli nel formato di ns-export poisson."""
+    os.makedirs(folder, exist_ok=True)
+    side = max(2, int(np.sqrt(faces / 2)) + 1)
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, side), np.linspace(0, 2 * np.pi, side), indexing="ij")
+    positions = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], -1).reshape(-1, 3)
+    uvs = np.stack([phi / (2 * np.pi), theta / np.pi], -1).reshape(-1, 2)
+    index = np.arange(side * side).reshape(side, side)
+    a, b = index[:-1, :-1].ravel(), index[1:, :-1].ravel()
+    c, d = index[1:, 1:].ravel(), index[:-1, 1:].ravel()
+    triangles = np.concatenate([np.stack([a, b, c], 1), np.stack([a, c, d], 1)]) + 1
+    corners = np.repeat(triangles, 3, axis=1)  # v/vt/vn con lo stesso indice
+
+    with open(os.path.join(folder, "mesh.obj"), "w", encoding="utf-8") as file:
+        file.write("mtllib material_0.mtl\nusemtl material_0\n")
+        np.savetxt(file, positions, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, uvs, fmt="vt %.6f %.6f")
+        np.savetxt(file, positions, fmt="vn %.6f %.6f %.6f")
+        np.savetxt(file, corners, fmt="f %d/%d/%d %d/%d/%d %d/%d/%d")
+    with open(os.path.join(folder, "material_0.mtl"), "w", encoding="utf-8") as file:
+        file.write("newmtl material_0\nmap_Kd material_0.png\n")
+    rng = np.random.default_rng(0)
+    small = (rng.random((texture_size // 16, texture_size // 16, 3)) * 255).astype(np.uint8)
+    Image.fromarray(small).resize((texture_size, texture_size), Image.Resampling.BICUBIC).save(
+        os.path.join(folder, "material_0.png"))
+
+
+def write_synthetic_pointcloud(folder: str, points: int) -> None:
+    """Scrive point_cloud.ply (binario, con normali e colori) come ns-export pointcloud."""
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(0)
+    normals = rng.normal(size=(points, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    vertices = np.zeros(points, dtype=[("x", "<f8"), ("y", "<f8"), ("z", "<f8"), ("nx", "<f8"), ("ny", "<f8"),
+                                       ("nz", "<f8"), ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+    for index, name in enumerate("xyz"):
+        vertices[name] = normals[:, index]
+        vertices["n" + name] = normals[:, index]
+    for name in ("red", "green", "blue"):
+        vertices[name] = rng.integers(0, 256, points)
+    header = (f"ply\nformat binary_little_endian 1.0\nelement vertex {points}\n"
+              + "".join(f"property double {name}\n" for name in ("x", "y", "z", "nx", "ny", "nz"))
+              + "".join(f"property uchar {name}\n" for name in ("red", "green", "blue")) + "end_header\n")
+    with open(os.path.join(folder, "point_cloud.ply"), "wb") as file:
+        file.write(header.encode("ascii"))
+        file.write(vertices.tobytes())
+
+
+def ns_train(argv: list[str]) -> None:
+    """Crea la cartella del training con config.yml e checkpoint e stampa la tabella di avanzamento."""
+    parser = argparse.ArgumentParser(prog="ns-train")
+    parser.add_argument("method")
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--output-dir", default="outputs")
+    parser.add_argument("--timestamp", default=None)
+    args, _ = parser.parse_known_args(argv)
+    # Come nerfstudio, se --data è un file json l'esperimento prende il nome della sua cartella
+    data = os.path.dirname(args.data) if os.path.isfile(args.data) else args.data
+    run_dir = os.path.join(args.output_dir, os.path.basename(os.path.normpath(data)), args.method,
+                           args.timestamp or time.strftime("%Y-%m-%d_%H%M%S"))
+    os.makedirs(os.path.join(run_dir, "nerfstudio_models"), exist_ok=True)
+    with open(os.path.join(run_dir, "config.yml"), "w", encoding="utf-8") as file:
+        file.write(f"method_name: {args.method}\ndata: {args.data}\n")
+    with open(os.path.join(run_dir, "dataparser_transforms.json"), "w", encoding="utf-8") as file:
+        json.dump({"transform": np.eye(4)[:3].tolist(), "scale": 1.0}, file)
+    print("Step (% Done)       Train Iter (time)    ETA (time)           Train Rays / Sec", flush=True)
+    for step in range(STEPS):
+        print(f"{step * 100} ({100 * step / STEPS:.2f}%)      45.832 ms            "
+              f"{STEPS - step} s, 375.030 ms      92.89 K", flush=True)
+        time.sleep(STEP_SLEEP)
+    with open(os.path.join(run_dir, "nerfstudio_models", f"step-{STEPS * 100:09d}.ckpt"), "wb") as file:
+        file.write(os.urandom(1024))
+
+
+def ns_export(argv: list[str]) -> None:
+    """Scrive una mesh (poisson) o una nuvola di punti (pointcloud) sintetica nella cartella di export."""
+    parser = argparse.ArgumentParser(prog="ns-export")
+    parser.add_argument("kind")
+    parser.add_argument("--load-config", required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--num-points", type=int, default=1000000)
+    args, _ = parser.parse_known_args(argv)
+    if not os.path.exists(args.load_config):
+        raise SystemExit(f"FileNotFoundError: {args.load_config}")
+    if args.kind == "pointcloud":
+        write_synthetic_pointcloud(args.output_dir, args.num_points)
+    else:
+        write_synthetic_export(args.output_dir)
+    print("Export completato", flush=True)
+
+
+def install_stubs(prefix: str) -> str:
+    """
+    Crea in prefix un finto ambiente Conda con gli eseguibili ns-train e ns-export.
+
+    Returns:
+        str: Prefisso da usare come Config.CONDA_ENV
+    """
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    bin_dir = os.path.join(prefix, "Scripts" if sys.platform == "win32" else "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    for name in ("ns-train", "ns-export"):
+        if sys.platform == "win32":
+            with open(os.path.join(bin_dir, f"{name}.cmd"), "w", encoding="utf-8") as file:
+                file.write(f'@"{sys.executable}" "{os.path.abspath(__file__)}" {name} %*\n')
+        else:
+            path = os.path.join(bin_dir, name)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"#!{sys.executable}\nimport sys\nsys.path.insert(0, {module_dir!r})\n"
+                           f"import stub_nerfstudio\nstub_nerfstudio.main([{name!r}] + sys.argv[1:])\n")
+            os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return prefix
+
+
+def main(argv: list[str]) -> None:
+    command, args = argv[0], argv[1:]
+    if command == "ns-train":
+        ns_train(args)
+    elif command == "ns-export":
+        ns_export(args)
+    else:
+        raise SystemExit(f"Comando sconosciuto: {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,23 +8,35 @@ Versione: 1.0
 
 from functools import wraps
 import os
+import hashlib
+import shutil
+import signal
+import struct
 import subprocess
 import sys
 import io
+import itertools
+import json
+import math
 import queue
+import sqlite3
+import re
 import glob
 import logging
 import zipfile
+import zlib
 import threading
 import multiprocessing
-from typing import Optional
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Callable, Iterator, Optional
+from dataclasses import asdict, dataclass
 import time
+import uuid
 
 import numpy as np
 from PIL import Image
-from flask import Flask, json, jsonify, request, send_file
-from werkzeug.utils import secure_filename
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 
 # Configurazione logging
 logging.basicConfig(
@@ -36,27 +48,84 @@ logger = logging.getLogger(__name__)
 @dataclass
 class Config:
     """Configurazione del server e dei parametri di elaborazione."""
-    CONDA_ENV: str = "nerfstudio"
-    NERFSTUDIO_TRAIN_COMMAND: str = "ns-train nerfacto --data DATA"
+    CONDA_ENV: str = "nerfstudio"  # nome dell'ambiente oppure percorso del prefisso
+    NERFSTUDIO_TRAIN_COMMAND: str = "ns-train nerfacto --data {data_folder} --output-dir {output_folder}"
     EXPORT_FOLDER: str = "exports/mesh"
     DATA_FOLDER: str = "DATA"
+    OUTPUT_FOLDER: str = "outputs"
+    JOBS_FOLDER: str = "jobs"
+    UPLOAD_SPOOL_FOLDER: str = "uploads"  # archivi ricevuti in attesa di preprocessing
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 ** 2  # blocchi degli upload riprendibili (/uploads)
+    UPLOAD_MAX_CHUNK_SIZE: int = 64 * 1024 ** 2
+    UPLOAD_MAX_BYTES: int = 20 * 1024 ** 3
+    UPLOAD_SESSION_TTL: float = 24 * 3600  # secondi di inattività prima di scartare una sessione
+    UPLOAD_SWEEP_INTERVAL: float = 3600  # secondi tra due pulizie della cartella di spool
+    MAX_CONCURRENT_PREPROCESSING: int = 2
+    MAX_CONCURRENT_TRAININGS: int = 1
+    MAX_CONCURRENT_EXPORTS: int = 1
+    MESH_LOD_FACES: tuple[int, ...] = (15000, 5000)  # LOD successivi alla mesh esportata (LOD 0)
+    PROGRESSIVE_EXPORT: bool = True  # anteprima a nuvola di punti prima della mesh Poisson
+    EXPORT_PREVIEW_POINTS: int = 30000  # punti dell'anteprima (due triangoli per punto)
+    TRAINING_LOG_LINES: int = 500
+    PROGRESS_UPDATE_INTERVAL: float = 1.0  # secondi tra due aggiornamenti di stato
+    PROGRESS_LOG_INTERVAL: float = 30.0  # secondi tra due righe di log del progresso
     IMAGE_TARGET_SIZE: tuple[int, int] = (1280, 720)
     SUPPORTED_IMAGE_FORMATS: tuple[str, ...] = ('.jpg')
+    IMAGE_JPEG_QUALITY: int = 75
+    RESIZE_WORKERS: Optional[int] = None  # None = numero di core disponibili
+    FRAME_CACHE_FOLDER: str = "cache/frames"
+    FRAME_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+    EXPORT_CACHE_FOLDER: str = "cache/exports"
+    EXPORT_CACHE_MAX_BYTES: int = 5 * 1024 ** 3
+    RUN_REGISTRY_PATH: str = "runs.db"
+    RUN_RETENTION_DAYS: Optional[float] = 30  # None = nessun limite di età
+    RUN_RETENTION_MAX_BYTES: Optional[int] = 50 * 1024 ** 3  # None = nessun limite di spazio
+    DOWNSCALE_FACTORS: tuple[int, ...] = (2, 4)  # cartelle images_<fattore> generate all'upload
+    PREVIEW_EXPORT_OBB_SCALE: tuple[float, float, float] = (2.0, 2.0, 2.0)  # intera scena normalizzata
+    KEYFRAME_ANALYSIS_SIZE: tuple[int, int] = (320, 180)  # risoluzione per la stima della nitidezza
+    KEYFRAME_BLUR_RATIO: float = 0.4  # scarta i frame con nitidezza < rapporto * mediana
+    KEYFRAME_MIN_TRANSLATION: float = 0.05  # metri
+    KEYFRAME_MIN_ROTATION_DEG: float = 5.0
+    SCENE_BOUNDS_PERCENTILE: float = 2.0  # percentile scartato su ogni lato dell'OBB automatico
+    SCENE_BOUNDS_MARGIN: float = 1.2  # margine moltiplicativo sulle dimensioni dell'OBB automatico
+    SCENE_BOUNDS_FALLBACK_DEPTH: float = 2.0  # metri, profondità osservata se le viste non convergono
+    SCENE_BOUNDS_MIN_VIEWS: float = 0.5  # frazione di camere che deve inquadrare un punto della scena
+    SCENE_BOUNDS_GRID: int = 24  # punti per lato della griglia usata per intersecare i frustum
+    SCENE_FAR_PLANE: bool = True  # limita il campionamento dei raggi di nerfacto ai bordi della scena
+    WARM_START_ITERATIONS: int = 2000  # iterazioni di raffinamento del training incrementale
+    WARM_START_TRAIN_SPLIT: float = 0.9  # train_split_fraction di nerfstudio-data
+
+@dataclass(frozen=True)
+class TrainingPreset:
+    """Parametri di un preset di training selezionabile da /start_training."""
+    max_iterations: int
+    downscale_factor: int
+    time_budget: float  # secondi di training, allo scadere il training viene fermato
+    steps_per_save: int  # checkpoint frequenti per poter esportare quando scade il budget
+    auto_export: bool = False  # esporta subito una mesh di anteprima anche a training completato
+
+TRAINING_PRESETS = {
+    "preview": TrainingPreset(max_iterations=3000, downscale_factor=4, time_budget=4 * 60,
+                              steps_per_save=250, auto_export=True),
+    "standard": TrainingPreset(max_iterations=30000, downscale_factor=2, time_budget=30 * 60,
+                               steps_per_save=1000),
+    "quality": TrainingPreset(max_iterations=60000, downscale_factor=1, time_budget=90 * 60,
+                              steps_per_save=2000),
+}
 
 class ProcessState:
-    """Gestisce lo stato dei processi di training ed export."""
+    """Gestisce lo stato dei processi di training ed export di un job."""
     def __init__(self):
-        self.training_process: Optional[multiprocessing.Process] = None
+        self.training_process: Optional["ManagedProcess"] = None
         self.training_progress: float = 0
         self.is_training: bool = False
         self.is_completed: bool = False
         self.is_error: int = 0
-        self.export_process: Optional[multiprocessing.Process] = None
+        self.export_process: Optional["ManagedProcess"] = None
         self.is_exporting: bool = False
         self.export_completed: bool = False
 
 config = Config()
-state = ProcessState()
 app = Flask(__name__)
 
 def retry_operation(max_attempts=5, delay=5):
@@ -77,498 +146,3949 @@ def retry_operation(max_attempts=5, delay=5):
         return wrapper
     return decorator
 
-# Serve nel file coordinates.txt dato che le coordinate sono con la virgola come separatore decimale
-def replace_commas_with_dots(file_path: str) -> None:
-    """
-    Sostituisce le virgole con i punti nei file di testo per standardizzare i separatori decimali.
-    
-    Args:
-        file_path: Percorso del file da modificare
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read().replace(',', '.')
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(content)
-    except IOError as e:
-        logger.error("Errore nella modifica del file %s: %s", file_path, e)
-        raise
+# Metriche esposte su /metrics nel formato testuale di Prometheus. Gli aggiornamenti costano un
+# lock e una somma; gli indicatori di stato (code, job, processi) vengono letti solo allo scrape.
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """Metrica con etichette opzionali; ogni combinazione di valori delle etichette è una serie."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.series: dict[tuple[str, ...], object] = {}
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Testo della metrica nel formato di esposizione di Prometheus."""
+        header = f"# HELP {self.name} {self.help_text}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+class Counter(Metric):
+    """Contatore monotono."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *label_values: str) -> None:
+        with self.lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        with self.lock:
+            series = sorted(self.series.items())
+        for values, total in series:
+            yield f"{self.name}{_format_labels(self.labels, values)} {_format_value(total)}"
+
+class Gauge(Metric):
+    """Valore istantaneo calcolato da una funzione al momento dello scrape."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                 collect: Optional[Callable[[], dict[tuple[str, ...], float]]] = None):
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+
+    def _samples(self) -> Iterator[str]:
+        for values, value in sorted(self.collect().items()):
+            yield f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}"
+
+class Histogram(Metric):
+    """Istogramma cumulativo con bucket fissi, più somma e conteggio delle osservazioni."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = STAGE_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self.lock:
+            counts, total = self.series.get(label_values) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self.series[label_values] = (counts, total + value)
+
+    def _samples(self) -> Iterator[str]:
+        with self.lock:
+            series = sorted((values, (list(counts), total)) for values, (counts, total) in self.series.items())
+        for values, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}"
+
+class MetricsRegistry:
+    """Raccolta delle metriche del server."""
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Tutte le metriche nel formato di esposizione di Prometheus."""
+        return "".join(metric.render() for metric in self.metrics)
+
+metrics = MetricsRegistry()
+stage_duration = metrics.register(Histogram(
+    "holonerf_stage_duration_seconds", "Durata delle fasi di elaborazione", ("stage",)))
+stage_failures = metrics.register(Counter(
+    "holonerf_stage_failures_total", "Fasi di elaborazione terminate con errore", ("stage",)))
+http_requests = metrics.register(Counter(
+    "holonerf_http_requests_total", "Richieste HTTP servite", ("route", "method", "status")))
+http_duration = metrics.register(Histogram(
+    "holonerf_http_request_duration_seconds", "Tempo di risposta delle route", ("route",), HTTP_BUCKETS))
+upload_bytes = metrics.register(Counter(
+    "holonerf_upload_bytes_total", "Byte di archivi ZIP ricevuti"))
+extracted_bytes = metrics.register(Counter(
+    "holonerf_extracted_bytes_total", "Byte decompressi dagli archivi ricevuti"))
+frames_ingested = metrics.register(Counter(
+    "holonerf_frames_total", "Frame acquisiti per esito (resized, cached, failed)", ("result",)))
+mesh_bytes_served = metrics.register(Counter(
+    "holonerf_mesh_download_bytes_total", "Byte dei file mesh inviati da /get_mesh", ("format",)))
+
+def timed_stage(stage: str):
+    """Decorator che registra durata ed eventuali errori di una fase di elaborazione."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                stage_failures.inc(1, stage)
+                raise
+            finally:
+                stage_duration.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
+
+# I file scritti da HoloLens usano la virgola come separatore decimale (locale italiano)
+COORDINATES_COLUMNS = 17  # timestamp + matrice 4x4 riga per riga
+
+def _parse_floats(text: str) -> np.ndarray:
+    """Converte un blocco di testo in float64 accettando la virgola come separatore decimale."""
+    return np.array(text.replace(',', '.').split(), dtype=np.float64)
+
+def parse_intrinsics(file_path: str) -> np.ndarray:
+    """
+    Legge il file intrinsics.txt (matrice 3x3 seguita da larghezza e altezza) senza modificarlo.
+
+    Args:
+        file_path: Percorso del file intrinsics.txt
+
+    Returns:
+        np.ndarray: Array float64 di 11 valori
+
+    Raises:
+        ValueError: Se il file non contiene 11 valori numerici
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        values = _parse_floats(file.read())
+    if values.size != 11:
+        raise ValueError(f"{file_path}: attesi 11 valori, trovati {values.size}")
+    return values
+
+def parse_coordinates(file_path: str, block_lines: int = 4096) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Legge il file coordinates.txt prodotto da TakePhotoHL.cs in un'unica passata a blocchi di righe,
+    senza modificarlo. Ogni riga contiene il timestamp e i 16 valori della matrice di posa.
+
+    Args:
+        file_path: Percorso del file coordinates.txt
+        block_lines: Numero di righe convertite per blocco
+
+    Returns:
+        tuple: Timestamps (N,) e pose (N, 4, 4) in float64
+
+    Raises:
+        ValueError: Se una riga non contiene 17 valori numerici
+    """
+    # Preallocazione stimata dalla dimensione del file (una riga occupa almeno ~100 byte)
+    capacity = max(16, os.path.getsize(file_path) // 96 + 1)
+    rows = np.empty((capacity, COORDINATES_COLUMNS), dtype=np.float64)
+    count = 0
+    line_number = 0
+    with open(file_path, 'r', encoding='utf-8') as file:
+        while True:
+            lines = list(itertools.islice(file, block_lines))
+            if not lines:
+                break
+            first_line = line_number + 1
+            line_number += len(lines)
+            lines = [line for line in lines if line.strip()]
+            try:
+                values = _parse_floats("".join(lines))
+            except ValueError:
+                values = None
+            if values is None or values.size != len(lines) * COORDINATES_COLUMNS:
+                # Individua la riga errata per un messaggio di errore utile
+                for offset, line in enumerate(lines):
+                    try:
+                        valid = _parse_floats(line).size == COORDINATES_COLUMNS
+                    except ValueError:
+                        valid = False
+                    if not valid:
+                        raise ValueError(f"{file_path}: riga {first_line + offset} non valida")
+            if count + len(lines) > capacity:
+                capacity = max(2 * capacity, count + len(lines))
+                rows = np.resize(rows, (capacity, COORDINATES_COLUMNS))
+            rows[count:count + len(lines)] = values.reshape(-1, COORDINATES_COLUMNS)
+            count += len(lines)
+    rows = rows[:count]
+    return rows[:, 0], rows[:, 1:].reshape(-1, 4, 4)
+
+def frame_name(path: str) -> str:
+    """Restituisce il nome del file di un frame accettando sia '/' sia '\\' come separatore."""
+    return path.replace("\\", "/").rsplit("/", 1)[-1]
+
+def build_frame_index(image_paths: list[str]) -> dict[str, int]:
+    """
+    Associa a ogni immagine la riga corrispondente di coordinates.txt. Il nome del file è il
+    numero progressivo del frame, che parte da zero come le righe scritte da TakePhotoHL.cs
+    (es. 000000.jpg -> riga 0), indipendentemente dal separatore di percorso.
+
+    Args:
+        image_paths: Lista dei percorsi delle immagini
+
+    Returns:
+        dict[str, int]: Nome del file -> indice di riga
+
+    Raises:
+        ValueError: Se un nome di file non è numerico
+    """
+    index = {}
+    for path in image_paths:
+        name = frame_name(path)
+        stem = name.rsplit(".", 1)[0]
+        if not stem.isdigit():
+            raise ValueError(f"Nome immagine non valido: {name}")
+        index[name] = int(stem)
+    return index
+
+def pyramid_path(image_path: str, factor: int) -> str:
+    """
+    Percorso della versione ridotta di un frame secondo la convenzione di nerfstudio:
+    images/000001.jpg -> images_2/000001.jpg.
+    """
+    folder, name = os.path.split(image_path)
+    return os.path.join(f"{os.path.normpath(folder)}_{factor}", name)
+
+def _replace_file(path: str, write: Callable[[str], None]) -> None:
+    """
+    Scrive un file in un temporaneo e lo sostituisce con os.replace: se path è un hard link a una
+    voce della cache dei frame, il link viene spezzato invece di riscrivere il file in cache.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _write_pyramid(img: Image.Image, dest_path: str, target_size: tuple[int, int],
+                   quality: int, factors: tuple[int, ...]) -> None:
+    # Ogni livello viene ricavato dal precedente, partendo dall'immagine già decodificata
+    level = img
+    for factor in sorted(factors):
+        size = (target_size[0] // factor, target_size[1] // factor)
+        level = level.resize(size, Image.Resampling.LANCZOS)
+        path = pyramid_path(dest_path, factor)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _replace_file(path, lambda temp_path: level.save(temp_path, format="JPEG", quality=quality))
+
+def _resize_image(source, dest_path: str, target_size: tuple[int, int], quality: int,
+                  factors: tuple[int, ...] = ()) -> bool:
+    """
+    Ridimensiona una singola immagine JPEG. Eseguita nei processi del pool di ridimensionamento.
+
+    La dimensione viene letta dal solo header: se coincide con quella richiesta l'immagine non
+    viene ricodificata. Quando la sorgente è molto più grande del target si usa la decodifica
+    JPEG a risoluzione ridotta (draft), che evita di decodificare l'immagine a piena risoluzione.
+    Nella stessa decodifica vengono scritte le versioni ridotte images_<fattore> usate da nerfstudio.
+
+    Args:
+        source: Percorso del file o contenuto JPEG in memoria
+        dest_path: Percorso di destinazione
+        target_size: Risoluzione di destinazione (larghezza, altezza)
+        quality: Qualità di codifica JPEG
+        factors: Fattori di riduzione della piramide da generare
+
+    Returns:
+        bool: True se l'immagine è stata ricodificata, False se aveva già la dimensione corretta
+    """
+    data = source if isinstance(source, bytes) else None
+    with Image.open(io.BytesIO(data) if data is not None else source) as img:
+        resized = img.size != target_size
+        if resized:
+            img.draft("RGB", target_size)
+            img = img.resize(target_size, Image.Resampling.LANCZOS)
+            _replace_file(dest_path, lambda temp_path: img.save(temp_path, format="JPEG", quality=quality))
+        elif factors:
+            # Per la piramide basta decodificare a metà risoluzione
+            img.draft("RGB", (target_size[0] // 2, target_size[1] // 2))
+        if factors:
+            _write_pyramid(img, dest_path, target_size, quality, factors)
+    if not resized and data is not None:
+        def write_original(temp_path: str) -> None:
+            with open(temp_path, "wb") as out:
+                out.write(data)
+        _replace_file(dest_path, write_original)
+    return resized
+
+def _resize_image_job(source, dest_path: str, target_size: tuple[int, int], quality: int,
+                      factors: tuple[int, ...] = ()) -> Optional[str]:
+    """Wrapper per il pool: restituisce il messaggio di errore invece di propagare l'eccezione."""
+    try:
+        _resize_image(source, dest_path, target_size, quality, factors)
+        return None
+    except (IOError, ValueError) as e:
+        return str(e)
+
+_resize_pool: Optional[ProcessPoolExecutor] = None
+_resize_pool_lock = threading.Lock()
+
+def get_resize_pool() -> ProcessPoolExecutor:
+    """Restituisce il pool di processi per il ridimensionamento, creandolo al primo utilizzo."""
+    global _resize_pool
+    with _resize_pool_lock:
+        if _resize_pool is None:
+            _resize_pool = ProcessPoolExecutor(max_workers=config.RESIZE_WORKERS or os.cpu_count())
+        return _resize_pool
+
+class ImageResizeBatch:
+    """
+    Sottomette immagini al pool di ridimensionamento limitando il numero di lavori in sospeso,
+    così che la memoria occupata resti limitata anche per acquisizioni molto grandi.
+    Gli errori sui singoli file vengono raccolti senza interrompere il batch.
+    """
+    def __init__(self, max_pending: Optional[int] = None):
+        self.pool = get_resize_pool()
+        self.max_pending = max_pending or 2 * (config.RESIZE_WORKERS or os.cpu_count() or 1)
+        self.pending: deque[tuple[str, Future, Optional[Callable[[], None]]]] = deque()
+        self.errors: list[tuple[str, str]] = []
+        self.completed = 0
+
+    def submit(self, source, dest_path: str, name: Optional[str] = None,
+               on_success: Optional[Callable[[], None]] = None) -> None:
+        """
+        Accoda il ridimensionamento di un'immagine (percorso o contenuto in memoria).
+        on_success viene chiamata nel thread chiamante quando l'immagine è stata scritta.
+        """
+        while len(self.pending) >= self.max_pending:
+            self._collect(*self.pending.popleft())
+        future = self.pool.submit(_resize_image_job, source, dest_path, config.IMAGE_TARGET_SIZE,
+                                  config.IMAGE_JPEG_QUALITY, config.DOWNSCALE_FACTORS)
+        self.pending.append((name or dest_path, future, on_success))
+
+    def _collect(self, name: str, future: Future, on_success: Optional[Callable[[], None]]) -> None:
+        try:
+            error = future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            error = str(e)
+        if error is None:
+            self.completed += 1
+            if on_success is not None:
+                on_success()
+        else:
+            logger.error("Errore nel processare l'immagine %s: %s", name, error)
+            self.errors.append((name, error))
+
+    def wait(self) -> list[tuple[str, str]]:
+        """Attende il completamento di tutti i lavori e restituisce gli errori per file."""
+        while self.pending:
+            self._collect(*self.pending.popleft())
+        return self.errors
+
+def link_or_copy(src: str, dest: str) -> None:
+    """
+    Crea dest come hard link di src, ripiegando su una copia se il link non è possibile
+    (filesystem diversi o non supportati).
+    """
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+class DiskLRUCache:
+    """
+    Cache su disco con dimensione massima ed eviction LRU. L'ordine LRU è mantenuto tramite il
+    tempo di modifica delle voci, aggiornato a ogni hit, così l'indice può essere ricostruito
+    dal disco all'avvio. Le sottoclassi definiscono percorso, copia e rimozione delle voci.
+    """
+    label = "voce"
+
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: Optional[OrderedDict[str, int]] = None
+        self.total_bytes = 0
+
+    def _path(self, key: str) -> str:
+        raise NotImplementedError
+
+    def _scan(self) -> Iterator[tuple[float, str, int]]:
+        """Voci presenti su disco come (tempo di modifica, chiave, dimensione)."""
+        raise NotImplementedError
+
+    def _materialize(self, path: str, dest_path: str) -> None:
+        link_or_copy(path, dest_path)
+
+    def _store(self, src_path: str, path: str) -> None:
+        link_or_copy(src_path, path)
+
+    def _size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def _remove(self, path: str) -> None:
+        os.remove(path)
+
+    def _load_index(self) -> OrderedDict[str, int]:
+        # Ricostruisce l'indice dal disco al primo accesso, ordinato dal meno recente
+        if self.entries is None:
+            found = sorted(self._scan())
+            self.entries = OrderedDict((key, size) for _, key, size in found)
+            self.total_bytes = sum(self.entries.values())
+        return self.entries
+
+    def get(self, key: str, dest_path: str) -> bool:
+        """
+        Materializza in dest_path la voce in cache, se presente.
+
+        Returns:
+            bool: True in caso di hit
+        """
+        return self.get_many([(key, dest_path)])
+
+    def get_many(self, items: list[tuple[str, str]]) -> bool:
+        """
+        Materializza più voci in cache (es. un frame e la sua piramide) solo se sono tutte presenti.
+
+        Returns:
+            bool: True se tutte le chiavi erano in cache
+        """
+        with self.lock:
+            entries = self._load_index()
+            if any(key not in entries for key, _ in items):
+                return False
+            for key, dest_path in items:
+                path = self._path(key)
+                try:
+                    os.utime(path)
+                    self._materialize(path, dest_path)
+                except OSError:
+                    self.total_bytes -= entries.pop(key)
+                    return False
+                entries.move_to_end(key)
+            return True
+
+    def discard(self, key: str) -> None:
+        """Elimina una voce dalla cache, se presente."""
+        with self.lock:
+            entries = self._load_index()
+            if key not in entries:
+                return
+            self.total_bytes -= entries.pop(key)
+            try:
+                self._remove(self._path(key))
+            except OSError:
+                pass
+
+    def put_many(self, items: list[tuple[str, str]]) -> None:
+        """Inserisce in cache più voci (chiave, percorso)."""
+        for key, src_path in items:
+            self.put(key, src_path)
+
+    def put(self, key: str, src_path: str) -> None:
+        """Inserisce in cache src_path ed esegue l'eviction se necessario."""
+        path = self._path(key)
+        with self.lock:
+            entries = self._load_index()
+            if key in entries:
+                return
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                self._store(src_path, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning("Impossibile salvare %s in cache: %s", self.label, e)
+                return
+            entries[key] = self._size(path)
+            self.total_bytes += entries[key]
+            while self.total_bytes > self.max_bytes and len(entries) > 1:
+                old_key, size = entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    self._remove(self._path(old_key))
+                except OSError:
+                    pass
+
+class FrameCache(DiskLRUCache):
+    """
+    Cache dei frame ridimensionati indicizzata per contenuto (SHA-256 del JPEG originale, della
+    risoluzione target e della qualità di codifica).
+    """
+    label = "il frame"
+
+    @staticmethod
+    def key(data: bytes) -> str:
+        """Calcola la chiave di cache per il contenuto JPEG originale."""
+        width, height = config.IMAGE_TARGET_SIZE
+        digest = hashlib.sha256(f"{width}x{height}q{config.IMAGE_JPEG_QUALITY}:".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], f"{key}.jpg")
+
+    def _scan(self) -> Iterator[tuple[float, str, int]]:
+        for root, _, files in os.walk(self.folder):
+            for file in files:
+                if file.endswith(".jpg"):
+                    stat = os.stat(os.path.join(root, file))
+                    yield stat.st_mtime, file[:-4], stat.st_size
+
+frame_cache = FrameCache(config.FRAME_CACHE_FOLDER, config.FRAME_CACHE_MAX_BYTES)
+
+class _BufferedStream:
+    """Lettore sequenziale con possibilità di restituire byte già letti (necessario per il parsing ZIP in streaming)."""
+    def __init__(self, stream: BinaryIO, chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.pending = b""
+
+    def read(self, size: int) -> bytes:
+        """Legge al massimo size byte (meno solo a fine stream)."""
+        if self.pending:
+            data, self.pending = self.pending[:size], self.pending[size:]
+            return data
+        return self.stream.read(size)
+
+    def read_exact(self, size: int) -> bytes:
+        """Legge esattamente size byte, sollevando ValueError se lo stream termina prima."""
+        parts = []
+        while size > 0:
+            data = self.read(min(size, self.chunk_size))
+            if not data:
+                raise ValueError("Archivio ZIP troncato")
+            parts.append(data)
+            size -= len(data)
+        return b"".join(parts)
+
+    def unread(self, data: bytes) -> None:
+        """Rimette in testa allo stream dei byte già letti."""
+        self.pending = data + self.pending
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+_ZIP_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Central directory e record di fine archivio: dopo l'ultimo membro deve comparire uno dei due
+_ZIP_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06")
+
+def _zip_descriptor_is_empty(reader: _BufferedStream) -> bool:
+    """Controlla, senza consumarlo, se il data descriptor che segue l'header indica un membro vuoto."""
+    descriptor = reader.read_exact(16)
+    reader.unread(descriptor)
+    if descriptor.startswith(_ZIP_DESCRIPTOR_SIGNATURE):
+        descriptor = descriptor[4:]
+    # CRC e dimensione compressa nulli (la dimensione compressa è a 4 o 8 byte con ZIP64)
+    return descriptor[:12] == bytes(12)
+
+def iter_zip_stream(stream: BinaryIO) -> Iterator[tuple[str, bytes]]:
+    """
+    Legge un archivio ZIP in modo sequenziale dagli header locali, senza bisogno di uno stream
+    seekable né di salvare l'archivio su disco. Ogni membro viene restituito appena è stato letto.
+
+    Args:
+        stream: Stream binario dell'archivio (anche non seekable, es. il body della richiesta)
+
+    Yields:
+        tuple: Nome del membro (con separatori '/') e contenuto decompresso
+
+    Raises:
+        ValueError: Se lo stream non è un archivio ZIP, è corrotto o usa funzionalità non supportate
+    """
+    reader = _BufferedStream(stream)
+    while True:
+        try:
+            signature = reader.read_exact(4)
+        except ValueError:
+            raise ValueError("Archivio ZIP non valido") from None
+        if signature in _ZIP_END_SIGNATURES:
+            # Central directory: non ci sono altri membri
+            return
+        if signature != _ZIP_LOCAL_SIGNATURE:
+            raise ValueError("Archivio ZIP non valido")
+        header = reader.read_exact(_ZIP_LOCAL_HEADER.size - 4)
+        (_, _, flags, method, _, _, crc, comp_size, size,
+         name_len, extra_len) = _ZIP_LOCAL_HEADER.unpack(signature + header)
+        name = reader.read_exact(name_len).decode("utf-8" if flags & 0x800 else "cp437")
+        extra = reader.read_exact(extra_len)
+        name = name.replace("\\", "/")
+
+        if flags & 0x1:
+            raise ValueError(f"Membro ZIP cifrato non supportato: {name}")
+
+        zip64 = False
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, data_len = struct.unpack_from("<2H", extra, pos)
+            if header_id == 0x0001:
+                zip64 = True
+                values = extra[pos + 4:pos + 4 + data_len]
+                if size == 0xFFFFFFFF and len(values) >= 8:
+                    size = struct.unpack_from("<Q", values, 0)[0]
+                    values = values[8:]
+                if comp_size == 0xFFFFFFFF and len(values) >= 8:
+                    comp_size = struct.unpack_from("<Q", values, 0)[0]
+            pos += 4 + data_len
+
+        has_descriptor = bool(flags & 0x8)
+        is_dir = name.endswith("/")
+        if method == zipfile.ZIP_STORED and has_descriptor:
+            # Gli zipper in streaming (zip -r -, Archivio Utility di macOS) scrivono così directory e
+            # file vuoti: il data descriptor segue subito l'header. Con dati la lunghezza è ignota.
+            if not (is_dir or _zip_descriptor_is_empty(reader)):
+                raise ValueError(f"Membro ZIP non compresso con data descriptor non supportato: {name}")
+            data = b""
+        elif method == zipfile.ZIP_STORED or (is_dir and not has_descriptor):
+            data = reader.read_exact(comp_size)
+        elif method == zipfile.ZIP_DEFLATED:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            parts = []
+            while not decompressor.eof:
+                chunk = reader.read(reader.chunk_size if has_descriptor else max(1, min(comp_size, reader.chunk_size)))
+                if not chunk:
+                    raise ValueError(f"Archivio ZIP troncato nel membro {name}")
+                if not has_descriptor:
+                    comp_size -= len(chunk)
+                parts.append(decompressor.decompress(chunk))
+            reader.unread(decompressor.unused_data)
+            data = b"".join(parts)
+        else:
+            raise ValueError(f"Metodo di compressione {method} non supportato: {name}")
+
+        if has_descriptor:
+            descriptor = reader.read_exact(4)
+            if descriptor == _ZIP_DESCRIPTOR_SIGNATURE:
+                descriptor = reader.read_exact(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            reader.read_exact(16 if zip64 else 8)
+
+        if is_dir:
+            continue
+        if zlib.crc32(data) != crc:
+            raise ValueError(f"CRC non valido per il membro {name}")
+        yield name, data
+
+def clear_data_folder(folder_path: str) -> None:
+    """
+    Elimina i dati di una acquisizione precedente mantenendo la struttura delle cartelle.
+
+    Args:
+        folder_path: Cartella dei dati da svuotare
+    """
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            os.remove(os.path.join(root, file))
+
+@dataclass
+class IngestResult:
+    """Riepilogo dell'estrazione di un archivio."""
+    images: int = 0
+    cached: int = 0
+    errors: int = 0
+
+def submit_frame(batch: ImageResizeBatch, data: bytes, target: str, name: str) -> bool:
+    """
+    Collega il frame e la sua piramide dalla cache dei frame oppure ne accoda il ridimensionamento
+    nel batch; al termine del ridimensionamento il frame viene aggiunto alla cache.
+
+    Returns:
+        bool: True se il frame era già in cache
+    """
+    key = frame_cache.key(data)
+    # Il frame e le sue versioni ridotte sono in cache con chiavi <chiave>_<fattore>
+    items = [(key, target)] + [(f"{key}_{factor}", pyramid_path(target, factor))
+                               for factor in config.DOWNSCALE_FACTORS]
+    for _, path in items[1:]:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if frame_cache.get_many(items):
+        return True
+    for _, path in items:
+        # Un hit parziale può aver lasciato link ai file in cache: non vanno sovrascritti
+        if os.path.lexists(path):
+            os.remove(path)
+    batch.submit(data, target, name, on_success=lambda: frame_cache.put_many(items))
+    return False
+
+@timed_stage("ingest")
+def ingest_zip_stream(stream: BinaryIO, data_folder: str) -> IngestResult:
+    """
+    Estrae un archivio ZIP in streaming nella cartella dati. Le immagini vengono decodificate e
+    ridimensionate direttamente dallo stream dell'archivio, senza scrivere gli originali su disco.
+    I frame già presenti nella cache vengono collegati senza essere decodificati.
+
+    Args:
+        stream: Stream binario dell'archivio ZIP
+        data_folder: Cartella di destinazione
+
+    Returns:
+        IngestResult: Numero di immagini elaborate, recuperate dalla cache e fallite
+
+    Raises:
+        ValueError: Se l'archivio è corrotto, contiene percorsi non validi o nessuna immagine
+    """
+    root = os.path.abspath(data_folder)
+    batch = ImageResizeBatch()
+    result = IngestResult()
+    for name, data in iter_zip_stream(stream):
+        extracted_bytes.inc(len(data))
+        target = os.path.abspath(os.path.join(root, *name.split("/")))
+        if os.path.commonpath([root, target]) != root:
+            raise ValueError(f"Percorso non valido nell'archivio: {name}")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if name.lower().endswith(config.SUPPORTED_IMAGE_FORMATS):
+            if submit_frame(batch, data, target, name):
+                result.cached += 1
+        else:
+            with open(target, "wb") as out:
+                out.write(data)
+    result.errors = len(batch.wait())
+    result.images = batch.completed + result.cached
+    frames_ingested.inc(batch.completed, "resized")
+    frames_ingested.inc(result.cached, "cached")
+    frames_ingested.inc(result.errors, "failed")
+    if result.images == 0:
+        raise ValueError("Nessuna immagine valida nell'archivio")
+    return result
+
+class UploadSession:
+    """
+    Upload riprendibile di un archivio: il file viene preallocato alla dimensione finale e ogni
+    blocco numerato viene scritto direttamente al proprio offset, senza ricomposizione finale.
+    """
+    def __init__(self, upload_id: str, job_id: str, size: int, chunk_size: int, path: str):
+        self.upload_id = upload_id
+        self.job_id = job_id
+        self.size = size
+        self.chunk_size = chunk_size
+        self.path = path
+        self.num_chunks = max(1, -(-size // chunk_size))
+        self.received: set[int] = set()
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+    def chunk_length(self, index: int) -> int:
+        """Dimensione attesa del blocco index (l'ultimo può essere più corto)."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def write_chunk(self, index: int, data: bytes) -> None:
+        """Scrive il blocco al suo offset nel file e lo segna come ricevuto."""
+        with open(self.path, "r+b") as file:
+            file.seek(index * self.chunk_size)
+            file.write(data)
+        with self.lock:
+            self.received.add(index)
+            self.updated_at = time.time()
+
+    def missing_chunks(self) -> list[int]:
+        with self.lock:
+            return [index for index in range(self.num_chunks) if index not in self.received]
+
+    def received_ranges(self) -> list[list[int]]:
+        """Intervalli di byte già ricevuti come [inizio, fine) contigui."""
+        ranges: list[list[int]] = []
+        with self.lock:
+            indices = sorted(self.received)
+        for index in indices:
+            start, end = index * self.chunk_size, index * self.chunk_size + self.chunk_length(index)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+            else:
+                ranges.append([start, end])
+        return ranges
+
+    def to_dict(self) -> dict:
+        """Stato della sessione in formato serializzabile."""
+        return {
+            "upload_id": self.upload_id,
+            "job_id": self.job_id,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "num_chunks": self.num_chunks,
+            "received": self.received_ranges(),
+            "missing_chunks": self.missing_chunks(),
+        }
+
+class UploadSessionStore:
+    """
+    Sessioni di upload riprendibili aperte, con rimozione di quelle inattive. Le sessioni sono
+    solo in memoria: i file rimasti nella cartella di spool dopo un riavvio vengono eliminati da sweep.
+    """
+    SPOOL_EXTENSIONS = (".part", ".zip")
+
+    def __init__(self, folder: str, ttl: float):
+        self.folder = folder
+        self.ttl = ttl
+        self.sessions: dict[str, UploadSession] = {}
+        self.lock = threading.Lock()
+
+    def _discard(self, session: UploadSession) -> None:
+        self.sessions.pop(session.upload_id, None)
+        if os.path.exists(session.path):
+            os.remove(session.path)
+
+    def _expire(self, now: float) -> None:
+        for expired in [item for item in self.sessions.values() if now - item.updated_at > self.ttl]:
+            logger.info("Sessione di upload %s scaduta", expired.upload_id)
+            self._discard(expired)
+
+    def sweep(self, max_age: float, in_use: Callable[[str], bool] = lambda job_id: False) -> int:
+        """
+        Scarta le sessioni inattive ed elimina dalla cartella di spool i file parziali e gli archivi
+        senza sessione (rimasti da un riavvio o da un preprocessing interrotto) non modificati da
+        più di max_age secondi.
+
+        Args:
+            max_age: Età minima dei file orfani da eliminare (0 all'avvio, quando nessuno è in uso)
+            in_use: Indica se un job ha un preprocessing in corso, i cui archivi non vanno eliminati
+
+        Returns:
+            int: Numero di file eliminati
+        """
+        removed = 0
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            if not os.path.isdir(self.folder):
+                return 0
+            live = {os.path.abspath(session.path) for session in self.sessions.values()}
+            for name in os.listdir(self.folder):
+                path = os.path.join(self.folder, name)
+                if not name.endswith(self.SPOOL_EXTENSIONS) or os.path.abspath(path) in live:
+                    continue
+                # I file di spool si chiamano <job_id>-<id>.part / .zip
+                if in_use(name.rpartition("-")[0]):
+                    continue
+                try:
+                    if now - os.path.getmtime(path) >= max_age:
+                        os.remove(path)
+                        removed += 1
+                except OSError as e:
+                    logger.warning("Impossibile eliminare il file di upload %s: %s", path, e)
+        if removed:
+            logger.info("Eliminati %d file di upload non più in uso da %s", removed, self.folder)
+        return removed
+
+    def start_sweeper(self, interval: float, in_use: Callable[[str], bool]) -> threading.Thread:
+        """Avvia un thread che ripete sweep ogni interval secondi, con i file orfani oltre il ttl."""
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep(self.ttl, in_use)
+                except OSError as e:
+                    logger.error("Errore nella pulizia degli upload: %s", e)
+        thread = threading.Thread(target=run, name="upload-sweeper", daemon=True)
+        thread.start()
+        return thread
+
+    def create(self, job_id: str, size: int, chunk_size: int) -> UploadSession:
+        """Apre una sessione e prealloca il file di destinazione."""
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self.folder, exist_ok=True)
+        session = UploadSession(upload_id, job_id, size, chunk_size,
+                                os.path.join(self.folder, f"{job_id}-{upload_id[:8]}.part"))
+        with open(session.path, "wb") as file:
+            file.truncate(size)
+        with self.lock:
+            self._expire(time.time())
+            self.sessions[upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        with self.lock:
+            return self.sessions.get(upload_id)
+
+    def pop(self, upload_id: str) -> Optional[UploadSession]:
+        """Rimuove la sessione (il file resta a chi lo ha richiesto)."""
+        with self.lock:
+            return self.sessions.pop(upload_id, None)
+
+    def discard(self, upload_id: str) -> None:
+        """Annulla la sessione eliminando anche il file parziale."""
+        with self.lock:
+            session = self.sessions.get(upload_id)
+            if session:
+                self._discard(session)
+
+upload_sessions = UploadSessionStore(config.UPLOAD_SPOOL_FOLDER, config.UPLOAD_SESSION_TTL)
+
+def preprocessing_in_use(job_id: str) -> bool:
+    """True se il job ha un preprocessing in coda o in corso, che usa il proprio archivio di spool."""
+    job = scheduler.get(job_id)
+    return job is not None and job.preprocessing
+
+def load_and_process_data(rgb_dir: str, intrinsics_path: str, extrinsics_path: str):
+    """
+    Carica e processa i dati dalle immagini RGB e dai file di parametri intrinseci ed estrinseci.
+    
+    Args:
+        rgb_dir: Percorso delle immagini RGB
+        intrinsics_path: Percorso del file dei parametri intrinseci
+        extrinsics_path: Percorso del file dei parametri estrinseci
+    
+    Returns:
+        tuple: Tuple contenente paths delle immagini, pose, timestamps e parametri della camera
+    """
+    # Trova i paths delle immagini e processa gli indici
+    image_paths = sorted(glob.glob(rgb_dir))
+    image_paths = [path.replace(f"{config.DATA_FOLDER}/", "") for path in image_paths]
+    frame_index = build_frame_index(image_paths)
+    img_idxs = np.fromiter(frame_index.values(), dtype=int, count=len(frame_index))
+    # Carica i parametri intrinseci
+    intrinsic_txt = parse_intrinsics(intrinsics_path)
+    W, H = map(int, intrinsic_txt[-2:])
+    fl_x, fl_y = intrinsic_txt[0], intrinsic_txt[4]
+    cx, cy = intrinsic_txt[2], intrinsic_txt[5]
+
+    # Carica i parametri estrinseci
+    all_timestamps, all_poses = parse_coordinates(extrinsics_path)
+    if img_idxs.size and (img_idxs.min() < 0 or img_idxs.max() >= len(all_poses)):
+        raise ValueError(f"Immagini senza posa corrispondente in {extrinsics_path}")
+    poses = all_poses[img_idxs]
+    timestamps = all_timestamps[img_idxs]
+
+    return image_paths, poses, timestamps, fl_x, fl_y, cx, cy, W, H
+
+# Matrice di riflessione per inversione assi X e Y (Unity -> OpenGL)
+R_Z_REFLECTION = np.array([
+    [-1, 0, 0],
+    [0, -1, 0],
+    [0, 0, 1]
+])
+
+def transform_pose(pose: np.ndarray) -> np.ndarray:
+    """
+    Trasforma una posa da Unity (left-handed, Y-up) a OpenGL (right-handed, Y-up).
+    
+    Args:
+        pose: Matrice di posa 4x4 nel formato Unity
+    
+    Returns:
+        np.ndarray: Matrice di posa 4x4 nel formato OpenGL
+    """
+    return convert_poses(pose[np.newaxis])[0]
+
+def convert_poses(poses: np.ndarray) -> np.ndarray:
+    """
+    Converte in un'unica operazione vettoriale uno stack di pose da Unity a OpenGL:
+    la rotazione viene riflessa sugli assi X e Y e la traslazione invertita.
+    
+    Args:
+        poses: Array (N, 4, 4) di matrici di posa nel formato Unity
+    
+    Returns:
+        np.ndarray: Array (N, 4, 4) di matrici di posa nel formato OpenGL
+    """
+    poses = np.asarray(poses, dtype=np.float64)
+    converted = np.zeros((len(poses), 4, 4))
+    converted[:, :3, :3] = np.matmul(poses[:, :3, :3], R_Z_REFLECTION)
+    converted[:, :3, 3] = -poses[:, :3, 3]
+    converted[:, 3, 3] = 1.0
+    return converted
+
+def rpy_to_matrix(rpy) -> np.ndarray:
+    """Matrice di rotazione da angoli roll, pitch, yaw (radianti), con la convenzione di nerfstudio."""
+    roll, pitch, yaw = rpy
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+def matrix_to_rpy(rotation: np.ndarray) -> np.ndarray:
+    """Angoli roll, pitch, yaw (radianti) di una matrice di rotazione, inversa di rpy_to_matrix."""
+    pitch = np.arcsin(np.clip(-rotation[2, 0], -1.0, 1.0))
+    if abs(rotation[2, 0]) > 1 - 1e-9:
+        # Gimbal lock: roll e yaw non sono distinguibili, lo yaw viene fissato a zero
+        return np.array([np.arctan2(-rotation[1, 2], rotation[1, 1]), pitch, 0.0])
+    return np.array([np.arctan2(rotation[2, 1], rotation[2, 2]), pitch, np.arctan2(rotation[1, 0], rotation[0, 0])])
+
+@dataclass
+class SceneBounds:
+    """
+    Bounding box orientato (OBB) della scena nelle coordinate del transforms.json, con
+    centro, rotazione (roll, pitch, yaw) e dimensioni dei lati come i parametri di ns-export.
+    """
+    center: list[float]
+    rotation: list[float]
+    scale: list[float]
+    far: float  # distanza massima tra una camera e un vertice dell'OBB
+    camera_radius: float  # distanza massima di una camera dal baricentro delle camere
+    frames: int  # frame da cui è stato calcolato
+
+def compute_scene_bounds(poses: np.ndarray, fl_x: float, fl_y: float, W: int, H: int) -> Optional[SceneBounds]:
+    """
+    Stima i bordi della scena dalle pose delle camere. Trova il punto più vicino a tutte le
+    direzioni di vista (dove convergono gli sguardi) e costruisce un primo OBB robusto (assi
+    principali, percentili estremi scartati) sulle sezioni dei frustum a quella profondità; poi
+    interseca i frustum, restringendo l'OBB ai punti inquadrati da almeno
+    Config.SCENE_BOUNDS_MIN_VIEWS delle camere, e aggiunge il margine.
+
+    Args:
+        poses: Array (N, 4, 4) di pose camera-mondo in formato OpenGL
+        fl_x, fl_y: Parametri focali
+        W, H: Dimensioni dell'immagine
+
+    Returns:
+        Optional[SceneBounds]: Bordi della scena, None se le pose non sono sufficienti
+    """
+    if len(poses) < 3:
+        return None
+    centers = poses[:, :3, 3]
+    right, up = poses[:, :3, 0], poses[:, :3, 1]
+    directions = -poses[:, :3, 2]
+    directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+    # Punto che minimizza la somma delle distanze al quadrato dalle rette di vista
+    projectors = np.eye(3) - directions[:, :, None] * directions[:, None, :]
+    focus = np.linalg.lstsq(projectors.sum(0), np.einsum("nij,nj->i", projectors, centers), rcond=None)[0]
+    depths = np.einsum("ij,ij->i", focus - centers, directions)
+    in_front = depths > 0
+    camera_radius = np.linalg.norm(centers - centers.mean(0), axis=1).max()
+    # Gli sguardi convergono se il punto è davanti alla maggior parte delle camere, e non tra di esse
+    converging = in_front.mean() >= 0.5 and np.median(depths[in_front]) > 0.5 * camera_radius
+    if converging:
+        depths = np.where(in_front, depths, np.median(depths[in_front]))
+    else:
+        # Acquisizione dall'interno (es. una stanza): gli sguardi non convergono
+        depths = np.full(len(poses), config.SCENE_BOUNDS_FALLBACK_DEPTH)
+
+    # Centro e vertici della sezione di ogni frustum alla profondità osservata
+    targets = centers + depths[:, None] * directions
+    half_w = (depths * W / (2 * fl_x))[:, None] * right
+    half_h = (depths * H / (2 * fl_y))[:, None] * up
+    points = np.concatenate([targets] + [targets + sx * half_w + sy * half_h
+                                         for sx in (-1, 1) for sy in (-1, 1)])
+
+    mean = points.mean(0)
+    axes = np.linalg.svd(points - mean, full_matrices=False)[2]
+    if np.linalg.det(axes) < 0:
+        axes[2] = -axes[2]
+    low, high = np.percentile((points - mean) @ axes.T,
+                              [config.SCENE_BOUNDS_PERCENTILE, 100 - config.SCENE_BOUNDS_PERCENTILE], axis=0)
+
+    if converging:
+        # Intersezione dei frustum: punti della griglia dentro l'OBB visti da abbastanza camere
+        steps = [np.linspace(low[axis], high[axis], config.SCENE_BOUNDS_GRID) for axis in range(3)]
+        grid = np.stack(np.meshgrid(*steps, indexing="ij"), -1).reshape(-1, 3)
+        views = np.zeros(len(grid), dtype=np.int32)
+        cameras = np.linspace(0, len(poses) - 1, min(len(poses), 200), dtype=int)
+        world = mean + grid @ axes
+        for index in cameras:
+            relative = world - centers[index]
+            z = relative @ directions[index]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = np.abs(relative @ right[index]) * fl_x / z
+                y = np.abs(relative @ up[index]) * fl_y / z
+            views += (z > 0) & (x <= W / 2) & (y <= H / 2)
+        seen = grid[views >= config.SCENE_BOUNDS_MIN_VIEWS * len(cameras)]
+        if len(seen) >= 8:
+            low, high = seen.min(0), seen.max(0)
+
+    scale = (high - low) * config.SCENE_BOUNDS_MARGIN
+    scale = np.maximum(scale, scale.max() * 0.1)  # evita un OBB piatto se le viste sono complanari
+    center = mean + (low + high) / 2 @ axes
+    rotation = axes.T  # colonne: assi dell'OBB nel mondo
+
+    corners = center + (np.array(list(itertools.product((-0.5, 0.5), repeat=3))) * scale) @ rotation.T
+    far = np.linalg.norm(corners[None, :, :] - centers[:, None, :], axis=2).max()
+    return SceneBounds(center=center.tolist(), rotation=matrix_to_rpy(rotation).tolist(), scale=scale.tolist(),
+                       far=float(far), camera_radius=float(camera_radius), frames=len(poses))
+
+def iter_transforms_frames(image_paths: list[str],
+                           converted_poses: np.ndarray,
+                           timestamps: np.ndarray) -> Iterator[dict]:
+    """
+    Genera uno alla volta i frame del transforms.json, senza costruire l'intera lista in memoria.
+
+    Args:
+        image_paths: Lista dei percorsi delle immagini
+        converted_poses: Array delle pose convertite
+        timestamps: Array dei timestamps
+
+    Yields:
+        dict: Frame nel formato NerfStudio
+    """
+    # Una sola conversione dell'intero stack invece di .tolist() posa per posa
+    matrices = np.asarray(converted_poses).tolist()
+    for path, matrix, timestamp in zip(image_paths, matrices, np.asarray(timestamps).tolist()):
+        yield {
+            "file_path": "images\\{}".format(frame_name(path)),
+            "transform_matrix": matrix,
+            "timestamp": timestamp
+        }
+
+def create_transforms_dict(image_paths: list[str], 
+                         converted_poses: np.ndarray, 
+                         timestamps: np.ndarray,
+                         fl_x: float, fl_y: float, 
+                         cx: float, cy: float, 
+                         W: int, H: int,
+                         downscale_factors: tuple[int, ...] = (),
+                         scene_bounds: Optional[SceneBounds] = None) -> dict:
+    """
+    Crea il dizionario per il formato JSON di NerfStudio.
+    I frame sono un generatore, consumato da write_transforms_json durante la scrittura.
+    
+    Args:
+        image_paths: Lista dei percorsi delle immagini
+        converted_poses: Array delle pose convertite
+        timestamps: Array dei timestamps
+        fl_x, fl_y: Parametri focali
+        cx, cy: Centro ottico
+        W, H: Dimensioni dell'immagine
+        downscale_factors: Fattori per cui esistono già le cartelle images_<fattore> complete
+        scene_bounds: Bordi della scena calcolati dalle pose
+    
+    Returns:
+        dict: Dizionario del transforms.json nel formato NerfStudio
+    """
+    transforms = {
+        "fl_x": fl_x, "fl_y": fl_y, 
+        "cx": cx, "cy": cy,
+        "w": W, "h": H,
+        "k1": 0.0, "k2": 0.0, 
+        "p1": 0.0, "p2": 0.0,
+    }
+    if downscale_factors:
+        # nerfstudio usa direttamente images_<fattore> se presente, senza ridurre le immagini all'avvio
+        transforms["downscale_factors"] = list(downscale_factors)
+    if scene_bounds is not None:
+        # Ignorati da nerfstudio-data: usati dal server per il training e come OBB di default dell'export
+        transforms["scene_bounds"] = asdict(scene_bounds)
+    transforms["frames"] = iter_transforms_frames(image_paths, converted_poses, timestamps)
+    return transforms
+
+TRANSFORMS_TRAILER = "\n]}\n"
+
+def write_transforms_json(transforms_dict: dict, json_path: str) -> int:
+    """
+    Scrive il transforms.json in streaming: i campi della camera vengono scritti per primi,
+    poi un frame per riga, così da non dover serializzare l'intero documento in memoria.
+
+    Args:
+        transforms_dict: Dizionario creato da create_transforms_dict
+        json_path: Percorso del file di output
+
+    Returns:
+        int: Numero di frame scritti
+    """
+    encoder = json.JSONEncoder()
+    header = {key: value for key, value in transforms_dict.items() if key != "frames"}
+    count = 0
+    # newline fisso: append_transforms_frame riconosce la chiusura del documento dalla sua lunghezza
+    with open(json_path, 'w', encoding='utf-8', newline='\n') as outfile:
+        outfile.write(encoder.encode(header)[:-1])
+        outfile.write(', "frames": [')
+        for frame in transforms_dict["frames"]:
+            outfile.write(",\n" if count else "\n")
+            outfile.write(encoder.encode(frame))
+            count += 1
+        outfile.write(TRANSFORMS_TRAILER)
+    return count
+
+def update_scene_bounds(data_folder: str) -> Optional[SceneBounds]:
+    """
+    Restituisce i bordi della scena del transforms.json, ricalcolandoli e riscrivendo il file se
+    mancano o non comprendono tutti i frame (es. acquisizione live, che aggiunge i frame in coda).
+
+    Args:
+        data_folder: Cartella dati del job
+
+    Returns:
+        Optional[SceneBounds]: Bordi della scena, None se le pose non sono sufficienti
+    """
+    json_path = os.path.join(data_folder, "transforms.json")
+    with open(json_path, encoding="utf-8") as file:
+        transforms = json.load(file)
+    frames = transforms["frames"]
+    stored = transforms.get("scene_bounds")
+    if stored and stored["frames"] == len(frames):
+        return SceneBounds(**stored)
+    poses = np.asarray([frame["transform_matrix"] for frame in frames], dtype=np.float64).reshape(-1, 4, 4)
+    scene_bounds = compute_scene_bounds(poses, transforms["fl_x"], transforms["fl_y"], transforms["w"], transforms["h"])
+    if scene_bounds is not None:
+        transforms["scene_bounds"] = asdict(scene_bounds)
+        write_transforms_json(transforms, json_path)
+    return scene_bounds
+
+def append_transforms_frame(json_path: str, frame: dict, first: bool) -> None:
+    """
+    Aggiunge un frame in coda a un transforms.json scritto da write_transforms_json, riscrivendo
+    solo la chiusura del documento invece dell'intero file.
+
+    Args:
+        json_path: Percorso del transforms.json
+        frame: Frame nel formato NerfStudio
+        first: True se il file non contiene ancora frame
+    """
+    with open(json_path, 'r+b') as outfile:
+        outfile.seek(-len(TRANSFORMS_TRAILER), os.SEEK_END)
+        if outfile.read() != TRANSFORMS_TRAILER.encode():
+            raise ValueError(f"{json_path}: chiusura del documento non riconosciuta")
+        outfile.seek(-len(TRANSFORMS_TRAILER), os.SEEK_END)
+        outfile.write(((",\n" if not first else "\n") + json.dumps(frame) + TRANSFORMS_TRAILER).encode())
+
+def image_sharpness(path: str, analysis_size: tuple[int, int]) -> float:
+    """
+    Stima la nitidezza di un'immagine come varianza del laplaciano sulla versione in scala di
+    grigi ridotta. Eseguita nei processi del pool di ridimensionamento.
+
+    Args:
+        path: Percorso dell'immagine
+        analysis_size: Risoluzione a cui calcolare il laplaciano
+
+    Returns:
+        float: Varianza del laplaciano (valori bassi = immagine mossa o sfocata)
+    """
+    with Image.open(path) as img:
+        img.draft("L", analysis_size)
+        gray = np.asarray(img.convert("L").resize(analysis_size, Image.Resampling.BILINEAR), dtype=np.float32)
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+                 - 4.0 * gray[1:-1, 1:-1])
+    return float(laplacian.var())
+
+@dataclass
+class KeyframeReport:
+    """Esito della selezione dei keyframe."""
+    total: int = 0
+    selected: int = 0
+    blurry: int = 0
+    duplicate: int = 0
+    skipped: bool = False  # selezione ignorata perché lasciava troppo pochi frame
+
+def select_keyframes(poses: np.ndarray, sharpness: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Seleziona i keyframe scartando i frame mossi e quelli quasi duplicati nello spazio delle pose.
+
+    Un frame è mosso se la sua nitidezza è inferiore a Config.KEYFRAME_BLUR_RATIO volte la mediana
+    dell'acquisizione. I frame rimanenti vengono visitati dal più nitido: un frame è un duplicato se
+    un keyframe già scelto dista meno di Config.KEYFRAME_MIN_TRANSLATION e ruota meno di
+    Config.KEYFRAME_MIN_ROTATION_DEG, così tra più scatti dallo stesso punto resta il più nitido.
+
+    Args:
+        poses: Array (N, 4, 4) delle pose
+        sharpness: Array (N,) della nitidezza dei frame
+
+    Returns:
+        tuple: Maschera dei frame selezionati e array dei motivi di scarto ("", "blurry", "duplicate")
+    """
+    reasons = np.full(len(poses), "", dtype=object)
+    reasons[sharpness < config.KEYFRAME_BLUR_RATIO * np.median(sharpness)] = "blurry"
+    rotations = poses[:, :3, :3]
+    translations = poses[:, :3, 3]
+    min_cos = np.cos(np.radians(config.KEYFRAME_MIN_ROTATION_DEG))
+    kept: list[int] = []
+    for index in np.argsort(-sharpness, kind="stable"):
+        if reasons[index]:
+            continue
+        if kept:
+            distance = np.linalg.norm(translations[kept] - translations[index], axis=1)
+            # cos dell'angolo tra due rotazioni: (tr(Ra^T Rb) - 1) / 2
+            cos_angle = (np.einsum("kij,ij->k", rotations[kept], rotations[index]) - 1.0) / 2.0
+            if np.any((distance < config.KEYFRAME_MIN_TRANSLATION) & (cos_angle > min_cos)):
+                reasons[index] = "duplicate"
+                continue
+        kept.append(index)
+    return reasons == "", reasons
+
+#@retry_operation()
+@timed_stage("transforms")
+def create_transforms_json(rgb_dir: str, 
+                         intrinsics_path: str, 
+                         extrinsics_path: str, 
+                         output_path: str,
+                         keyframes: bool = False) -> Optional[KeyframeReport]:
+    """
+    Crea il file transforms.json combinando tutti i dati processati.
+    Con keyframes=True vengono scritti solo i frame scelti da select_keyframes; il dettaglio dei
+    frame scartati viene salvato in keyframes.json accanto al transforms.json.
+    
+    Args:
+        rgb_dir: Percorso delle immagini RGB
+        intrinsics_path: Percorso del file dei parametri intrinseci
+        extrinsics_path: Percorso del file dei parametri estrinseci
+        output_path: Percorso di output per il file JSON
+        keyframes: Se True applica la selezione dei keyframe
+
+    Returns:
+        Optional[KeyframeReport]: Esito della selezione, None se non richiesta
+    """
+    try:
+        # Carica e processa i dati
+        data = load_and_process_data(rgb_dir, intrinsics_path, extrinsics_path)
+        image_paths, poses, timestamps, fl_x, fl_y, cx, cy, W, H = data
+        image_files = [os.path.join(os.path.dirname(rgb_dir), frame_name(path)) for path in image_paths]
+
+        report = None
+        if keyframes:
+            sharpness = np.fromiter(
+                get_resize_pool().map(image_sharpness, image_files,
+                                      itertools.repeat(config.KEYFRAME_ANALYSIS_SIZE), chunksize=8),
+                dtype=np.float64, count=len(image_files)
+            )
+            selected, reasons = select_keyframes(poses, sharpness)
+            report = KeyframeReport(total=len(image_paths), selected=int(selected.sum()),
+                                    blurry=int(np.sum(reasons == "blurry")),
+                                    duplicate=int(np.sum(reasons == "duplicate")))
+            if report.selected < 50:
+                report.skipped = True
+                logger.warning("Selezione keyframe ignorata: resterebbero solo %d frame", report.selected)
+            else:
+                image_paths = [path for path, keep in zip(image_paths, selected) if keep]
+                image_files = [file for file, keep in zip(image_files, selected) if keep]
+                poses, timestamps = poses[selected], timestamps[selected]
+            with open(os.path.join(output_path, "keyframes.json"), 'w', encoding='utf-8') as file:
+                json.dump({
+                    **asdict(report),
+                    "dropped": {frame_name(path): reason
+                                for path, reason in zip(data[0], reasons) if reason}
+                }, file, indent=1)
+            logger.info("Keyframe: %d/%d selezionati (%d mossi, %d duplicati)",
+                        report.selected, report.total, report.blurry, report.duplicate)
+        
+        # Fattori della piramide generata all'upload disponibili per tutti i frame
+        downscale_factors = tuple(
+            factor for factor in config.DOWNSCALE_FACTORS
+            if all(os.path.exists(pyramid_path(file, factor)) for file in image_files)
+        )
+
+        # Converte le pose e crea il dizionario
+        converted_poses = convert_poses(poses)
+        scene_bounds = compute_scene_bounds(converted_poses, fl_x, fl_y, W, H)
+        transforms_dict = create_transforms_dict(
+            image_paths, converted_poses, timestamps,
+            fl_x, fl_y, cx, cy, W, H, downscale_factors, scene_bounds
+        )
+
+        # Salva il file JSON
+        json_path = os.path.join(output_path, "transforms.json")
+        write_transforms_json(transforms_dict, json_path)
+        
+        logger.info("Processate %d immagini", len(image_paths))
+        return report
+    except (IOError, ValueError) as e:
+        logger.error("Errore nella creazione del file transforms.json: %s", e)
+        raise
+
+# Formati già compressi: vengono salvati nello ZIP senza ricomprimerli
+PRECOMPRESSED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.zip', '.gz', '.glb')
+
+@timed_stage("zip")
+def create_zip_file(folder_path: str, output_folder: str, zip_name: str) -> str:
+    """
+    Crea un file ZIP del contenuto di una cartella.
+    I file già compressi (es. la texture PNG) vengono memorizzati senza ricompressione.
+    
+    Args:
+        folder_path: Percorso della cartella da comprimere
+        output_folder: Cartella di destinazione del file ZIP
+        zip_name: Nome del file ZIP
+    
+    Returns:
+        str: Percorso completo del file ZIP creato
+    """
+    zip_file = os.path.join(output_folder, zip_name)
+    try:
+        with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+            for root, _, files in os.walk(folder_path):
+                for file in sorted(files):
+                    file_path = os.path.join(root, file)
+                    arc_path = os.path.relpath(file_path, folder_path)
+                    compression = (zipfile.ZIP_STORED if file.lower().endswith(PRECOMPRESSED_EXTENSIONS)
+                                   else zipfile.ZIP_DEFLATED)
+                    zip_ref.write(file_path, arc_path, compress_type=compression)
+        return zip_file
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.error("Errore nella creazione del file ZIP: %s", e)
+        raise
+
+def folder_fingerprint(folder_path: str) -> Optional[str]:
+    """
+    Calcola un'impronta del contenuto di una cartella dai nomi, dimensioni e tempi di modifica
+    dei file, senza leggerne il contenuto.
+
+    Args:
+        folder_path: Cartella da esaminare
+
+    Returns:
+        Optional[str]: Impronta esadecimale, None se la cartella non esiste o è vuota
+    """
+    entries = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            stat = os.stat(os.path.join(root, file))
+            entries.append(f"{os.path.relpath(os.path.join(root, file), folder_path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    if not entries:
+        return None
+    return hashlib.sha1("\n".join(sorted(entries)).encode()).hexdigest()
+
+_mesh_artifact_lock = threading.Lock()
+
+def _get_mesh_artifact(export_folder: str, extension: str,
+                       build: Callable[[str], None]) -> Optional[tuple[str, str]]:
+    """
+    Restituisce un artefatto derivato dalla mesh esportata (ZIP, GLB), creandolo solo se il
+    contenuto dell'export è cambiato. Gli artefatti sono salvati accanto alla cartella di export
+    come <cartella>-<etag>.<estensione>; quelli di export precedenti vengono eliminati.
+
+    Args:
+        export_folder: Cartella di export della mesh
+        extension: Estensione dell'artefatto
+        build: Funzione che scrive l'artefatto nel percorso ricevuto
+
+    Returns:
+        Optional[tuple[str, str]]: Percorso dell'artefatto e relativo ETag, None se non c'è nessun export
+    """
+    fingerprint = folder_fingerprint(export_folder)
+    if fingerprint is None:
+        return None
+    etag = hashlib.sha1(f"{fingerprint}:{extension}".encode()).hexdigest()[:16]
+    cache_folder = os.path.dirname(os.path.abspath(export_folder))
+    prefix = f"{os.path.basename(os.path.normpath(export_folder))}-"
+    artifact_path = os.path.join(cache_folder, f"{prefix}{etag}.{extension}")
+    with _mesh_artifact_lock:
+        if not os.path.exists(artifact_path):
+            tmp_path = f"{artifact_path}.tmp"
+            build(tmp_path)
+            os.replace(tmp_path, artifact_path)
+            for old_artifact in glob.glob(os.path.join(cache_folder, f"{prefix}*.{extension}")):
+                if old_artifact != artifact_path:
+                    try:
+                        os.remove(old_artifact)
+                    except OSError:
+                        pass
+    return artifact_path, etag
+
+def get_mesh_archive(export_folder: str) -> Optional[tuple[str, str]]:
+    """
+    Restituisce lo ZIP della mesh esportata (mesh-<etag>.zip), creato una sola volta per export.
+
+    Args:
+        export_folder: Cartella di export della mesh
+
+    Returns:
+        Optional[tuple[str, str]]: Percorso dello ZIP e relativo ETag, None se non c'è nessun export
+    """
+    return _get_mesh_artifact(
+        export_folder, "zip",
+        lambda path: create_zip_file(export_folder, os.path.dirname(path), os.path.basename(path))
+    )
+
+@dataclass
+class ObjMesh:
+    """Mesh OBJ triangolare in forma di array NumPy (indici a base 0)."""
+    positions: np.ndarray  # (V, 3) float
+    uvs: np.ndarray  # (T, 2) float
+    normals: np.ndarray  # (N, 3) float
+    faces: np.ndarray  # (F, 3, 3) int: per ogni vertice indici di posizione, uv e normale (-1 se assente)
+    header: list[str]  # righe mtllib/usemtl da riscrivere
+
+def _obj_floats(lines: list[str], prefix: str, width: int) -> np.ndarray:
+    values = [line[len(prefix):] for line in lines if line.startswith(prefix)]
+    if not values:
+        return np.zeros((0, width))
+    return np.array(" ".join(values).split(), dtype=np.float64).reshape(len(values), -1)[:, :width]
+
+def load_obj(path: str) -> ObjMesh:
+    """
+    Legge una mesh OBJ triangolare (come quelle prodotte da ns-export poisson) con conversioni
+    vettoriali invece di un parsing riga per riga.
+
+    Args:
+        path: Percorso del file OBJ
+
+    Returns:
+        ObjMesh: Mesh letta
+
+    Raises:
+        ValueError: Se la mesh contiene facce non triangolari
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    header = [line for line in lines if line.startswith(("mtllib ", "usemtl "))]
+    face_lines = [line[2:] for line in lines if line.startswith("f ")]
+    faces = np.full((len(face_lines), 3, 3), -1, dtype=np.int64)
+    if face_lines:
+        # Il formato degli angoli ("v", "v/vt", "v//vn", "v/vt/vn") è lo stesso per tutto il file
+        first = face_lines[0].split()[0]
+        columns = [0, 2] if "//" in first else list(range(first.count("/") + 1))
+        text = " ".join(face_lines).replace("//", " ").replace("/", " ")
+        values = np.array(text.split(), dtype=np.int64)
+        if values.size != len(face_lines) * 3 * len(columns):
+            raise ValueError(f"{path}: sono supportate solo facce triangolari con formato uniforme")
+        faces[:, :, columns] = values.reshape(len(face_lines), 3, len(columns)) - 1
+    return ObjMesh(
+        positions=_obj_floats(lines, "v ", 3),
+        uvs=_obj_floats(lines, "vt ", 2),
+        normals=_obj_floats(lines, "vn ", 3),
+        faces=faces,
+        header=header
+    )
+
+def write_obj(mesh: ObjMesh, path: str) -> None:
+    """
+    Scrive una mesh in formato OBJ, mantenendo solo vertici, coordinate UV e normali usati dalle facce.
+
+    Args:
+        mesh: Mesh da scrivere
+        path: Percorso del file OBJ
+    """
+    faces = mesh.faces.copy()
+    arrays = []
+    for component, values in enumerate((mesh.positions, mesh.uvs, mesh.normals)):
+        used = faces[:, :, component]
+        if used.size and used.min() >= 0:
+            unique, inverse = np.unique(used, return_inverse=True)
+            faces[:, :, component] = inverse.reshape(used.shape)
+            arrays.append(values[unique])
+        else:
+            faces[:, :, component] = -1
+            arrays.append(values[:0])
+    positions, uvs, normals = arrays
+    with open(path, 'w', encoding='utf-8') as file:
+        for line in mesh.header[:2]:
+            file.write(line + "\n")
+        np.savetxt(file, positions, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, uvs, fmt="vt %.6f %.6f")
+        np.savetxt(file, normals, fmt="vn %.6f %.6f %.6f")
+        has_uv, has_normal = len(uvs) > 0, len(normals) > 0
+        corner_fmt = "%d" + ("/%d" if has_uv else ("/" if has_normal else "")) + ("/%d" if has_normal else "")
+        columns = [0] + ([1] if has_uv else []) + ([2] if has_normal else [])
+        np.savetxt(file, faces[:, :, columns].reshape(len(faces), -1) + 1,
+                   fmt="f " + " ".join([corner_fmt] * 3))
+
+def _cluster_faces(positions: np.ndarray, faces: np.ndarray, cell: float) -> tuple[np.ndarray, np.ndarray]:
+    # Raggruppa i vertici su una griglia uniforme e rimuove le facce degeneri o duplicate
+    cells = np.floor((positions - positions.min(axis=0)) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    _, clusters = np.unique((cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2], return_inverse=True)
+    clusters = clusters.reshape(-1)
+    corner_clusters = clusters[faces[:, :, 0]]
+    valid = ((corner_clusters[:, 0] != corner_clusters[:, 1]) &
+             (corner_clusters[:, 1] != corner_clusters[:, 2]) &
+             (corner_clusters[:, 0] != corner_clusters[:, 2]))
+    keep = np.flatnonzero(valid)
+    ordered = np.sort(corner_clusters[keep], axis=1)
+    count = int(clusters.max()) + 1
+    _, first = np.unique((ordered[:, 0] * count + ordered[:, 1]) * count + ordered[:, 2], return_index=True)
+    return clusters, keep[np.sort(first)]
+
+def decimate_mesh(mesh: ObjMesh, target_faces: int) -> ObjMesh:
+    """
+    Semplifica la mesh con vertex clustering vettoriale fino a circa target_faces facce.
+    La dimensione della cella viene cercata per bisezione; ogni vertice semplificato è la media
+    dei vertici del proprio cluster, mentre UV e normali restano quelle degli angoli originali.
+
+    Args:
+        mesh: Mesh di partenza
+        target_faces: Numero di facce desiderato
+
+    Returns:
+        ObjMesh: Mesh semplificata
+    """
+    if len(mesh.faces) <= target_faces:
+        return mesh
+    extent = float(np.ptp(mesh.positions, axis=0).max()) or 1.0
+    low, high = extent * 1e-4, extent
+    best = None
+    for _ in range(20):
+        cell = (low * high) ** 0.5
+        clusters, keep = _cluster_faces(mesh.positions, mesh.faces, cell)
+        if len(keep) > target_faces:
+            low = cell
+        else:
+            high = cell
+            best = (clusters, keep)
+        if high / low < 1.02:
+            break
+    if best is None:
+        best = _cluster_faces(mesh.positions, mesh.faces, high)
+    clusters, keep = best
+
+    counts = np.bincount(clusters)
+    positions = np.stack([np.bincount(clusters, weights=mesh.positions[:, axis]) for axis in range(3)], axis=1)
+    positions /= np.maximum(counts, 1)[:, np.newaxis]
+    faces = mesh.faces[keep].copy()
+    faces[:, :, 0] = clusters[faces[:, :, 0]]
+    return ObjMesh(positions=positions, uvs=mesh.uvs, normals=mesh.normals, faces=faces, header=mesh.header)
+
+def lod_folder(export_folder: str, level: int) -> str:
+    """Cartella del livello di dettaglio indicato (0 = mesh esportata)."""
+    if level == 0:
+        return export_folder
+    return f"{os.path.normpath(export_folder)}_lod{level}"
+
+def export_preview_folder(export_folder: str) -> str:
+    """Cartella dell'anteprima a nuvola di punti di un export progressivo."""
+    return f"{os.path.normpath(export_folder)}_pointcloud"
+
+def discard_export_preview(export_folder: str) -> None:
+    """Elimina l'anteprima di un export insieme ai suoi ZIP e GLB."""
+    folder = export_preview_folder(export_folder)
+    shutil.rmtree(folder, ignore_errors=True)
+    for artifact in glob.glob(f"{folder}-*"):
+        try:
+            os.remove(artifact)
+        except OSError:
+            pass
+
+PLY_TYPES = {"char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1", "short": "i2", "int16": "i2",
+             "ushort": "u2", "uint16": "u2", "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+             "float": "f4", "float32": "f4", "double": "f8", "float64": "f8"}
+
+def load_ply_points(path: str) -> tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Legge i vertici di una nuvola di punti PLY (ascii o binaria), come quella scritta da
+    ns-export pointcloud, con una sola lettura vettoriale.
+
+    Args:
+        path: Percorso del file PLY
+
+    Returns:
+        tuple: Posizioni (N, 3), normali (N, 3) e colori uint8 (N, 3); normali e colori None se assenti
+
+    Raises:
+        ValueError: Se il file non è una nuvola di punti PLY supportata
+    """
+    with open(path, 'rb') as file:
+        if file.readline().strip() != b"ply":
+            raise ValueError(f"{path}: file PLY non valido")
+        ply_format, count, properties, element = None, 0, [], None
+        while True:
+            line = file.readline()
+            if not line:
+                raise ValueError(f"{path}: intestazione PLY incompleta")
+            words = line.decode("ascii", "replace").split()
+            if not words or words[0] == "comment":
+                continue
+            if words[0] == "end_header":
+                break
+            if words[0] == "format":
+                ply_format = words[1]
+            elif words[0] == "element":
+                if element is None and words[1] != "vertex":
+                    raise ValueError(f"{path}: i vertici devono essere il primo elemento")
+                element = words[1]
+                if element == "vertex":
+                    count = int(words[2])
+            elif words[0] == "property" and element == "vertex":
+                if words[1] == "list" or words[1] not in PLY_TYPES:
+                    raise ValueError(f"{path}: proprietà {words[1]} non supportata")
+                properties.append((words[2], PLY_TYPES[words[1]]))
+        if ply_format == "ascii":
+            values = np.loadtxt(file, max_rows=count, ndmin=2)
+            columns = {name: values[:, index] for index, (name, _) in enumerate(properties)}
+        elif ply_format in ("binary_little_endian", "binary_big_endian"):
+            endian = "<" if ply_format == "binary_little_endian" else ">"
+            dtype = np.dtype([(name, endian + kind) for name, kind in properties])
+            values = np.frombuffer(file.read(count * dtype.itemsize), dtype=dtype, count=count)
+            columns = {name: values[name] for name, _ in properties}
+        else:
+            raise ValueError(f"{path}: formato PLY {ply_format} non supportato")
+
+    def stack(names: tuple[str, ...]) -> Optional[np.ndarray]:
+        if not all(name in columns for name in names):
+            return None
+        return np.stack([columns[name] for name in names], axis=1)
+
+    positions = stack(("x", "y", "z"))
+    if positions is None:
+        raise ValueError(f"{path}: coordinate dei vertici mancanti")
+    normals = stack(("nx", "ny", "nz"))
+    colors = stack(("red", "green", "blue"))
+    if colors is not None and colors.dtype.kind == "f":
+        colors = np.clip(colors * 255, 0, 255)
+    return (positions.astype(np.float64), None if normals is None else normals.astype(np.float64),
+            None if colors is None else colors.astype(np.uint8))
+
+def pointcloud_to_mesh(ply_path: str, folder: str, obj_name: str = "mesh.obj") -> int:
+    """
+    Converte una nuvola di punti in una mesh di splat visualizzabile dai client OBJ/GLB: ogni
+    punto diventa un piccolo triangolo perpendicolare alla sua normale (su entrambi i lati), e i
+    colori dei punti sono i texel di una texture che segue lo stesso formato dell'export Poisson.
+
+    Args:
+        ply_path: Nuvola di punti PLY
+        folder: Cartella in cui scrivere mesh, materiale e texture
+        obj_name: Nome del file OBJ
+
+    Returns:
+        int: Numero di punti convertiti
+    """
+    positions, normals, colors = load_ply_points(ply_path)
+    count = len(positions)
+    if count == 0:
+        raise ValueError(f"{ply_path}: nuvola di punti vuota")
+    if normals is None:
+        normals = np.tile([0.0, 0.0, 1.0], (count, 1))
+    normals = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    if colors is None:
+        colors = np.full((count, 3), 200, dtype=np.uint8)
+
+    # Raggio degli splat: spaziatura dei punti su una superficie grande quanto quella del loro box
+    low, high = np.percentile(positions, [1, 99], axis=0)
+    extent = np.maximum(high - low, 1e-6)
+    radius = np.sqrt(2 * (extent[0] * extent[1] + extent[1] * extent[2] + extent[2] * extent[0]) / count)
+    helper = np.where(np.abs(normals[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+    tangent = np.cross(normals, helper)
+    tangent /= np.linalg.norm(tangent, axis=1, keepdims=True)
+    bitangent = np.cross(normals, tangent)
+    angles = np.radians([90.0, 210.0, 330.0])[None, :, None]
+    corners = positions[:, None, :] + radius * (np.cos(angles) * tangent[:, None, :]
+                                                + np.sin(angles) * bitangent[:, None, :])
+
+    side = math.ceil(math.sqrt(count))
+    texels = np.arange(count)
+    uvs = np.stack([(texels % side + 0.5) / side, 1.0 - (texels // side + 0.5) / side], axis=1)
+    vertices = np.arange(count * 3).reshape(count, 3)
+    texel_corners = np.repeat(texels[:, None], 3, axis=1)
+    front = np.stack([vertices, texel_corners, texel_corners], axis=-1)
+    back = np.stack([vertices[:, ::-1], texel_corners, texel_corners + count], axis=-1)
+
+    os.makedirs(folder, exist_ok=True)
+    texture = np.zeros((side * side, 3), dtype=np.uint8)
+    texture[:count] = colors
+    Image.fromarray(texture.reshape(side, side, 3)).save(os.path.join(folder, "material_0.png"))
+    with open(os.path.join(folder, "material_0.mtl"), 'w', encoding='utf-8') as file:
+        file.write("newmtl material_0\nKa 1.0 1.0 1.0\nKd 1.0 1.0 1.0\nmap_Kd material_0.png\n")
+    write_obj(ObjMesh(positions=corners.reshape(-1, 3), uvs=uvs, normals=np.concatenate([normals, -normals]),
+                      faces=np.concatenate([front, back]), header=["mtllib material_0.mtl", "usemtl material_0"]),
+              os.path.join(folder, obj_name))
+    logger.info("Anteprima dell'export: %d punti", count)
+    return count
+
+@timed_stage("lod")
+def build_mesh_lods(export_folder: str, obj_name: str = "mesh.obj") -> list[str]:
+    """
+    Crea la catena di LOD della mesh esportata secondo Config.MESH_LOD_FACES. Ogni livello ha una
+    cartella con la propria mesh.obj e i materiali/texture dell'export (collegati, non copiati).
+
+    Args:
+        export_folder: Cartella di export della mesh
+        obj_name: Nome del file OBJ esportato
+
+    Returns:
+        list[str]: Cartelle dei LOD creati, dal più dettagliato al più semplice
+    """
+    mesh = load_obj(os.path.join(export_folder, obj_name))
+    folders = []
+    for level, target_faces in enumerate(config.MESH_LOD_FACES, start=1):
+        folder = lod_folder(export_folder, level)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        for file in os.listdir(export_folder):
+            if file != obj_name and os.path.isfile(os.path.join(export_folder, file)):
+                link_or_copy(os.path.join(export_folder, file), os.path.join(folder, file))
+        lod = decimate_mesh(mesh, target_faces)
+        write_obj(lod, os.path.join(folder, obj_name))
+        logger.info("LOD %d: %d facce", level, len(lod.faces))
+        folders.append(folder)
+    return folders
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+
+def _mesh_texture(export_folder: str, mesh: ObjMesh) -> Optional[str]:
+    # Cerca la texture diffusa (map_Kd) nel file MTL referenziato dalla mesh
+    for line in mesh.header:
+        if line.startswith("mtllib "):
+            mtl_path = os.path.join(export_folder, line[len("mtllib "):].strip())
+            if os.path.isfile(mtl_path):
+                with open(mtl_path, 'r', encoding='utf-8') as file:
+                    for mtl_line in file:
+                        if mtl_line.strip().startswith("map_Kd "):
+                            texture = os.path.join(export_folder, mtl_line.strip()[len("map_Kd "):].strip())
+                            if os.path.isfile(texture):
+                                return texture
+    return None
+
+@timed_stage("glb")
+def write_glb(mesh: ObjMesh, path: str, texture_path: Optional[str] = None) -> int:
+    """
+    Converte la mesh in un file GLB (glTF 2.0 binario): posizioni, normali e UV float32 e indici
+    uint32, con la texture PNG incorporata. Gli angoli delle facce OBJ vengono de-indicizzati nelle
+    combinazioni uniche posizione/UV/normale richieste da glTF, e il buffer binario viene scritto
+    direttamente su un file mappato in memoria.
+
+    Args:
+        mesh: Mesh da convertire
+        path: Percorso del file GLB
+        texture_path: Texture PNG da incorporare (opzionale)
+
+    Returns:
+        int: Numero di vertici scritti
+    """
+    corners = mesh.faces.reshape(-1, 3)
+    has_uv = len(mesh.uvs) > 0 and corners[:, 1].min() >= 0
+    has_normal = len(mesh.normals) > 0 and corners[:, 2].min() >= 0
+    sizes = np.array([len(mesh.positions), len(mesh.uvs) + 1, len(mesh.normals) + 1], dtype=np.int64)
+    keys = ((corners[:, 0] * sizes[1] + (corners[:, 1] + 1)) * sizes[2] + (corners[:, 2] + 1)
+            if np.prod(sizes.astype(np.float64)) < 2 ** 62 else None)
+    if keys is not None:
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+    vertices = corners[first]
+    indices = inverse.reshape(-1).astype(np.uint32)
+
+    # Layout del buffer binario: ogni sezione è allineata a 4 byte
+    sections = [("POSITION", mesh.positions[vertices[:, 0]].astype(np.float32), "VEC3")]
+    if has_normal:
+        sections.append(("NORMAL", mesh.normals[vertices[:, 2]].astype(np.float32), "VEC3"))
+    if has_uv:
+        uvs = mesh.uvs[vertices[:, 1]].astype(np.float32)
+        uvs[:, 1] = 1.0 - uvs[:, 1]  # glTF ha l'origine UV in alto a sinistra
+        sections.append(("TEXCOORD_0", uvs, "VEC2"))
+    sections.append(("indices", indices, "SCALAR"))
+    texture = None
+    if has_uv and texture_path is not None:
+        with open(texture_path, 'rb') as file:
+            texture = np.frombuffer(file.read(), dtype=np.uint8)
+
+    buffer_views, accessors, attributes, offset = [], [], {}, 0
+    for name, data, kind in sections:
+        is_index = name == "indices"
+        buffer_views.append({"buffer": 0, "byteOffset": offset, "byteLength": data.nbytes,
+                             "target": 34963 if is_index else 34962})
+        accessor = {"bufferView": len(buffer_views) - 1, "componentType": 5125 if is_index else 5126,
+                    "count": len(data), "type": kind}
+        if name == "POSITION":
+            accessor["min"] = data.min(axis=0).tolist() if len(data) else [0.0, 0.0, 0.0]
+            accessor["max"] = data.max(axis=0).tolist() if len(data) else [0.0, 0.0, 0.0]
+        accessors.append(accessor)
+        if not is_index:
+            attributes[name] = len(accessors) - 1
+        offset += (data.nbytes + 3) & ~3
+    primitive = {"attributes": attributes, "indices": len(accessors) - 1, "mode": 4}
+    gltf = {
+        "asset": {"version": "2.0", "generator": "HoloNerf"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [primitive]}],
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+    }
+    if texture is not None:
+        buffer_views.append({"buffer": 0, "byteOffset": offset, "byteLength": texture.nbytes})
+        offset += (texture.nbytes + 3) & ~3
+        gltf["images"] = [{"bufferView": len(buffer_views) - 1, "mimeType": "image/png"}]
+        gltf["textures"] = [{"source": 0}]
+        gltf["materials"] = [{"pbrMetallicRoughness": {"baseColorTexture": {"index": 0},
+                                                       "metallicFactor": 0.0}}]
+        primitive["material"] = 0
+    gltf["buffers"] = [{"byteLength": offset}]
+
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode()
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + offset
+    output = np.memmap(path, dtype=np.uint8, mode='w+', shape=(total,))
+    try:
+        output[:20] = np.frombuffer(struct.pack("<IIIII", GLB_MAGIC, 2, total, len(json_chunk), GLB_CHUNK_JSON),
+                                    dtype=np.uint8)
+        output[20:20 + len(json_chunk)] = np.frombuffer(json_chunk, dtype=np.uint8)
+        bin_start = 20 + len(json_chunk) + 8
+        output[bin_start - 8:bin_start] = np.frombuffer(struct.pack("<II", offset, GLB_CHUNK_BIN), dtype=np.uint8)
+        chunks = [data for _, data, _ in sections] + ([texture] if texture is not None else [])
+        for view, data in zip(buffer_views, chunks):
+            start = bin_start + view["byteOffset"]
+            output[start:start + data.nbytes] = np.ascontiguousarray(data).view(np.uint8).reshape(-1)
+        output.flush()
+    finally:
+        del output
+    return len(vertices)
+
+def get_mesh_glb(export_folder: str, obj_name: str = "mesh.obj") -> Optional[tuple[str, str]]:
+    """
+    Restituisce la mesh esportata in formato GLB (mesh-<etag>.glb), convertita una sola volta per export.
+
+    Args:
+        export_folder: Cartella di export della mesh
+        obj_name: Nome del file OBJ esportato
+
+    Returns:
+        Optional[tuple[str, str]]: Percorso del GLB e relativo ETag, None se non c'è nessun export
+    """
+    if not os.path.isfile(os.path.join(export_folder, obj_name)):
+        return None
+
+    def build(path: str) -> None:
+        mesh = load_obj(os.path.join(export_folder, obj_name))
+        write_glb(mesh, path, _mesh_texture(export_folder, mesh))
+
+    return _get_mesh_artifact(export_folder, "glb", build)
+
+MESH_FORMATS = {
+    "zip": (get_mesh_archive, "mesh.zip", "application/zip"),
+    "glb": (get_mesh_glb, "mesh.glb", "model/gltf-binary"),
+}
+
+def get_latest_output_folder(output_folder: str = config.OUTPUT_FOLDER) -> str:
+    """
+    Trova la cartella dell'ultimo training con checkpoint, dal registro dei training.
+    Questo serve a far partire l'esportazione dell'ultimo modello NeRF.
+
+    Args:
+        output_folder: Cartella di output di ns-train del job
+    
+    Returns:
+        str: Percorso della cartella più recente
+    
+    Raises:
+        ValueError: Se non viene trovata nessuna cartella di output
+    """
+    run = run_registry.latest_run(output_folder)
+    if run is None:
+        raise ValueError("Nessuna cartella di output trovata")
+    return run["run_dir"]
+
+def get_export_command(obb_scaleX: float, obb_scaleY: float, obb_scaleZ: float,
+                       output_folder: str = config.OUTPUT_FOLDER,
+                       export_folder: str = config.EXPORT_FOLDER,
+                       preview: bool = False,
+                       run_folder: Optional[str] = None,
+                       obb_center: tuple[float, float, float] = (0.0, 0.0, 0.0),
+                       obb_rotation: tuple[float, float, float] = (0.0, 0.0, 0.0)) -> list[str]:
+    """
+    Genera il comando per esportare il modello NeRF.
+    
+    Args:
+        obb_scaleX/Y/Z: Fattori di scala per il bounding box
+        output_folder: Cartella di output di ns-train del job
+        export_folder: Cartella di destinazione della mesh
+        preview: Se True usa meno punti, facce e una texture più piccola (export rapido)
+        run_folder: Cartella del training da esportare (default: l'ultimo del job)
+        obb_center: Centro del bounding box nello spazio normalizzato del modello
+        obb_rotation: Rotazione del bounding box (roll, pitch, yaw in radianti)
+    
+    Returns:
+        list[str]: Argomenti del comando di esportazione
+    """
+    latest_folder = run_folder or get_latest_output_folder(output_folder)
+    faces, pixels, points = ("10000", "1024", "200000") if preview else ("50000", "2048", "1000000")
+    return ["ns-export", "poisson", "--load-config", os.path.join(latest_folder, "config.yml"),
+            "--output-dir", export_folder, "--target-num-faces", faces,
+            "--num-pixels-per-side", pixels, "--num-points", points, "--remove-outliers", "True",
+            "--normal-method", "open3d", "--obb_center", *(f"{value:.10f}" for value in obb_center),
+            "--obb_rotation", *(f"{value:.10f}" for value in obb_rotation),
+            "--obb_scale", str(obb_scaleX), str(obb_scaleY), str(obb_scaleZ)]
+
+def get_pointcloud_command(run_folder: str, output_dir: str,
+                           obb_center: tuple[float, ...], obb_rotation: tuple[float, ...],
+                           obb_scale: tuple[float, ...]) -> list[str]:
+    """
+    Genera il comando per l'anteprima dell'export: nuvola di punti ridotta nello stesso OBB della
+    mesh, senza ricostruzione Poisson né texture.
+
+    Args:
+        run_folder: Cartella del training da esportare
+        output_dir: Cartella di destinazione di point_cloud.ply
+        obb_center, obb_rotation, obb_scale: Bounding box dell'export
+
+    Returns:
+        list[str]: Argomenti del comando di esportazione
+    """
+    return ["ns-export", "pointcloud", "--load-config", os.path.join(run_folder, "config.yml"),
+            "--output-dir", output_dir, "--num-points", str(config.EXPORT_PREVIEW_POINTS),
+            "--remove-outliers", "True", "--normal-method", "open3d",
+            "--obb_center", *(f"{value:.10f}" for value in obb_center),
+            "--obb_rotation", *(f"{value:.10f}" for value in obb_rotation),
+            "--obb_scale", *(str(value) for value in obb_scale)]
+
+def export_cache_key(export_command: list[str]) -> str:
+    """
+    Calcola la chiave della cache degli export: contenuto del config.yml, checkpoint (nome,
+    dimensione e data di modifica), parametri di ns-export e livelli di dettaglio generati.
+    Le cartelle di input e output non fanno parte della chiave.
+
+    Args:
+        export_command: Comando creato da get_export_command
+
+    Returns:
+        str: Chiave esadecimale
+    """
+    config_path = export_command[export_command.index("--load-config") + 1]
+    digest = hashlib.sha256()
+    with open(config_path, 'rb') as file:
+        digest.update(file.read())
+    for checkpoint in sorted(glob.glob(os.path.join(os.path.dirname(config_path), "nerfstudio_models", "*.ckpt"))):
+        stat = os.stat(checkpoint)
+        digest.update(f"{os.path.basename(checkpoint)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    parameters = [arg for index, arg in enumerate(export_command)
+                  if index == 0 or export_command[index - 1] not in ("--load-config", "--output-dir")]
+    digest.update(json.dumps([parameters, list(config.MESH_LOD_FACES)]).encode())
+    return digest.hexdigest()
+
+class ExportCache(DiskLRUCache):
+    """
+    Cache degli export completati: ogni voce è una cartella con la mesh esportata e i suoi LOD
+    (sottocartelle 0, 1, 2, ...), materializzati con hard link nella cartella di export del job.
+    """
+    label = "l'export"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], key)
+
+    def _scan(self) -> Iterator[tuple[float, str, int]]:
+        if not os.path.isdir(self.folder):
+            return
+        for prefix in os.listdir(self.folder):
+            prefix_path = os.path.join(self.folder, prefix)
+            if not os.path.isdir(prefix_path):
+                # File estranei nella cartella della cache (es. .DS_Store o temporanei rimasti)
+                continue
+            for key in os.listdir(prefix_path):
+                path = os.path.join(prefix_path, key)
+                if "." not in key and os.path.isdir(path):
+                    yield os.path.getmtime(path), key, self._size(path)
+
+    def _size(self, path: str) -> int:
+        return sum(os.path.getsize(os.path.join(root, file))
+                   for root, _, files in os.walk(path) for file in files)
+
+    def _remove(self, path: str) -> None:
+        shutil.rmtree(path)
+
+    def _store(self, src_path: str, path: str) -> None:
+        for level in range(len(config.MESH_LOD_FACES) + 1):
+            folder = lod_folder(src_path, level)
+            if os.path.isdir(folder):
+                _link_folder(folder, os.path.join(path, str(level)))
+
+    def _materialize(self, path: str, dest_path: str) -> None:
+        for level in os.listdir(path):
+            folder = lod_folder(dest_path, int(level))
+            shutil.rmtree(folder, ignore_errors=True)
+            _link_folder(os.path.join(path, level), folder)
+
+def _link_folder(src_folder: str, dest_folder: str) -> None:
+    # Ricrea una cartella piatta collegando (o copiando) i suoi file
+    os.makedirs(dest_folder, exist_ok=True)
+    for file in os.listdir(src_folder):
+        if os.path.isfile(os.path.join(src_folder, file)):
+            link_or_copy(os.path.join(src_folder, file), os.path.join(dest_folder, file))
+
+export_cache = ExportCache(config.EXPORT_CACHE_FOLDER, config.EXPORT_CACHE_MAX_BYTES)
+
+def dataset_frame_keys(frames: list[dict]) -> list[str]:
+    """
+    Identifica i frame di un transforms.json con nome del file e timestamp dell'acquisizione,
+    così che due dataset con gli stessi frame si riconoscano anche dopo un nuovo upload.
+    """
+    return [f"{frame_name(frame['file_path'])}@{frame.get('timestamp')}" for frame in frames]
+
+class RunRegistry:
+    """
+    Registro persistente (SQLite) dei training con i relativi checkpoint, dataset, durata ed
+    export. Sostituisce la ricerca delle cartelle di output tramite glob: l'ultimo training di
+    un job si trova con una query indicizzata, e ogni training resta esportabile tramite il suo id.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            job_id TEXT NOT NULL,
+            data_folder TEXT NOT NULL,
+            output_folder TEXT NOT NULL,
+            export_folder TEXT NOT NULL,
+            run_dir TEXT,
+            preset TEXT,
+            dataset_frames INTEGER,
+            dataset_hash TEXT,
+            status TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            finished_at REAL,
+            size_bytes INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS runs_output ON runs (output_folder, started_at);
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+            path TEXT NOT NULL,
+            step INTEGER,
+            size_bytes INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS checkpoints_run ON checkpoints (run_id);
+        CREATE TABLE IF NOT EXISTS exports (
+            export_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+            parameters TEXT NOT NULL,
+            cache_key TEXT,
+            from_cache INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            duration REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS exports_run ON exports (run_id);
+        CREATE TABLE IF NOT EXISTS run_datasets (
+            run_id TEXT PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+            frames TEXT NOT NULL,
+            base_run_id TEXT,
+            pose_transform TEXT,
+            scene_bounds TEXT,
+            warm_start_error TEXT
+        );
+    """
+    # Colonne aggiunte dopo la creazione delle tabelle: (tabella, colonna, tipo)
+    MIGRATIONS = (("run_datasets", "scene_bounds", "TEXT"), ("run_datasets", "warm_start_error", "TEXT"))
+    CHECKPOINT_STEP_RE = re.compile(r"step-(\d+)\.ckpt$")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Connessione aperta al primo utilizzo e condivisa tra i thread (accesso serializzato dal lock)
+        if self.connection is None:
+            folder = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(folder, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.row_factory = sqlite3.Row
+            self.connection.execute("PRAGMA foreign_keys = ON")
+            self.connection.executescript(self.SCHEMA)
+            for table, column, kind in self.MIGRATIONS:
+                columns = {row["name"] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        return self.connection
+
+    def start_run(self, run_id: str, job: "Job", warm_start: Optional["WarmStart"] = None,
+                  warm_start_error: Optional[str] = None) -> None:
+        """
+        Registra l'avvio di un training con i frame del dataset, l'eventuale training di partenza
+        e l'errore che ha impedito di riprenderlo.
+        """
+        transforms_path = os.path.join(job.data_folder, "transforms.json")
+        dataset_hash, frames, frame_keys, scene_bounds = None, None, None, None
+        if os.path.exists(transforms_path):
+            with open(transforms_path, 'rb') as file:
+                content = file.read()
+            dataset_hash = hashlib.sha1(content).hexdigest()
+            transforms = json.loads(content)
+            frame_keys = dataset_frame_keys(transforms["frames"])
+            frames = len(frame_keys)
+            scene_bounds = transforms.get("scene_bounds")
+        with self.lock, self._db() as db:
+            db.execute(
+                "INSERT INTO runs (run_id, job_id, data_folder, output_folder, export_folder, preset,"
+                " dataset_frames, dataset_hash, status, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'running', ?)",
+                (run_id, job.job_id, job.data_folder, job.output_folder, job.export_folder, job.preset,
+                 frames, dataset_hash, time.time())
+            )
+            if frame_keys is not None:
+                db.execute(
+                    "INSERT INTO run_datasets (run_id, frames, base_run_id, pose_transform, scene_bounds,"
+                    " warm_start_error) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, json.dumps(frame_keys), warm_start.base_run_id if warm_start else None,
+                     json.dumps(warm_start.pose_transform) if warm_start else None,
+                     json.dumps(scene_bounds) if scene_bounds else None, warm_start_error)
+                )
+
+    def finish_run(self, run_id: str, status: str) -> Optional[dict]:
+        """
+        Registra la fine di un training: individua la cartella creata da ns-train (che ha come
+        timestamp l'id del training) e ne registra checkpoint e dimensione.
+
+        Returns:
+            Optional[dict]: Training aggiornato, None se non registrato
+        """
+        with self.lock, self._db() as db:
+            row = db.execute("SELECT output_folder FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run_dirs = glob.glob(os.path.join(row["output_folder"], "*", "*", run_id))
+            run_dir = run_dirs[0] if run_dirs else None
+            size = 0
+            db.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            if run_dir is not None:
+                for root, _, files in os.walk(run_dir):
+                    size += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+                for checkpoint in glob.glob(os.path.join(run_dir, "nerfstudio_models", "*.ckpt")):
+                    match = self.CHECKPOINT_STEP_RE.search(checkpoint)
+                    db.execute("INSERT INTO checkpoints (run_id, path, step, size_bytes) VALUES (?, ?, ?, ?)",
+                               (run_id, checkpoint, int(match.group(1)) if match else None,
+                                os.path.getsize(checkpoint)))
+            db.execute("UPDATE runs SET run_dir = ?, status = ?, finished_at = ?, size_bytes = ? WHERE run_id = ?",
+                       (run_dir, status, time.time(), size, run_id))
+        return self.get_run(run_id)
+
+    def set_status(self, run_id: str, status: str) -> None:
+        """Aggiorna lo stato di un training."""
+        with self.lock, self._db() as db:
+            db.execute("UPDATE runs SET status = ? WHERE run_id = ?", (status, run_id))
+
+    def add_export(self, run_id: str, parameters: list[str], cache_key: Optional[str],
+                   from_cache: bool, duration: float) -> None:
+        """Registra un export completato del training."""
+        with self.lock, self._db() as db:
+            db.execute(
+                "INSERT INTO exports (run_id, parameters, cache_key, from_cache, created_at, duration)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, json.dumps(parameters), cache_key, int(from_cache), time.time(), duration)
+            )
+
+    def _run_dict(self, db: sqlite3.Connection, row: sqlite3.Row) -> dict:
+        run = dict(row)
+        run["duration"] = run["finished_at"] - run["started_at"] if run["finished_at"] else None
+        run["checkpoints"] = [dict(checkpoint) for checkpoint in db.execute(
+            "SELECT path, step, size_bytes FROM checkpoints WHERE run_id = ? ORDER BY step", (run["run_id"],))]
+        run["exports"] = [dict(export, parameters=json.loads(export["parameters"])) for export in db.execute(
+            "SELECT export_id, parameters, cache_key, from_cache, created_at, duration FROM exports"
+            " WHERE run_id = ? ORDER BY created_at", (run["run_id"],))]
+        dataset = db.execute("SELECT base_run_id, warm_start_error FROM run_datasets WHERE run_id = ?",
+                             (run["run_id"],)).fetchone()
+        run["base_run_id"] = dataset["base_run_id"] if dataset else None
+        run["warm_start_error"] = dataset["warm_start_error"] if dataset else None
+        return run
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        """Restituisce un training con checkpoint ed export, se esiste."""
+        with self.lock:
+            db = self._db()
+            row = db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            return self._run_dict(db, row) if row else None
+
+    def list_runs(self, job_id: Optional[str] = None) -> list[dict]:
+        """Elenca i training registrati, dal più recente, eventualmente filtrati per job."""
+        with self.lock:
+            db = self._db()
+            if job_id:
+                rows = db.execute("SELECT * FROM runs WHERE job_id = ? ORDER BY started_at DESC", (job_id,))
+            else:
+                rows = db.execute("SELECT * FROM runs ORDER BY started_at DESC")
+            return [self._run_dict(db, row) for row in rows.fetchall()]
+
+    def latest_run(self, output_folder: str) -> Optional[dict]:
+        """Ultimo training con almeno un checkpoint per la cartella di output indicata."""
+        with self.lock:
+            row = self._db().execute(
+                "SELECT run_id, run_dir FROM runs WHERE output_folder = ? AND run_dir IS NOT NULL"
+                " AND EXISTS (SELECT 1 FROM checkpoints WHERE checkpoints.run_id = runs.run_id)"
+                " ORDER BY started_at DESC LIMIT 1", (output_folder,)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def find_base_run(self, output_folder: str, frame_keys: list[str]) -> Optional[dict]:
+        """
+        Ultimo training completato della cartella di output il cui dataset è contenuto in quello
+        indicato (stessi frame, eventualmente con altri frame aggiunti): è il punto di partenza
+        di un training incrementale.
+
+        Returns:
+            Optional[dict]: Training di partenza, None se nessun training è compatibile
+        """
+        keys = set(frame_keys)
+        with self.lock:
+            db = self._db()
+            rows = db.execute(
+                "SELECT runs.*, run_datasets.frames AS frame_keys FROM runs JOIN run_datasets USING (run_id)"
+                " WHERE output_folder = ? AND status = 'completed' AND run_dir IS NOT NULL"
+                " AND EXISTS (SELECT 1 FROM checkpoints WHERE checkpoints.run_id = runs.run_id)"
+                " ORDER BY started_at DESC", (output_folder,)
+            ).fetchall()
+            for row in rows:
+                if keys.issuperset(json.loads(row["frame_keys"])):
+                    run = self._run_dict(db, row)
+                    run["frame_keys"] = json.loads(run["frame_keys"])
+                    return run
+        return None
+
+    def pose_transform(self, run_id: str) -> Optional[dict]:
+        """Trasformazione delle pose applicata al dataset di un training incrementale, se registrata."""
+        with self.lock:
+            row = self._db().execute("SELECT pose_transform FROM run_datasets WHERE run_id = ?",
+                                     (run_id,)).fetchone()
+        return json.loads(row["pose_transform"]) if row and row["pose_transform"] else None
+
+    def scene_bounds(self, run_id: str) -> Optional[SceneBounds]:
+        """Bordi della scena del dataset di un training (coordinate del transforms.json), se registrati."""
+        with self.lock:
+            row = self._db().execute("SELECT scene_bounds FROM run_datasets WHERE run_id = ?",
+                                     (run_id,)).fetchone()
+        return SceneBounds(**json.loads(row["scene_bounds"])) if row and row["scene_bounds"] else None
+
+    def apply_retention(self, max_age_days: Optional[float], max_bytes: Optional[int]) -> list[str]:
+        """
+        Elimina i training più vecchi di max_age_days e, dal meno recente, quelli che eccedono
+        max_bytes, insieme ai loro export in cache. L'ultimo training con checkpoint di ogni cartella
+        di output (quello restituito da latest_run e usato dall'export) e i training in corso non
+        vengono mai eliminati, anche se dopo di esso ci sono training falliti o interrotti.
+
+        Returns:
+            list[str]: Id dei training eliminati
+        """
+        with self.lock:
+            db = self._db()
+            rows = db.execute(
+                "SELECT run_id, run_dir, started_at, size_bytes FROM runs WHERE status != 'running'"
+                " AND run_id NOT IN (SELECT run_id FROM runs AS latest WHERE started_at ="
+                " (SELECT MAX(started_at) FROM runs WHERE output_folder = latest.output_folder"
+                " AND run_dir IS NOT NULL"
+                " AND EXISTS (SELECT 1 FROM checkpoints WHERE checkpoints.run_id = runs.run_id)))"
+                " ORDER BY started_at"
+            ).fetchall()
+            total = db.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM runs").fetchone()[0]
+            min_started = time.time() - max_age_days * 86400 if max_age_days is not None else None
+            evicted = []
+            for row in rows:
+                too_old = min_started is not None and row["started_at"] < min_started
+                over_budget = max_bytes is not None and total > max_bytes
+                if not (too_old or over_budget):
+                    continue
+                if row["run_dir"]:
+                    shutil.rmtree(row["run_dir"], ignore_errors=True)
+                for export in db.execute("SELECT cache_key FROM exports WHERE run_id = ?", (row["run_id"],)):
+                    if export["cache_key"]:
+                        export_cache.discard(export["cache_key"])
+                with db:
+                    db.execute("DELETE FROM runs WHERE run_id = ?", (row["run_id"],))
+                total -= row["size_bytes"]
+                evicted.append(row["run_id"])
+        if evicted:
+            logger.info("Eliminati %d training dal registro: %s", len(evicted), ", ".join(evicted))
+        return evicted
+
+    def import_existing(self, job: "Job") -> int:
+        """
+        Registra le cartelle di output create prima dell'introduzione del registro (una sola volta).
+
+        Returns:
+            int: Numero di training importati
+        """
+        imported = 0
+        for config_path in glob.glob(os.path.join(job.output_folder, "*", "*", "*", "config.yml")):
+            run_dir = os.path.dirname(config_path)
+            run_id = os.path.basename(run_dir)
+            with self.lock, self._db() as db:
+                if db.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone():
+                    continue
+                started_at = os.path.getmtime(config_path)
+                db.execute(
+                    "INSERT INTO runs (run_id, job_id, data_folder, output_folder, export_folder, status, started_at)"
+                    " VALUES (?, ?, ?, ?, ?, 'completed', ?)",
+                    (run_id, job.job_id, job.data_folder, job.output_folder, job.export_folder, started_at)
+                )
+            self.finish_run(run_id, "completed")
+            imported += 1
+        return imported
+
+run_registry = RunRegistry(config.RUN_REGISTRY_PATH)
+
+@dataclass
+class WarmStart:
+    """Punto di partenza di un training incrementale."""
+    base_run_id: str
+    checkpoint: str  # checkpoint del training di partenza adattato alle immagini del nuovo dataset
+    data_path: str  # transforms.json con le pose già nello spazio normalizzato del training di partenza
+    pose_transform: dict  # trasformazione e scala applicate alle pose (come dataparser_transforms.json)
+
+class WarmStartError(Exception):
+    """Esiste un training precedente compatibile, ma non è stato possibile riprenderlo."""
+    def __init__(self, base_run_id: str, message: str):
+        super().__init__(message)
+        self.base_run_id = base_run_id
+
+def get_train_command(data_folder: str, output_folder: str,
+                      preset: Optional[TrainingPreset] = None,
+                      run_id: Optional[str] = None,
+                      warm_start: Optional[WarmStart] = None,
+                      far_plane: Optional[float] = None) -> list[str]:
+    """
+    Genera il comando di training a partire da Config.NERFSTUDIO_TRAIN_COMMAND.
+
+    Args:
+        data_folder: Cartella dati del job
+        output_folder: Cartella di output di ns-train del job
+        preset: Preset di training (iterazioni, frequenza dei checkpoint e downscale)
+        run_id: Id del training, usato da ns-train come nome della cartella di output
+        warm_start: Checkpoint e dataset da cui riprendere per un raffinamento breve
+        far_plane: Distanza massima di campionamento dei raggi (spazio normalizzato)
+
+    Returns:
+        list[str]: Argomenti del comando di training
+    """
+    data = warm_start.data_path if warm_start else data_folder
+    argv = [token.format(data_folder=data, output_folder=output_folder)
+            for token in config.NERFSTUDIO_TRAIN_COMMAND.split()]
+    if run_id is not None:
+        argv += ["--timestamp", run_id]
+    if far_plane is not None:
+        argv += ["--pipeline.model.far-plane", f"{far_plane:.4f}"]
+    dataparser = []
+    if warm_start is not None:
+        # Le pose sono già normalizzate: nerfstudio-data non deve riorientarle né riscalarle
+        argv += ["--load-checkpoint", warm_start.checkpoint,
+                 "--max-num-iterations", str(config.WARM_START_ITERATIONS)]
+        dataparser += ["--orientation-method", "none", "--center-method", "none", "--auto-scale-poses", "False"]
+    if preset is not None:
+        if warm_start is None:
+            argv += ["--max-num-iterations", str(preset.max_iterations)]
+        argv += ["--steps-per-save", str(preset.steps_per_save)]
+        dataparser += ["--downscale-factor", str(preset.downscale_factor)]
+    if dataparser:
+        argv += ["nerfstudio-data"] + dataparser
+    return argv
+
+class ManagedProcess:
+    """
+    Processo nerfstudio avviato direttamente (senza shell), con lettura non bloccante dell'output:
+    un thread legge le righe di stdout/stderr e le inserisce in una coda, terminata da None.
+    Espone is_alive/terminate/join come multiprocessing.Process.
+    """
+    def __init__(self, argv: list[str], env: dict[str, str]):
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        self.argv = argv
+        self.process = subprocess.Popen(
+            argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=env,
+            encoding="utf-8",
+            errors="replace",
+            **kwargs
+        )
+        self.output: queue.Queue = queue.Queue()
+        self.reader = threading.Thread(target=self._read_output, daemon=True)
+        self.reader.start()
+
+    def _read_output(self) -> None:
+        for line in iter(self.process.stdout.readline, ""):
+            self.output.put(line)
+        self.process.stdout.close()
+        returncode = self.process.wait()
+        if returncode != 0:
+            self.output.put(f"Errore: {os.path.basename(self.argv[0])} terminato con codice {returncode}")
+        self.output.put(None)
+
+    def is_alive(self) -> bool:
+        """Indica se il processo è ancora in esecuzione."""
+        return self.process.poll() is None
+
+    def terminate(self, timeout: float = 10) -> None:
+        """Termina il processo e i suoi figli (ns-train avvia worker propri)."""
+        if not self.is_alive():
+            return
+        try:
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/T", "/F", "/PID", str(self.process.pid)],
+                               capture_output=True, check=False)
+            else:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        except ProcessLookupError:
+            pass
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Attende la fine del processo e della lettura dell'output."""
+        self.process.wait(timeout)
+        self.reader.join(timeout)
+
+class NerfstudioLauncher:
+    """
+    Risolve una sola volta l'ambiente Conda di nerfstudio (prefisso, PATH ed eseguibili) e avvia
+    ns-train / ns-export direttamente, senza "conda activate" né una shell intermedia.
+    """
+    def __init__(self, env_name: str):
+        self.env_name = env_name
+        self.lock = threading.Lock()
+        self.prefix: Optional[str] = None
+        self.env: Optional[dict[str, str]] = None
+        self.search_path: Optional[str] = None
+        self.executables: dict[str, str] = {}
+
+    def _find_prefix(self) -> Optional[str]:
+        if os.path.isdir(self.env_name):
+            return os.path.abspath(self.env_name)
+        if os.environ.get("CONDA_DEFAULT_ENV") == self.env_name and os.environ.get("CONDA_PREFIX"):
+            return os.environ["CONDA_PREFIX"]
+        conda = os.environ.get("CONDA_EXE") or shutil.which("conda")
+        if conda is None:
+            return None
+        try:
+            result = subprocess.run([conda, "env", "list", "--json"], capture_output=True,
+                                    text=True, timeout=120, check=True)
+            for prefix in json.loads(result.stdout).get("envs", []):
+                if os.path.basename(os.path.normpath(prefix)) == self.env_name:
+                    return prefix
+        except (OSError, subprocess.SubprocessError, ValueError) as e:
+            logger.warning("Impossibile interrogare conda: %s", e)
+        return None
+
+    def resolve(self) -> None:
+        """Risolve prefisso e variabili d'ambiente; le chiamate successive non hanno effetto."""
+        with self.lock:
+            if self.env is not None:
+                return
+            env = os.environ.copy()
+            env["PYTHONIOENCODING"] = "utf-8"
+            env["PYTHONUNBUFFERED"] = "1"
+            prefix = self._find_prefix()
+            if prefix is None:
+                logger.warning("Ambiente Conda %s non trovato, uso il PATH corrente", self.env_name)
+            else:
+                if sys.platform == "win32":
+                    bin_dirs = [prefix, os.path.join(prefix, "Scripts"),
+                                os.path.join(prefix, "Library", "mingw-w64", "bin"),
+                                os.path.join(prefix, "Library", "usr", "bin"),
+                                os.path.join(prefix, "Library", "bin")]
+                else:
+                    bin_dirs = [os.path.join(prefix, "bin")]
+                env["PATH"] = os.pathsep.join(bin_dirs + [env.get("PATH", "")])
+                env["CONDA_PREFIX"] = prefix
+                env["CONDA_DEFAULT_ENV"] = self.env_name
+                logger.info("Ambiente Conda %s: %s", self.env_name, prefix)
+            self.prefix = prefix
+            self.search_path = env.get("PATH")
+            self.env = env
+
+    def executable(self, name: str) -> str:
+        """Restituisce il percorso assoluto di un eseguibile dell'ambiente (memorizzato in cache)."""
+        self.resolve()
+        if name not in self.executables:
+            path = shutil.which(name, path=self.search_path)
+            if path is None:
+                raise FileNotFoundError(f"Eseguibile {name} non trovato nell'ambiente {self.env_name}")
+            self.executables[name] = path
+        return self.executables[name]
+
+    def start(self, argv: list[str]) -> ManagedProcess:
+        """Avvia un comando nerfstudio come processo gestito."""
+        return ManagedProcess([self.executable(argv[0])] + list(argv[1:]), self.env)
+
+launcher = NerfstudioLauncher(config.CONDA_ENV)
+
+# Eseguito con il Python dell'ambiente nerfstudio (che ha torch): riordina gli embedding di
+# aspetto e le correzioni delle pose del checkpoint sulle immagini di training del nuovo dataset
+# (argv[3]: per ogni nuova immagine la riga nel checkpoint, -1 se è un frame nuovo), insieme ai
+# relativi stati dell'ottimizzatore, così che il checkpoint si carichi sul nuovo dataset.
+PAD_CHECKPOINT_SCRIPT = """
+import json
+import sys
+import torch
+
+source, target, rows = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+index = torch.tensor([max(row, 0) for row in rows], dtype=torch.long)
+new = torch.tensor([row < 0 for row in rows], dtype=torch.bool)
+checkpoint = torch.load(source, map_location="cpu", weights_only=False)
+pipeline = checkpoint["pipeline"]
+shapes = set()
+for key, value in list(pipeline.items()):
+    if key.endswith("embedding_appearance.embedding.weight"):
+        fill = value.mean(0)
+    elif key.endswith("camera_optimizer.pose_adjustment"):
+        fill = value.new_zeros(value.shape[1:])
+    else:
+        continue
+    shapes.add(tuple(value.shape))
+    value = value[index].clone()
+    value[new] = fill
+    pipeline[key] = value
+for optimizer in checkpoint.get("optimizers", {}).values():
+    for state in optimizer.get("state", {}).values():
+        for name, value in list(state.items()):
+            if torch.is_tensor(value) and tuple(value.shape) in shapes:
+                value = value[index].clone()
+                value[new] = 0
+                state[name] = value
+torch.save(checkpoint, target)
+"""
+
+def nerfstudio_train_frames(frame_keys: list[str]) -> list[str]:
+    """
+    Frame usati per il training da nerfstudio-data, nell'ordine dei suoi indici: i frame sono
+    ordinati per nome e ne viene preso un sottoinsieme equispaziato (train_split_fraction).
+    """
+    keys = sorted(frame_keys)
+    count = math.ceil(len(keys) * config.WARM_START_TRAIN_SPLIT)
+    return [keys[i] for i in np.linspace(0, len(keys) - 1, count, dtype=int)]
+
+def get_pose_transform(run: dict) -> tuple[np.ndarray, float]:
+    """
+    Trasformazione (4x4) e scala che portano le pose del transforms.json del job nello spazio
+    normalizzato del modello di un training, come in dataparser_transforms.json di nerfstudio.
+    Per i training incrementali è quella applicata al dataset dal training di partenza.
+    """
+    pose_transform = run_registry.pose_transform(run["run_id"])
+    if pose_transform is None:
+        with open(os.path.join(run["run_dir"], "dataparser_transforms.json"), encoding="utf-8") as file:
+            pose_transform = json.load(file)
+    transform = np.vstack([np.asarray(pose_transform["transform"], dtype=np.float64), [0, 0, 0, 1]])
+    return transform, float(pose_transform["scale"])
+
+def get_export_obb(run: dict) -> Optional[tuple[tuple[float, ...], tuple[float, ...], tuple[float, ...]]]:
+    """
+    OBB automatico per l'export di un training: i bordi della scena calcolati dalle pose del suo
+    dataset, portati nello spazio normalizzato del modello.
+
+    Returns:
+        Optional[tuple]: Centro, rotazione (roll, pitch, yaw) e scala, None se non disponibili
+    """
+    scene_bounds = run_registry.scene_bounds(run["run_id"])
+    if scene_bounds is None:
+        return None
+    try:
+        transform, scale = get_pose_transform(run)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Trasformazione delle pose del training %s non disponibile: %s", run["run_id"], e)
+        return None
+    center = (transform @ np.append(scene_bounds.center, 1.0))[:3] * scale
+    rotation = matrix_to_rpy(transform[:3, :3] @ rpy_to_matrix(scene_bounds.rotation))
+    return (tuple(center.tolist()), tuple(rotation.tolist()),
+            tuple(round(value * scale, 6) for value in scene_bounds.scale))
+
+def get_far_plane(scene_bounds: SceneBounds, warm_start: Optional[WarmStart] = None) -> Optional[float]:
+    """
+    Far plane di nerfacto nello spazio normalizzato: distanza massima tra una camera e l'OBB della
+    scena. Senza un training di partenza la scala di nerfstudio-data (che porta le camere centrate
+    dentro [-1, 1]) non è ancora nota e si usa il suo limite superiore, sqrt(3) / raggio delle camere.
+    """
+    if warm_start is not None:
+        return scene_bounds.far * warm_start.pose_transform["scale"]
+    if scene_bounds.camera_radius <= 1e-6:
+        return None
+    return scene_bounds.far * math.sqrt(3) / scene_bounds.camera_radius
+
+def prepare_warm_start(job: "Job", run_id: str) -> Optional[WarmStart]:
+    """
+    Prepara un training incrementale se il dataset del job estende quello di un training
+    precedente: riporta le pose nello spazio normalizzato di quel training (così il modello
+    resta allineato) e ne adatta l'ultimo checkpoint alle immagini del nuovo dataset.
+
+    Args:
+        job: Job da addestrare, con il transforms.json già aggiornato
+        run_id: Id del nuovo training
+
+    Returns:
+        Optional[WarmStart]: Punto di partenza, None se nessun training precedente è compatibile
+
+    Raises:
+        WarmStartError: Se il training compatibile esiste ma pose o checkpoint non sono adattabili
+    """
+    with open(os.path.join(job.data_folder, "transforms.json"), encoding="utf-8") as file:
+        transforms = json.load(file)
+    frames = transforms["frames"]
+    transforms.pop("scene_bounds", None)  # nelle coordinate originali, non in quelle del nuovo file
+    frame_keys = dataset_frame_keys(frames)
+    base = run_registry.find_base_run(job.output_folder, frame_keys)
+    if base is None:
+        logger.info("Job %s: nessun training precedente compatibile, training completo", job.job_id)
+        return None
+    try:
+        transform, scale = get_pose_transform(base)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Job %s: trasformazione delle pose del training %s non disponibile: %s",
+                       job.job_id, base["run_id"], e)
+        raise WarmStartError(base["run_id"], f"Trasformazione delle pose non disponibile: {e}") from e
+
+    matrices = transform @ np.asarray([frame["transform_matrix"] for frame in frames], dtype=np.float64)
+    matrices[:, :3, 3] *= scale
+    transforms["frames"] = ({**frame, "transform_matrix": matrix}
+                            for frame, matrix in zip(frames, matrices.tolist()))
+    data_path = os.path.join(job.data_folder, "transforms_warm_start.json")
+    write_transforms_json(transforms, data_path)
+
+    checkpoint = max(base["checkpoints"], key=lambda checkpoint: checkpoint["step"] or 0)["path"]
+    warm_folder = os.path.join(job.output_folder, "warm_start", run_id)
+    os.makedirs(warm_folder, exist_ok=True)
+    padded = os.path.join(warm_folder, os.path.basename(checkpoint))
+    base_rows = {key: row for row, key in enumerate(nerfstudio_train_frames(base["frame_keys"]))}
+    rows = [base_rows.get(key, -1) for key in nerfstudio_train_frames(frame_keys)]
+    try:
+        subprocess.run([launcher.executable("python"), "-c", PAD_CHECKPOINT_SCRIPT, checkpoint, padded,
+                        json.dumps(rows)], env=launcher.env, capture_output=True, text=True,
+                       timeout=600, check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        detail = getattr(e, "stderr", None) or str(e)
+        detail = detail.strip().splitlines()[-1] if detail.strip() else str(e)
+        logger.warning("Job %s: adattamento del checkpoint %s fallito: %s", job.job_id, checkpoint, detail)
+        shutil.rmtree(warm_folder, ignore_errors=True)
+        raise WarmStartError(base["run_id"], f"Adattamento del checkpoint fallito: {detail}") from e
+    pose_transform = {"transform": transform[:3].tolist(), "scale": scale}
+    return WarmStart(base["run_id"], padded, data_path, pose_transform)
+
+def prepare_training_data(data_folder: str, keyframes: bool = False) -> Optional[KeyframeReport]:
+    """
+    Verifica il dataset del job e crea il file transforms.json.
+
+    Args:
+        data_folder: Cartella dati del job
+        keyframes: Se True nel transforms.json vengono scritti solo i keyframe
+
+    Returns:
+        Optional[KeyframeReport]: Esito della selezione dei keyframe, None se non richiesta
+
+    Raises:
+        ValueError: Se le immagini sono meno di 50 o i dati non sono validi
+    """
+    # Controlla che ci siano almeno 50 immagini
+    image_files = glob.glob(os.path.join(data_folder, "images", "*.jpg"))
+    if len(image_files) < 50:
+        raise ValueError("Numero insufficiente di immagini per il training (minimo 50 foto)")
+
+    # Crea il file transforms.json
+    return create_transforms_json(
+        rgb_dir=os.path.join(data_folder, "images", "*.jpg"),
+        intrinsics_path=os.path.join(data_folder, "intrinsics.txt"),
+        extrinsics_path=os.path.join(data_folder, "images", "coordinates.txt"),
+        output_path=data_folder,
+        keyframes=keyframes
+    )
+
+def start_live_capture(data_folder: str, intrinsics: bytes) -> None:
+    """
+    Prepara la cartella dati per un'acquisizione inviata frame per frame: salva gli intrinseci e
+    crea coordinates.txt e un transforms.json senza frame, a cui add_live_frame aggiunge i frame.
+
+    Args:
+        data_folder: Cartella dati del job
+        intrinsics: Contenuto del file intrinsics.txt del client
+
+    Raises:
+        ValueError: Se gli intrinseci non sono validi
+    """
+    os.makedirs(os.path.join(data_folder, "images"), exist_ok=True)
+    clear_data_folder(data_folder)
+    intrinsics_path = os.path.join(data_folder, "intrinsics.txt")
+    with open(intrinsics_path, "wb") as file:
+        file.write(intrinsics)
+    values = parse_intrinsics(intrinsics_path)
+    W, H = map(int, values[-2:])
+    open(os.path.join(data_folder, "images", "coordinates.txt"), "w", encoding="utf-8").close()
+    # Ogni frame accettato ha anche la piramide completa, quindi i fattori sono noti da subito
+    write_transforms_json(
+        create_transforms_dict([], np.empty((0, 4, 4)), np.empty(0),
+                               values[0], values[4], values[2], values[5], W, H, config.DOWNSCALE_FACTORS),
+        os.path.join(data_folder, "transforms.json")
+    )
+
+@timed_stage("live_frame")
+def add_live_frame(data_folder: str, name: str, data: bytes, pose_row: str, first: bool) -> bool:
+    """
+    Aggiunge un frame a un'acquisizione avviata con start_live_capture: ridimensiona l'immagine
+    (con la sua piramide), aggiunge la riga di posa a coordinates.txt e il frame al transforms.json.
+    I frame devono arrivare in ordine, perché la riga di coordinates.txt è il numero del frame.
+
+    Args:
+        data_folder: Cartella dati del job
+        name: Nome del file del frame (es. 000042.jpg)
+        data: Contenuto JPEG del frame
+        pose_row: Riga di coordinates.txt del frame (timestamp e matrice 4x4)
+        first: True per il primo frame dell'acquisizione
+
+    Returns:
+        bool: True se il frame era già nella cache dei frame
+
+    Raises:
+        ValueError: Se la posa o l'immagine non sono valide
+    """
+    values = _parse_floats(pose_row)
+    if values.size != COORDINATES_COLUMNS or not np.all(np.isfinite(values)):
+        raise ValueError("Posa non valida")
+    batch = ImageResizeBatch(max_pending=1)
+    cached = submit_frame(batch, data, os.path.join(data_folder, "images", name), name)
+    errors = batch.wait()
+    if errors:
+        raise ValueError(errors[0][1])
+    with open(os.path.join(data_folder, "images", "coordinates.txt"), "a", encoding="utf-8") as file:
+        file.write(pose_row.strip() + "\n")
+    frame = next(iter_transforms_frames([name], convert_poses(values[1:].reshape(1, 4, 4)), values[:1]))
+    append_transforms_frame(os.path.join(data_folder, "transforms.json"), frame, first)
+    return cached
+
+@dataclass
+class TrainingStatus:
+    """Ultimi valori estratti dall'output di ns-train."""
+    step: Optional[int] = None
+    percent: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    loss: Optional[float] = None
+
+class NerfstudioOutputParser:
+    """
+    Parser incrementale dell'output di ns-train. Riconosce l'intestazione della tabella di
+    avanzamento di nerfstudio ("Step (% Done)  Train Iter (time)  ETA (time) ...") e ne usa le
+    colonne per estrarre step, percentuale, ETA ed eventuale loss dalle righe successive.
+    Gli errori vengono riconosciuti solo da traceback e righe "XxxError:", non da qualsiasi
+    riga che contenga la parola "Error".
+    """
+    PROGRESS_RE = re.compile(r"^\s*(\d+)\s+\((\d+(?:\.\d+)?)%\)")
+    HEADER_RE = re.compile(r"^\s*Step \(% Done\)")
+    COLUMN_SPLIT_RE = re.compile(r"\s{2,}")
+    ETA_PART_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(ms|d|h|m|s)\b")
+    LOSS_RE = re.compile(r"\bloss\b[^\d\n-]{0,3}([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)", re.IGNORECASE)
+    ERROR_RE = re.compile(r"^(?:Traceback \(most recent call last\)|[\w.]*(?:Error|Exception):|Errore)")
+    INSUFFICIENT_IMAGES = "Numero insufficiente di immagini per il training"
+    ETA_UNITS = {"d": 86400.0, "h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+    def __init__(self):
+        self.columns: Optional[list[str]] = None
+        self.status = TrainingStatus()
+
+    @classmethod
+    def is_error(cls, line: str) -> bool:
+        """Indica se la riga segnala un errore fatale."""
+        return cls.ERROR_RE.match(line.lstrip()) is not None
+
+    @classmethod
+    def parse_eta(cls, text: str) -> Optional[float]:
+        """Converte un ETA di nerfstudio (es. "1 h, 2 m, 3 s") in secondi."""
+        parts = cls.ETA_PART_RE.findall(text)
+        if not parts:
+            return None
+        return sum(float(value) * cls.ETA_UNITS[unit] for value, unit in parts)
+
+    def feed(self, line: str) -> str:
+        """
+        Analizza una riga di output aggiornando lo stato.
+
+        Returns:
+            str: "progress", "error", "insufficient_images" oppure "other"
+        """
+        if self.INSUFFICIENT_IMAGES in line:
+            return "insufficient_images"
+        if self.is_error(line):
+            return "error"
+        if self.HEADER_RE.match(line):
+            self.columns = self.COLUMN_SPLIT_RE.split(line.strip())
+            return "other"
+        match = self.PROGRESS_RE.match(line)
+        if match is None:
+            return "other"
+        self.status.step = int(match.group(1))
+        self.status.percent = float(match.group(2))
+        if self.columns:
+            values = self.COLUMN_SPLIT_RE.split(line.strip())
+            for column, value in zip(self.columns, values):
+                if column.startswith("ETA"):
+                    self.status.eta_seconds = self.parse_eta(value)
+                elif "loss" in column.lower():
+                    try:
+                        self.status.loss = float(value.split()[0])
+                    except (ValueError, IndexError):
+                        pass
+        loss = self.LOSS_RE.search(line)
+        if loss is not None:
+            self.status.loss = float(loss.group(1))
+        return "progress"
+
+DEFAULT_JOB_ID = "default"
+
+class EventBroadcaster:
+    """
+    Distribuisce gli eventi di avanzamento di un job ai client in ascolto (Server-Sent Events).
+    Ogni iscritto ha una coda limitata: se un client è lento gli eventi più vecchi vengono scartati,
+    così i thread di monitoraggio non si bloccano mai.
+    """
+    def __init__(self, max_queued: int = 100):
+        self.max_queued = max_queued
+        self.subscribers: list[queue.Queue] = []
+        self.lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        """Registra un nuovo client e ne restituisce la coda degli eventi."""
+        subscriber = queue.Queue(maxsize=self.max_queued)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        """Rimuove un client, ad esempio alla chiusura della connessione."""
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def publish(self, event: str, data: dict) -> None:
+        """Invia un evento a tutti i client iscritti."""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait((event, data))
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+class Job:
+    """Acquisizione con cartelle dati, output ed export dedicate e stato dei relativi processi."""
+    def __init__(self, job_id: str, data_folder: str, output_folder: str, export_folder: str):
+        self.job_id = job_id
+        self.data_folder = data_folder
+        self.output_folder = output_folder
+        self.export_folder = export_folder
+        self.created_at = time.time()
+        self.phase = "created"
+        self.state = ProcessState()
+        self.training_ticket = 0
+        self.events = EventBroadcaster()
+        self.training_status = TrainingStatus()
+        self.training_log: deque[str] = deque(maxlen=config.TRAINING_LOG_LINES)
+        self.use_keyframes = False
+        self.preset: Optional[str] = None
+        self.incremental = False
+        self.warm_start_from: Optional[str] = None  # training di partenza dell'ultimo training incrementale
+        self.warm_start_error: Optional[str] = None  # motivo per cui non è stato possibile riprenderlo
+        self.keyframe_report: Optional[KeyframeReport] = None
+        self.preprocessing = False
+        self.ingest_result: Optional[IngestResult] = None
+        self.preprocessing_error: Optional[str] = None
+        self.pending_training: Optional[tuple[bool, Optional[str], bool]] = None  # (keyframes, preset, incremental)
+        self.live_frames: Optional[int] = None  # frame ricevuti dall'acquisizione live, None se non attiva
+        self.ready_frames: Optional[int] = None  # frame del transforms.json se già aggiornato, altrimenti None
+        self.capture_lock = threading.Lock()
+        self.export_stages: dict[str, str] = {}  # fase dell'export -> queued/running/completed/error/skipped
+
+    def set_phase(self, phase: str, message: str = "") -> None:
+        """Aggiorna la fase del job e la notifica ai client in ascolto."""
+        self.phase = phase
+        self.events.publish("phase", {"job_id": self.job_id, "phase": phase, "message": message})
+
+    def set_training_progress(self, progress: float) -> None:
+        """Aggiorna la percentuale di training notificandola solo se è cambiata."""
+        if progress != self.state.training_progress:
+            self.state.training_progress = progress
+            self.events.publish("progress", {"job_id": self.job_id, "kind": "training", "progress": progress})
+
+    def mesh_folder(self) -> tuple[str, str]:
+        """
+        Cartella della mesh da servire e relativa fase: l'anteprima a nuvola di punti mentre la
+        mesh Poisson dell'export è in coda o in corso, altrimenti la cartella di export.
+        Se la mesh Poisson fallisce l'anteprima non viene più servita come risultato finale.
+        """
+        stages = self.export_stages
+        if stages.get("pointcloud") == "completed" and stages.get("mesh") in ("queued", "running"):
+            return export_preview_folder(self.export_folder), "pointcloud"
+        return self.export_folder, "mesh"
+
+    def report_error(self, kind: str, message: str) -> None:
+        """Notifica un errore di training o export ai client in ascolto."""
+        self.events.publish("error", {"job_id": self.job_id, "kind": kind, "message": message})
+
+    def to_dict(self) -> dict:
+        """Stato del job in formato serializzabile."""
+        return {
+            "job_id": self.job_id,
+            "phase": self.phase,
+            "created_at": self.created_at,
+            "training_progress": self.state.training_progress,
+            "training": asdict(self.training_status),
+            "is_training": self.state.is_training,
+            "is_completed": self.state.is_completed,
+            "is_error": self.state.is_error,
+            "is_exporting": self.state.is_exporting,
+            "export_completed": self.state.export_completed,
+            "keyframes": asdict(self.keyframe_report) if self.keyframe_report else None,
+            "preset": self.preset,
+            "incremental": self.incremental,
+            "warm_start_from": self.warm_start_from,
+            "warm_start_error": self.warm_start_error,
+            "live_frames": self.live_frames,
+            "export_stages": self.export_stages,
+            "preprocessing": {
+                "in_progress": self.preprocessing,
+                "result": asdict(self.ingest_result) if self.ingest_result else None,
+                "error": self.preprocessing_error,
+            }
+        }
+
+class JobScheduler:
+    """
+    Gestisce i job e le code di preprocessing, training ed export. Ogni coda è servita da un numero
+    di thread worker pari al limite di concorrenza configurato: i job in eccesso restano in coda
+    finché un worker non si libera. Il job "default" usa le cartelle storiche (DATA, outputs, exports/mesh)
+    ed è quello usato dalle route quando non viene indicato un job_id.
+    """
+    def __init__(self, max_trainings: int, max_exports: int, max_preprocessing: int = 1):
+        self.jobs: dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self.queues = {"preprocessing": queue.Queue(), "training": queue.Queue(), "export": queue.Queue()}
+        self.limits = {"preprocessing": max_preprocessing, "training": max_trainings, "export": max_exports}
+        self.workers_started = False
+        self.default_job = self._register(Job(
+            DEFAULT_JOB_ID, config.DATA_FOLDER, config.OUTPUT_FOLDER, config.EXPORT_FOLDER
+        ))
+
+    def _register(self, job: Job) -> Job:
+        with self.lock:
+            self.jobs[job.job_id] = job
+        return job
+
+    def create_job(self) -> Job:
+        """Crea un nuovo job con cartelle dedicate sotto Config.JOBS_FOLDER."""
+        job_id = uuid.uuid4().hex[:12]
+        root = os.path.join(config.JOBS_FOLDER, job_id)
+        job = Job(job_id,
+                  os.path.join(root, config.DATA_FOLDER),
+                  os.path.join(root, config.OUTPUT_FOLDER),
+                  os.path.join(root, config.EXPORT_FOLDER))
+        os.makedirs(job.data_folder, exist_ok=True)
+        return self._register(job)
+
+    def restore_job(self, job_id: str, data_folder: str, output_folder: str, export_folder: str) -> Job:
+        """Registra di nuovo un job di una sessione precedente (es. per esportare un suo training)."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job or self._register(Job(job_id, data_folder, output_folder, export_folder))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Restituisce il job con l'id indicato, se esiste."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list[Job]:
+        """Restituisce tutti i job registrati."""
+        with self.lock:
+            return list(self.jobs.values())
+
+    def _ensure_workers(self) -> None:
+        with self.lock:
+            if self.workers_started:
+                return
+            for kind, limit in self.limits.items():
+                for index in range(max(1, limit)):
+                    threading.Thread(target=self._worker, args=(kind,),
+                                     name=f"{kind}-worker-{index}", daemon=True).start()
+            self.workers_started = True
+
+    def _worker(self, kind: str) -> None:
+        while True:
+            job, task = self.queues[kind].get()
+            try:
+                task()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Errore nel job %s (%s): %s", job.job_id, kind, e, exc_info=True)
+            finally:
+                self.queues[kind].task_done()
+
+    def submit_preprocessing(self, job: Job, archive_path: str) -> bool:
+        """
+        Accoda estrazione, ridimensionamento e creazione del transforms.json di un archivio ricevuto.
+
+        Returns:
+            bool: False se il job ha già un preprocessing in corso
+        """
+        with self.lock:
+            if job.preprocessing:
+                return False
+            job.preprocessing = True
+        job.live_frames = None
+        job.ready_frames = None
+        job.ingest_result = None
+        job.preprocessing_error = None
+        job.set_phase("queued_preprocessing")
+        self._ensure_workers()
+        self.queues["preprocessing"].put((job, lambda: self._run_preprocessing(job, archive_path)))
+        return True
+
+    def submit_training(self, job: Job, keyframes: bool = False, preset: Optional[str] = None,
+                        incremental: bool = False) -> None:
+        """
+        Accoda il training del job. Il job risulta in training già mentre è in coda; se il
+        preprocessing dei dati è ancora in corso, il training viene accodato al suo termine.
+        Con incremental il training riprende, se possibile, da un training precedente.
+        """
+        job.use_keyframes = keyframes
+        job.preset = preset
+        job.incremental = incremental
+        job.warm_start_from = None
+        job.warm_start_error = None
+        job.keyframe_report = None
+        state = job.state
+        state.is_training = True
+        job.set_training_progress(0)
+        state.is_completed = False
+        state.is_error = 0
+        job.training_ticket += 1
+        ticket = job.training_ticket
+        with self.lock:
+            if job.preprocessing:
+                job.pending_training = (keyframes, preset, incremental)
+                return
+        job.set_phase("queued_training")
+        self._ensure_workers()
+        self.queues["training"].put((job, lambda: self._run_training(job, ticket)))
+
+    def submit_export(self, job: Job, obb_scale_x: Optional[float], obb_scale_y: Optional[float],
+                      obb_scale_z: Optional[float], preview: bool = False, run_id: Optional[str] = None) -> None:
+        """
+        Accoda l'esportazione della mesh del job (dell'ultimo training o di quello indicato).
+        Senza scale l'OBB è quello calcolato dalle pose delle camere.
+        """
+        job.state.is_exporting = True
+        job.state.export_completed = False
+        job.set_phase("queued_export")
+        self._ensure_workers()
+        self.queues["export"].put(
+            (job, lambda: self._run_export(job, obb_scale_x, obb_scale_y, obb_scale_z, preview, run_id))
+        )
+
+    def _run_preprocessing(self, job: Job, archive_path: str) -> None:
+        job.set_phase("preprocessing")
+        error = None
+        try:
+            os.makedirs(job.data_folder, exist_ok=True)
+            clear_data_folder(job.data_folder)
+            # Estrae e ridimensiona le immagini in un unico passaggio
+            with open(archive_path, "rb") as archive:
+                result = ingest_zip_stream(archive, job.data_folder)
+            logger.info("Job %s: estratte %d immagini dall'archivio (%d dalla cache, %d errori)",
+                        job.job_id, result.images, result.cached, result.errors)
+            if result.images >= 50:
+                # Con meno immagini l'errore viene segnalato all'avvio del training
+                prepare_training_data(job.data_folder)
+                job.ready_frames = result.images
+            job.ingest_result = result
+        except (OSError, ValueError, zlib.error) as e:
+            logger.error("Errore nel preprocessing del job %s: %s", job.job_id, e)
+            error = str(e)
+        finally:
+            try:
+                os.remove(archive_path)
+            except OSError:
+                pass
+
+        with self.lock:
+            job.preprocessing = False
+            pending, job.pending_training = job.pending_training, None
+        if error:
+            job.preprocessing_error = error
+            job.report_error("preprocessing", error)
+            job.set_phase("error")
+            if pending and job.state.is_training:
+                job.state.is_training = False
+                job.state.is_error = 2
+                job.report_error("training", "Preprocessing dei dati fallito")
+            return
+        job.set_phase("uploaded")
+        if pending and job.state.is_training:
+            # Training richiesto durante il preprocessing (e non interrotto nel frattempo)
+            self.submit_training(job, *pending)
+
+    def _run_training(self, job: Job, ticket: int) -> None:
+        state = job.state
+        if not state.is_training or ticket != job.training_ticket:
+            # Training interrotto (o riaccodato) mentre era in coda
+            job.set_phase("stopped")
+            return
+        job.set_phase("training")
+        job.training_log.clear()
+        warm_start = None
+        registered = False
+        try:
+            if job.use_keyframes or job.ready_frames is None:
+                job.ready_frames = None
+                job.keyframe_report = prepare_training_data(job.data_folder, job.use_keyframes)
+            elif job.ready_frames < 50:
+                raise ValueError("Numero insufficiente di immagini per il training (minimo 50 foto)")
+            # Altrimenti il transforms.json è già aggiornato (preprocessing o acquisizione live)
+            if job.keyframe_report:
+                report = job.keyframe_report
+                job.training_log.append(
+                    f"Keyframe: {report.selected}/{report.total} selezionati "
+                    f"({report.blurry} mossi, {report.duplicate} duplicati)"
+                    + (" - selezione ignorata, troppo pochi frame" if report.skipped else "")
+                )
+            with job.capture_lock:
+                scene_bounds = update_scene_bounds(job.data_folder)
+            preset = TRAINING_PRESETS.get(job.preset)
+            run_id = f"{time.strftime('%Y-%m-%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            if job.incremental:
+                try:
+                    warm_start = prepare_warm_start(job, run_id)
+                except WarmStartError as e:
+                    job.warm_start_error = str(e)
+                    job.training_log.append(f"Ripresa dal training {e.base_run_id} fallita ({e}), training completo")
+                else:
+                    if warm_start is not None:
+                        job.warm_start_from = warm_start.base_run_id
+                        job.training_log.append(f"Training incrementale dal training {warm_start.base_run_id} "
+                                                f"({config.WARM_START_ITERATIONS} iterazioni)")
+                    else:
+                        job.training_log.append("Nessun training precedente compatibile, training completo")
+            far_plane = get_far_plane(scene_bounds, warm_start) if scene_bounds and config.SCENE_FAR_PLANE else None
+            # Il training viene registrato prima dell'avvio, così un errore del database non lascia
+            # in esecuzione un ns-train senza monitoraggio
+            run_registry.start_run(run_id, job, warm_start, job.warm_start_error)
+            registered = True
+            state.training_process = launcher.start(
+                get_train_command(job.data_folder, job.output_folder, preset, run_id, warm_start, far_plane)
+            )
+        except (IOError, ValueError, sqlite3.Error) as e:
+            if registered:
+                try:
+                    run_registry.set_status(run_id, "error")
+                except sqlite3.Error:
+                    pass
+            if warm_start is not None:
+                shutil.rmtree(os.path.dirname(warm_start.checkpoint), ignore_errors=True)
+            stage_failures.inc(1, "training")
+            logger.error("Errore nel processo di training: %s", e)
+            message = f"Errore nel processo di training: {e}"
+            job.training_log.append(message)
+            state.is_training = False
+            state.is_error = 1 if NerfstudioOutputParser.INSUFFICIENT_IMAGES in message else 2
+            job.report_error("training", message)
+            job.set_phase("error")
+            return
+        output_queue = state.training_process.output
+        started_at = time.perf_counter()
+
+        parser = NerfstudioOutputParser()
+        job.training_status = parser.status
+        finished = False
+        budget_expired = False
+        budget_deadline = time.time() + preset.time_budget if preset else None
+        error_deadline = None
+        last_update = last_log = 0.0
+        while state.is_training or error_deadline:
+            if error_deadline and time.time() > error_deadline:
+                break
+            if budget_deadline and not error_deadline and time.time() > budget_deadline:
+                # Budget di tempo esaurito: il training si ferma all'ultimo checkpoint salvato
+                logger.info("Training del job %s: budget di %d s esaurito", job.job_id, preset.time_budget)
+                job.training_log.append(f"Budget di tempo esaurito ({preset.time_budget:.0f} s)")
+                budget_expired = True
+                break
+            try:
+                line = output_queue.get(timeout=1)
+            except queue.Empty:
+                if not state.training_process.reader.is_alive() and output_queue.empty():
+                    if not state.is_error:
+                        state.is_training = False
+                        state.is_error = 2
+                        job.report_error("training", "Processo di training terminato senza output")
+                    break
+                continue
+            if line is None:
+                finished = True
+                break
+            line = line.rstrip()
+            job.training_log.append(line)
+            if not state.is_training and error_deadline is None:
+                # Training interrotto dall'utente mentre si attendeva l'output
+                break
+            kind = parser.feed(line)
+            if kind in ("insufficient_images", "error"):
+                if not state.is_error:
+                    logger.error("Training del job %s: %s", job.job_id, line)
+                    state.is_training = False
+                    state.is_error = 1 if kind == "insufficient_images" else 2
+                    job.report_error("training", line)
+                    # Raccoglie nel log il resto del traceback prima di terminare il processo
+                    error_deadline = time.time() + 5
+            elif kind == "progress" and not state.is_error:
+                now = time.time()
+                if now - last_update >= config.PROGRESS_UPDATE_INTERVAL:
+                    job.set_training_progress(parser.status.percent)
+                    last_update = now
+                if now - last_log >= config.PROGRESS_LOG_INTERVAL:
+                    logger.info("Training del job %s: step %d (%.2f%%), ETA %s s", job.job_id,
+                                parser.status.step, parser.status.percent, parser.status.eta_seconds)
+                    last_log = now
+
+        if state.training_process and state.training_process.is_alive():
+            state.training_process.terminate()
+            state.training_process.join()
+        stage_duration.observe(time.perf_counter() - started_at, "warm_start" if warm_start else "training")
+        if warm_start is not None:
+            # Il checkpoint adattato serve solo all'avvio: i nuovi checkpoint sono nella cartella del training
+            shutil.rmtree(os.path.dirname(warm_start.checkpoint), ignore_errors=True)
+
+        run = run_registry.finish_run(run_id, "running")
+        if budget_expired and not (run and run["checkpoints"]):
+            state.is_training = False
+            state.is_error = 2
+            job.report_error("training", "Budget di tempo esaurito prima del primo checkpoint")
+        if (finished or budget_expired) and state.is_error == 0:
+            run_registry.set_status(run_id, "completed")
+            job.set_training_progress(100)
+            state.is_training = False
+            state.is_completed = True
+            job.set_phase("trained", "Budget di tempo esaurito" if budget_expired else "")
+            if budget_expired or (preset and preset.auto_export):
+                # Mesh di anteprima della scena intera, in attesa di un export con i parametri dell'utente
+                self.submit_export(job, None, None, None, preview=True)
+        elif state.is_error:
+            stage_failures.inc(1, "training")
+            run_registry.set_status(run_id, "error")
+            job.set_phase("error")
+        else:
+            run_registry.set_status(run_id, "stopped")
+            job.set_phase("stopped")
+        run_registry.apply_retention(config.RUN_RETENTION_DAYS, config.RUN_RETENTION_MAX_BYTES)
+
+    def _run_export(self, job: Job, obb_scale_x: Optional[float], obb_scale_y: Optional[float],
+                    obb_scale_z: Optional[float], preview: bool = False, run_id: Optional[str] = None) -> None:
+        state = job.state
+        job.set_phase("exporting")
+        started_at = time.time()
+        try:
+            run = run_registry.get_run(run_id) if run_id else run_registry.latest_run(job.output_folder)
+            if run is None or not run["run_dir"]:
+                raise ValueError("Nessuna cartella di output trovata")
+            if obb_scale_x is None:
+                # OBB automatico; senza bordi registrati l'export comprende l'intera scena normalizzata
+                obb = get_export_obb(run) or ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0), config.PREVIEW_EXPORT_OBB_SCALE)
+            else:
+                obb = ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (obb_scale_x, obb_scale_y, obb_scale_z))
+            center, rotation, scale = obb
+            export_command = get_export_command(*scale, job.output_folder, job.export_folder, preview,
+                                                run["run_dir"], center, rotation)
+            cache_key = export_cache_key(export_command)
+            if export_cache.get(cache_key, job.export_folder):
+                # Stesso checkpoint e stessi parametri: l'export è già pronto
+                logger.info("Export del job %s recuperato dalla cache", job.job_id)
+                run_registry.add_export(run["run_id"], export_command[1:], cache_key, True,
+                                        time.time() - started_at)
+                stage_duration.observe(time.time() - started_at, "export_cached")
+                job.export_stages = {"pointcloud": "skipped", "mesh": "completed"}
+                discard_export_preview(job.export_folder)
+                state.is_exporting = False
+                state.export_completed = True
+                job.set_phase("exported", "Export recuperato dalla cache")
+                return
+            # I file della cartella possono essere link alla cache: ns-export deve partire da una cartella nuova
+            shutil.rmtree(job.export_folder, ignore_errors=True)
+            discard_export_preview(job.export_folder)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            stage_failures.inc(1, "export")
+            logger.error("Errore nel processo di esportazione: %s", e)
+            job.report_error("export", str(e))
+            state.is_exporting = False
+            job.set_phase("error")
+            return
+
+        job.export_stages = {}
+        if config.PROGRESSIVE_EXPORT:
+            job.export_stages = {"pointcloud": "running", "mesh": "queued"}
+            self._run_pointcloud_stage(job, run, center, rotation, scale)
+        job.export_stages["mesh"] = "running"
+        try:
+            state.export_process = launcher.start(export_command)
+        except (OSError, ValueError) as e:
+            logger.error("Errore nel processo di esportazione: %s", e)
+            job.report_error("export", str(e))
+            state.export_process = None
+        success = state.export_process is not None and self._wait_export(job, state.export_process)
+
+        if success:
+            # Crea i LOD e prepara subito gli ZIP serviti da /get_mesh
+            try:
+                for folder in [job.export_folder] + build_mesh_lods(job.export_folder):
+                    get_mesh_archive(folder)
+                    get_mesh_glb(folder)
+                export_cache.put(cache_key, job.export_folder)
+                run_registry.add_export(run["run_id"], export_command[1:], cache_key, False,
+                                        time.time() - started_at)
+            except (OSError, ValueError, sqlite3.Error) as e:
+                logger.error("Errore nella preparazione della mesh: %s", e)
+        stage_duration.observe(time.time() - started_at, "export")
+        if not success:
+            stage_failures.inc(1, "export")
+        job.export_stages["mesh"] = "completed" if success else "error"
+        # L'anteprima non serve più: è sostituita dalla mesh oppure l'export è fallito
+        discard_export_preview(job.export_folder)
+        state.is_exporting = False
+        state.export_completed = success
+        job.set_phase("exported" if success else "error")
+        if state.export_process and state.export_process.is_alive():
+            state.export_process.terminate()
+            state.export_process.join()
+
+    def _wait_export(self, job: Job, process: "ManagedProcess") -> bool:
+        """Segue l'output di ns-export fino alla fine del processo; False in caso di errore o timeout."""
+        output_queue = process.output
+        last_update_time = time.time()
+        while job.state.is_exporting:
+            try:
+                current_time = time.time()
+                if current_time - last_update_time > 900:  # 15 minutes timeout
+                    logger.error("Timeout: il processo di esportazione ha superato i 15 minuti senza aggiornamenti")
+                    job.report_error("export", "Timeout dell'esportazione")
+                    return False
+                line = output_queue.get(timeout=1)
+                if line is None:
+                    return True
+                logger.info(line.strip())
+                if NerfstudioOutputParser.is_error(line):
+                    job.report_error("export", line.strip())
+                    return False
+                last_update_time = current_time  # Reset the timer on new output
+            except queue.Empty:
+                pass
+        return False
+
+    def _run_pointcloud_stage(self, job: Job, run: dict, center: tuple[float, ...], rotation: tuple[float, ...],
+                              scale: tuple[float, ...]) -> None:
+        """
+        Prima fase dell'export progressivo: nuvola di punti ridotta (senza Poisson né texture),
+        convertita in una mesh di splat servita da /get_mesh finché la mesh completa non è pronta.
+        """
+        state = job.state
+        started_at = time.time()
+        folder = export_preview_folder(job.export_folder)
+        success = False
+        try:
+            state.export_process = launcher.start(get_pointcloud_command(run["run_dir"], folder, center, rotation, scale))
+            if self._wait_export(job, state.export_process):
+                pointcloud_to_mesh(os.path.join(folder, "point_cloud.ply"), folder)
+                get_mesh_archive(folder)
+                get_mesh_glb(folder)
+                success = True
+        except (OSError, ValueError) as e:
+            logger.error("Errore nell'anteprima dell'export del job %s: %s", job.job_id, e)
+        finally:
+            if state.export_process and state.export_process.is_alive():
+                state.export_process.terminate()
+                state.export_process.join()
+        stage_duration.observe(time.time() - started_at, "export_pointcloud")
+        if success:
+            job.export_stages["pointcloud"] = "completed"
+            job.set_phase("exporting", "Anteprima della nuvola di punti disponibile")
+        else:
+            # L'export prosegue comunque con la mesh completa
+            stage_failures.inc(1, "export_pointcloud")
+            job.export_stages["pointcloud"] = "error"
+            discard_export_preview(job.export_folder)
+
+scheduler = JobScheduler(config.MAX_CONCURRENT_TRAININGS, config.MAX_CONCURRENT_EXPORTS,
+                         config.MAX_CONCURRENT_PREPROCESSING)
 
-# Serve per alleggerire il training, ridimensiona le immagini
-def resize_images(folder_path: str) -> None:
-    """
-    Ridimensiona le immagini nella cartella specificata a risoluzione configurata.
-    
-    Args:
-        folder_path: Percorso della cartella contenente le immagini
-    """
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.lower().endswith(config.SUPPORTED_IMAGE_FORMATS):
-                try:
-                    file_path = os.path.join(root, file)
-                    with Image.open(file_path) as img:
-                        if img.size != config.IMAGE_TARGET_SIZE:
-                            img = img.resize(config.IMAGE_TARGET_SIZE, Image.Resampling.LANCZOS)
-                            img.save(file_path)
-                except (IOError, ValueError) as e:
-                    logger.error("Errore nel processare l'immagine %s: %s", file_path, e)
+def _jobs_by_phase() -> dict[tuple[str, ...], float]:
+    counts: dict[tuple[str, ...], float] = {}
+    for job in scheduler.list_jobs():
+        counts[(job.phase,)] = counts.get((job.phase,), 0) + 1
+    return counts
 
-def load_and_process_data(rgb_dir: str, intrinsics_path: str, extrinsics_path: str):
-    """
-    Carica e processa i dati dalle immagini RGB e dai file di parametri intrinseci ed estrinseci.
-    
-    Args:
-        rgb_dir: Percorso delle immagini RGB
-        intrinsics_path: Percorso del file dei parametri intrinseci
-        extrinsics_path: Percorso del file dei parametri estrinseci
-    
-    Returns:
-        tuple: Tuple contenente paths delle immagini, pose, timestamps e parametri della camera
-    """
-    replace_commas_with_dots(intrinsics_path)
-    replace_commas_with_dots(extrinsics_path)
-    
-    # Trova i paths delle immagini e processa gli indici
-    image_paths = glob.glob(rgb_dir)
-    image_paths = [path.replace(f"{config.DATA_FOLDER}/", "") for path in image_paths]
-    img_idxs = np.array([int(path.split("\\")[-1].split(".")[0]) for path in image_paths], dtype=int) - 1
-    # Carica i parametri intrinseci
-    intrinsic_txt = np.loadtxt(intrinsics_path)
-    W, H = map(int, intrinsic_txt[-2:])
-    fl_x, fl_y = intrinsic_txt[0], intrinsic_txt[4]
-    cx, cy = intrinsic_txt[2], intrinsic_txt[5]
+def _running_processes() -> dict[tuple[str, ...], float]:
+    counts = {("training",): 0, ("export",): 0}
+    for job in scheduler.list_jobs():
+        for kind, process in (("training", job.state.training_process), ("export", job.state.export_process)):
+            if process is not None and process.is_alive():
+                counts[(kind,)] += 1
+    return counts
 
-    # Carica i parametri estrinseci
-    extrinsics = np.loadtxt(extrinsics_path)
-    poses = extrinsics[:, 1:].reshape(-1, 4, 4)[img_idxs]
-    timestamps = extrinsics[:, 0][img_idxs]
+metrics.register(Gauge("holonerf_queue_length", "Job in attesa nelle code di preprocessing, training ed export", ("queue",),
+                       lambda: {(kind,): pending.qsize() for kind, pending in scheduler.queues.items()}))
+metrics.register(Gauge("holonerf_jobs", "Job registrati per fase", ("phase",), _jobs_by_phase))
+metrics.register(Gauge("holonerf_processes_running", "Processi nerfstudio attivi", ("kind",),
+                       _running_processes))
+metrics.register(Gauge("holonerf_cache_bytes", "Spazio occupato dalle cache su disco", ("cache",),
+                       lambda: {(name,): cache.total_bytes
+                                for name, cache in (("frames", frame_cache), ("exports", export_cache))
+                                if cache.entries is not None}))  # indice non ancora caricato
 
-    return image_paths, poses, timestamps, fl_x, fl_y, cx, cy, W, H
+def resolve_job() -> Optional[Job]:
+    """Restituisce il job indicato dal parametro job_id della richiesta, o il job di default."""
+    job_id = request.args.get("job_id") or (request.view_args or {}).get("job_id")
+    if not job_id:
+        return scheduler.default_job
+    return scheduler.get(job_id)
 
-def transform_pose(pose: np.ndarray) -> np.ndarray:
-    """
-    Trasforma una posa da Unity (left-handed, Y-up) a OpenGL (right-handed, Y-up).
-    
-    Args:
-        pose: Matrice di posa 4x4 nel formato Unity
-    
-    Returns:
-        np.ndarray: Matrice di posa 4x4 nel formato OpenGL
-    """
-    # Estrae rotazione e traslazione
-    R = pose[:3, :3]
-    t = pose[:3, 3]
+def job_not_found():
+    """Risposta standard per job inesistente."""
+    return jsonify({"status": "Error", "message": "Job non trovato"}), 404
 
-    # Crea nuova rotazione e traslazione
-    R_new = R.copy()
-    t_new = -t.copy()
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
 
-    # Matrice di riflessione per inversione assi X e Y
-    R_z_reflection = np.array([
-        [-1, 0, 0],
-        [0, -1, 0],
-        [0, 0, 1]
-    ])
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Conta le richieste e ne misura il tempo di risposta per route (per /progress_stream fino all'apertura dello stream)."""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    http_requests.inc(1, route, request.method, str(response.status_code))
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        http_duration.observe(time.perf_counter() - started_at, route)
+    return response
 
-    # Applica la riflessione alla rotazione
-    R_new = np.dot(R, R_z_reflection)
+# Route Flask
+@app.route("/metrics")
+def get_metrics():
+    """Metriche del server (durata delle fasi, contatori di byte e frame, stato di code e processi) per Prometheus."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
 
-    # Ricostruisce la matrice di posa
-    pose_new = np.eye(4)
-    pose_new[:3, :3] = R_new
-    pose_new[:3, 3] = t_new
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Crea un nuovo job con cartelle dati e di output dedicate."""
+    job = scheduler.create_job()
+    return jsonify({"status": "Success", "job_id": job.job_id, "message": "Job creato"}), 201
 
-    return pose_new
+@app.route("/jobs")
+def list_jobs():
+    """Elenca i job registrati e il loro stato."""
+    return jsonify({"status": "Success", "jobs": [job.to_dict() for job in scheduler.list_jobs()]})
 
-def convert_poses(poses: np.ndarray) -> list[np.ndarray]:
-    """
-    Converte un array di pose da Unity a OpenGL.
-    
-    Args:
-        poses: Array di matrici di posa nel formato Unity
-    
-    Returns:
-        list[np.ndarray]: Lista di matrici di posa nel formato OpenGL
-    """
-    return [transform_pose(pose) for pose in poses]
+@app.route("/jobs/<job_id>")
+def get_job(job_id: str):
+    """Restituisce lo stato di un job."""
+    job = scheduler.get(job_id)
+    if job is None:
+        return job_not_found()
+    return jsonify({"status": "Success", "job": job.to_dict()})
 
-def create_transforms_dict(image_paths: list[str], 
-                         converted_poses: list[np.ndarray], 
-                         timestamps: np.ndarray,
-                         fl_x: float, fl_y: float, 
-                         cx: float, cy: float, 
-                         W: int, H: int) -> dict:
+@app.route("/progress_stream")
+def progress_stream():
     """
-    Crea il dizionario per il formato JSON di NerfStudio.
-    
-    Args:
-        image_paths: Lista dei percorsi delle immagini
-        converted_poses: Lista delle pose convertite
-        timestamps: Array dei timestamps
-        fl_x, fl_y: Parametri focali
-        cx, cy: Centro ottico
-        W, H: Dimensioni dell'immagine
-    
-    Returns:
-        dict: Dizionario del transforms.json nel formato NerfStudio
+    Stream Server-Sent Events con l'avanzamento del job: percentuale di training ("progress"),
+    cambi di fase ("phase") ed errori ("error"), inviati appena i thread di monitoraggio li rilevano.
+    Il primo evento ("status") contiene lo stato completo del job. Le route di polling
+    /training_progress ed /export_progress restano disponibili come alternativa.
     """
-    frames = [
-        {
-            "file_path": "images\\{}".format(path.split('\\')[-1]),
-            "transform_matrix": pose.tolist(),
-            "timestamp": timestamp
-        }
-        for path, pose, timestamp in zip(image_paths, converted_poses, timestamps)
-    ]
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    subscriber = job.events.subscribe()
 
-    return {
-        "fl_x": fl_x, "fl_y": fl_y, 
-        "cx": cx, "cy": cy,
-        "w": W, "h": H,
-        "k1": 0.0, "k2": 0.0, 
-        "p1": 0.0, "p2": 0.0,
-        "frames": frames
-    }
+    def generate():
+        try:
+            yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+            while True:
+                try:
+                    event, data = subscriber.get(timeout=15)
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                except queue.Empty:
+                    # Commento SSE per mantenere viva la connessione
+                    yield ": keep-alive\n\n"
+        finally:
+            job.events.unsubscribe(subscriber)
 
-#@retry_operation()
-def create_transforms_json(rgb_dir: str, 
-                         intrinsics_path: str, 
-                         extrinsics_path: str, 
-                         output_path: str) -> None:
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/upload_data", methods=["POST"])
+def upload_data():
     """
-    Crea il file transforms.json combinando tutti i dati processati.
-    
-    Args:
-        rgb_dir: Percorso delle immagini RGB
-        intrinsics_path: Percorso del file dei parametri intrinseci
-        extrinsics_path: Percorso del file dei parametri estrinseci
-        output_path: Percorso di output per il file JSON
+    Gestisce l'upload dei dati tramite file ZIP.
+    Accetta sia un form multipart (campo "file") sia il body grezzo con Content-Type application/zip.
+    L'archivio viene solo salvato su disco: estrazione, ridimensionamento e transforms.json sono
+    eseguiti in background e la route risponde subito 202 con il job_id, da usare con /upload_status.
     """
-    try:
-        # Carica e processa i dati
-        data = load_and_process_data(rgb_dir, intrinsics_path, extrinsics_path)
-        image_paths, poses, timestamps, fl_x, fl_y, cx, cy, W, H = data
-        
-        # Converte le pose e crea il dizionario
-        converted_poses = convert_poses(poses)
-        transforms_dict = create_transforms_dict(
-            image_paths, converted_poses, timestamps,
-            fl_x, fl_y, cx, cy, W, H
-        )
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    if job.state.is_training:
+        return jsonify({"status": "Error", "message": "Training in corso sul job"}), 409
+    if job.preprocessing:
+        return jsonify({"status": "Error", "message": "Preprocessing in corso sul job"}), 409
 
-        # Salva il file JSON
-        json_path = os.path.join(output_path, "transforms.json")
-        with open(json_path, 'w', encoding='utf-8') as outfile:
-            json.dump(transforms_dict, outfile, indent=4)
-        
-        logger.info("Processate %d immagini", len(image_paths))
-    except (IOError, ValueError) as e:
-        logger.error("Errore nella creazione del file transforms.json: %s", e)
-        raise
+    if request.mimetype == "application/zip":
+        stream = request.stream
+    else:
+        if "file" not in request.files:
+            return jsonify({"status": "Error", "message": "Nessun file caricato"}), 400
 
-def create_zip_file(folder_path: str, output_folder: str, zip_name: str) -> str:
-    """
-    Crea un file ZIP del contenuto di una cartella.
-    
-    Args:
-        folder_path: Percorso della cartella da comprimere
-        output_folder: Cartella di destinazione del file ZIP
-        zip_name: Nome del file ZIP
-    
-    Returns:
-        str: Percorso completo del file ZIP creato
-    """
-    zip_file = os.path.join(output_folder, zip_name)
+        file = request.files["file"]
+        if file.filename == "":
+            return jsonify({"status": "Error", "message": "Nessun file selezionato"}), 400
+
+        if not file.filename.endswith(".zip"):
+            return jsonify({"status": "Error", "message": "Il file deve essere in formato ZIP"}), 400
+        stream = file.stream
+    archive_path = os.path.join(config.UPLOAD_SPOOL_FOLDER, f"{job.job_id}-{uuid.uuid4().hex[:8]}.zip")
     try:
-        with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as zip_ref:
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arc_path = os.path.relpath(file_path, folder_path)
-                    zip_ref.write(file_path, arc_path)
-        return zip_file
-    except (subprocess.CalledProcessError, OSError) as e:
-        logger.error("Errore nella creazione del file ZIP: %s", e)
+        os.makedirs(config.UPLOAD_SPOOL_FOLDER, exist_ok=True)
+        with open(archive_path, "wb") as out:
+            shutil.copyfileobj(stream, out, 1 << 20)
+            upload_bytes.inc(out.tell())
+    except OSError as e:
+        logger.error("Errore nell'upload del file: %s", e)
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        return jsonify({"status": "Error", "message": "Errore nell'elaborazione del file"}), 500
+    except Exception:
+        # Upload interrotto dal client: l'archivio parziale non viene elaborato
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
         raise
+    if not scheduler.submit_preprocessing(job, archive_path):
+        os.remove(archive_path)
+        return jsonify({"status": "Error", "message": "Preprocessing in corso sul job"}), 409
+    return jsonify({"status": "Success", "job_id": job.job_id,
+                    "message": "File ricevuto, elaborazione in corso"}), 202
 
-def get_latest_output_folder() -> str:
+@app.route("/upload_status")
+def upload_status():
     """
-    Trova la cartella di output più recente. Questo serve a far parttire l'esportazione dell'ultimo modello NeRF.
-    
-    Returns:
-        str: Percorso della cartella più recente
-    
-    Raises:
-        ValueError: Se non viene trovata nessuna cartella di output
+    Stato del preprocessing dell'ultimo upload: 202 mentre è in coda o in corso, 200 con il numero
+    di immagini elaborate quando i dati sono pronti per il training, 500 in caso di errore.
     """
-    output_folders = glob.glob(f"outputs/{config.DATA_FOLDER}/nerfacto/*")
-    if not output_folders:
-        raise ValueError("Nessuna cartella di output trovata")
-    return max(output_folders, key=os.path.getmtime)
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    if job.preprocessing:
+        return jsonify({"status": "In Progress", "phase": job.phase, "job_id": job.job_id}), 202
+    if job.preprocessing_error:
+        return jsonify({"status": "Error", "message": "Errore nell'elaborazione del file",
+                        "detail": job.preprocessing_error, "job_id": job.job_id}), 500
+    if job.ingest_result is None:
+        return jsonify({"status": "Error", "message": "Nessun upload elaborato"}), 400
+    return jsonify({"status": "Success", "message": "File caricato ed estratto con successo",
+                    "job_id": job.job_id, **asdict(job.ingest_result)})
 
-def get_export_command(obb_scaleX: float, obb_scaleY: float, obb_scaleZ: float) -> str:
-    """
-    Genera il comando per esportare il modello NeRF.
-    
-    Args:
-        obb_scaleX/Y/Z: Fattori di scala per il bounding box
-    
-    Returns:
-        str: Comando di esportazione completo
-    """
-    latest_folder = get_latest_output_folder()
-    return (f"ns-export poisson --load-config {latest_folder}/config.yml "
-            f"--output-dir {config.EXPORT_FOLDER} --target-num-faces 50000 "
-            "--num-pixels-per-side 2048 --num-points 1000000 --remove-outliers True "
-            "--normal-method open3d --obb_center 0.0000000000 0.0000000000 0.0000000000 "
-            "--obb_rotation 0.0000000000 0.0000000000 0.0000000000 "
-            f"--obb_scale {obb_scaleX} {obb_scaleY} {obb_scaleZ}")
+def upload_not_found():
+    """Risposta standard per sessione di upload inesistente o già completata."""
+    return jsonify({"status": "Error", "message": "Upload non trovato"}), 404
 
-#@retry_operation()
-def run_command_in_conda_env(command: str, output_queue: multiprocessing.Queue) -> None:
+@app.route("/uploads", methods=["POST"])
+def create_upload():
     """
-    Esegue un comando nell'ambiente Conda specificato.
-    
-    Args:
-        command: Comando da eseguire
-        output_queue: Coda per l'output del comando
+    Apre un upload riprendibile dell'archivio ZIP. Il body JSON indica la dimensione totale
+    ("size") e, opzionalmente, la dimensione dei blocchi ("chunk_size"). Il client invia poi i
+    blocchi numerati con PUT /uploads/<upload_id>/chunks/<n>, verifica con GET /uploads/<upload_id>
+    quali blocchi mancano e completa con POST /uploads/<upload_id>/commit.
     """
-    activate_cmd = f"call conda activate {config.CONDA_ENV} && "
-    full_command = activate_cmd + command
-
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    body = request.get_json(silent=True) or {}
     try:
-        my_env = os.environ.copy()
-        my_env["PYTHONIOENCODING"] = "utf-8"
-
-        with subprocess.Popen(
-            full_command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True,
-            env=my_env,
-            encoding="utf-8",
-            errors="replace"
-        ) as process:
-            for line in iter(process.stdout.readline, ""):
-                output_queue.put(line)
+        size = int(body["size"])
+        chunk_size = int(body.get("chunk_size") or config.UPLOAD_CHUNK_SIZE)
+    except (KeyError, TypeError, ValueError):
+        size = chunk_size = 0
+    if not 0 < size <= config.UPLOAD_MAX_BYTES or chunk_size <= 0:
+        return jsonify({"status": "Error", "message": "Dimensione dell'upload non valida"}), 400
+    chunk_size = min(max(chunk_size, 64 * 1024), config.UPLOAD_MAX_CHUNK_SIZE)
+    try:
+        session = upload_sessions.create(job.job_id, size, chunk_size)
+    except OSError as e:
+        logger.error("Errore nella creazione dell'upload: %s", e)
+        return jsonify({"status": "Error", "message": "Errore nella creazione dell'upload"}), 500
+    return jsonify({"status": "Success", "message": "Upload creato", **session.to_dict()}), 201
 
-            if process.wait() != 0:
-                raise subprocess.CalledProcessError(process.returncode, command)
-    except (subprocess.CalledProcessError, OSError) as e:
-        output_queue.put(f"Errore: {str(e)}")
-        logger.error("Errore nell'esecuzione del comando: %s", e)
+@app.route("/uploads/<upload_id>")
+def get_upload(upload_id: str):
+    """Byte già ricevuti (intervalli [inizio, fine)) e blocchi ancora mancanti di un upload."""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return upload_not_found()
+    return jsonify({"status": "Success", **session.to_dict()})
 
-def run_training(output_queue: multiprocessing.Queue) -> None:
+@app.route("/uploads/<upload_id>/chunks/<int:index>", methods=["PUT"])
+def put_upload_chunk(upload_id: str, index: int):
     """
-    Esegue il processo di training del modello NeRF.
+    Riceve un blocco dell'upload e lo scrive direttamente al proprio offset nel file. L'header
+    X-Chunk-SHA256 deve contenere l'hash SHA-256 esadecimale del blocco: un blocco corrotto viene
+    rifiutato e resta tra quelli mancanti. Reinviare un blocco già ricevuto lo sovrascrive.
     """
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return upload_not_found()
+    if not 0 <= index < session.num_chunks:
+        return jsonify({"status": "Error", "message": "Indice del blocco non valido"}), 400
+    expected = session.chunk_length(index)
+    parts, remaining = [], expected + 1  # un byte in più per riconoscere i blocchi troppo lunghi
+    while remaining > 0:
+        data = request.stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    data = b"".join(parts)
+    if len(data) != expected:
+        return jsonify({"status": "Error", "message": "Dimensione del blocco non valida"}), 400
+    checksum = request.headers.get("X-Chunk-SHA256", "").strip().lower()
+    if hashlib.sha256(data).hexdigest() != checksum:
+        return jsonify({"status": "Error", "message": "Checksum del blocco non valido"}), 400
     try:
-        # Controlla che ci siano almeno 50 immagini
-        image_files = glob.glob(os.path.join(config.DATA_FOLDER, "images", "*.jpg"))
-        if len(image_files) < 50:
-            raise ValueError("Numero insufficiente di immagini per il training (minimo 50 foto)")
-
-        # Crea il file transforms.json
-        create_transforms_json(
-            rgb_dir=os.path.join(config.DATA_FOLDER, "images", "*.jpg"),
-            intrinsics_path=os.path.join(config.DATA_FOLDER, "intrinsics.txt"),
-            extrinsics_path=os.path.join(config.DATA_FOLDER, "images", "coordinates.txt"),
-            output_path=config.DATA_FOLDER
-        )
-        
-        # Esegue il comando di training
-        run_command_in_conda_env(config.NERFSTUDIO_TRAIN_COMMAND, output_queue)
-        state.training_progress = 100
-    
-    except Exception as e:
-        output_queue.put(f"Errore nel processo di training: {str(e)}")
-        logger.error("Errore nel processo di training: %s", e, exc_info=True)
-    finally:
-        state.is_training = False
-        state.is_completed = True
-        # Svuota la coda
-        while not output_queue.empty():
-            try:
-                output_queue.get_nowait()
-            except queue.Empty:
-                break
-        output_queue.put(None)
-        if state.training_process and state.training_process.is_alive():
-            state.training_process.terminate()
-            state.training_process.join()
+        session.write_chunk(index, data)
+    except OSError as e:
+        logger.error("Errore nella scrittura del blocco %d dell'upload %s: %s", index, upload_id, e)
+        return jsonify({"status": "Error", "message": "Errore nella scrittura del blocco"}), 500
+    upload_bytes.inc(len(data))
+    return jsonify({"status": "Success", "index": index, "received": session.received_ranges()})
 
-# Route Flask
-@app.route("/upload_data", methods=["POST"])
-def upload_data():
-    """Gestisce l'upload dei dati tramite file ZIP."""
-    if "file" not in request.files:
-        return jsonify({"status": "Error", "message": "Nessun file caricato"}), 400
+@app.route("/uploads/<upload_id>/commit", methods=["POST"])
+def commit_upload(upload_id: str):
+    """Completa l'upload e accoda il preprocessing dell'archivio, come /upload_data (202)."""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return upload_not_found()
+    missing = session.missing_chunks()
+    if missing:
+        return jsonify({"status": "Error", "message": "Upload incompleto", "missing_chunks": missing}), 409
+    job = scheduler.get(session.job_id)
+    if job is None:
+        return job_not_found()
+    if job.state.is_training:
+        return jsonify({"status": "Error", "message": "Training in corso sul job"}), 409
+    if job.preprocessing:
+        return jsonify({"status": "Error", "message": "Preprocessing in corso sul job"}), 409
+    if upload_sessions.pop(upload_id) is None:
+        return upload_not_found()
+    if not scheduler.submit_preprocessing(job, session.path):
+        os.remove(session.path)
+        return jsonify({"status": "Error", "message": "Preprocessing in corso sul job"}), 409
+    return jsonify({"status": "Success", "job_id": job.job_id,
+                    "message": "File ricevuto, elaborazione in corso"}), 202
 
-    file = request.files["file"]
-    if file.filename == "":
-        return jsonify({"status": "Error", "message": "Nessun file selezionato"}), 400
+@app.route("/uploads/<upload_id>", methods=["DELETE"])
+def delete_upload(upload_id: str):
+    """Annulla un upload eliminando i blocchi ricevuti."""
+    if upload_sessions.get(upload_id) is None:
+        return upload_not_found()
+    upload_sessions.discard(upload_id)
+    return jsonify({"status": "Success", "message": "Upload annullato"})
 
-    if not file.filename.endswith(".zip"):
-        return jsonify({"status": "Error", "message": "Il file deve essere in formato ZIP"}), 400
-    try:
-        filename = secure_filename(file.filename)
-        temp_zip_path = os.path.join(config.DATA_FOLDER, filename)
-        file.save(temp_zip_path)
+@app.route("/capture", methods=["POST"])
+def start_capture():
+    """
+    Avvia un'acquisizione live: il body è il contenuto di intrinsics.txt. I dati precedenti del
+    job vengono eliminati e i frame inviati poi con /capture/frames vengono elaborati all'arrivo,
+    così il training può partire senza upload né preprocessing.
+    """
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    if job.state.is_training:
+        return jsonify({"status": "Error", "message": "Training in corso sul job"}), 409
+    if job.preprocessing:
+        return jsonify({"status": "Error", "message": "Preprocessing in corso sul job"}), 409
+    with job.capture_lock:
+        job.live_frames = None
+        job.ready_frames = None
+        try:
+            start_live_capture(job.data_folder, request.get_data())
+        except ValueError as e:
+            logger.error("Intrinseci dell'acquisizione live non validi: %s", e)
+            return jsonify({"status": "Error", "message": "Intrinseci non validi"}), 400
+        except OSError as e:
+            logger.error("Errore nell'avvio dell'acquisizione live: %s", e)
+            return jsonify({"status": "Error", "message": "Errore nell'avvio dell'acquisizione"}), 500
+        job.live_frames = job.ready_frames = 0
+    job.set_phase("capturing")
+    return jsonify({"status": "Success", "job_id": job.job_id, "message": "Acquisizione avviata"}), 201
 
-        # Delete previous data except the ZIP file itself
-        for root, _, files in os.walk(config.DATA_FOLDER):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if file_path != temp_zip_path:
-                    os.remove(file_path)
+@app.route("/capture/frames", methods=["POST"])
+def add_capture_frame():
+    """
+    Aggiunge un frame all'acquisizione live: form multipart con il file JPEG ("image", nominato
+    con il numero del frame come 000042.jpg) e la sua riga di coordinates.txt ("pose"). I frame
+    devono arrivare in ordine; un frame già ricevuto viene ignorato, uno successivo a frame
+    mancanti viene rifiutato con 409 e il numero del frame atteso ("expected").
+    """
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    if job.state.is_training:
+        return jsonify({"status": "Error", "message": "Training in corso sul job"}), 409
+    file = request.files.get("image")
+    pose_row = request.form.get("pose", "")
+    if file is None or not pose_row.strip():
+        return jsonify({"status": "Error", "message": "Frame o posa mancanti"}), 400
+    name = frame_name(file.filename or "")
+    try:
+        index = build_frame_index([name])[name]
+    except ValueError:
+        return jsonify({"status": "Error", "message": "Nome immagine non valido"}), 400
+    if not name.lower().endswith(config.SUPPORTED_IMAGE_FORMATS):
+        return jsonify({"status": "Error", "message": "Nome immagine non valido"}), 400
 
-        with zipfile.ZipFile(temp_zip_path, "r") as zip_ref:
-            zip_ref.extractall(config.DATA_FOLDER)
-        os.remove(temp_zip_path)
-        
-        # Ridimensiona le immagini
-        resize_images(os.path.join(config.DATA_FOLDER, "images"))
-        return jsonify({"status": "Success", "message": "File caricato ed estratto con successo"})
-    except (IOError, ValueError) as e:
-        logger.error("Errore nell'upload del file: %s", e)
-        return jsonify({"status": "Error", "message": "Errore nell'elaborazione del file"}), 500
+    with job.capture_lock:
+        if job.live_frames is None:
+            return jsonify({"status": "Error", "message": "Nessuna acquisizione in corso"}), 409
+        if index < job.live_frames:
+            # Reinvio dopo un errore di rete: il frame è già stato elaborato
+            return jsonify({"status": "Success", "message": "Frame già ricevuto", "frames": job.live_frames})
+        if index > job.live_frames:
+            return jsonify({"status": "Error", "message": "Frame mancanti",
+                            "expected": job.live_frames}), 409
+        try:
+            cached = add_live_frame(job.data_folder, name, file.read(), pose_row, index == 0)
+        except ValueError as e:
+            logger.error("Frame %s dell'acquisizione live non valido: %s", name, e)
+            return jsonify({"status": "Error", "message": "Frame non valido", "detail": str(e)}), 400
+        except OSError as e:
+            logger.error("Errore nel salvataggio del frame %s: %s", name, e)
+            return jsonify({"status": "Error", "message": "Errore nel salvataggio del frame"}), 500
+        job.live_frames = job.ready_frames = index + 1
+    frames_ingested.inc(1, "cached" if cached else "resized")
+    return jsonify({"status": "Success", "message": "Frame ricevuto", "frames": index + 1})
 
 @app.route("/start_training")
 def start_training():
-    """Avvia il processo di training."""
-    if not state.is_training:
-        state.is_training = True
-        state.training_progress = 0
-        state.is_completed = False
-        state.is_error = 0
-        manager = multiprocessing.Manager()
-        output_queue = manager.Queue()
-        state.training_process = multiprocessing.Process(
-            target=run_training, 
-            args=(output_queue,)
-        )
-        state.training_process.start()
-
-        def monitor_output():
-            while state.is_training or not state.is_completed or state.is_error == 0:
-                try:
-                    line = output_queue.get(timeout=1)
-                    if line is None:
-                        break
-                    logger.info(line.strip())
-                    if "Numero insufficiente di immagini per il training" in line:
-                        state.is_training = False
-                        state.is_error = 1
-                        break
-                    if "Error" in line:
-                        state.is_training = False
-                        state.is_error = 2
-                        break
-                    if "%" in line and "Loading" not in line:
-                        percentage = line.split("%")[0].split()[-1].strip("(")
-                        try:
-                            state.training_progress = float(percentage)
-                        except ValueError:
-                            pass
-                except queue.Empty:
-                    pass
-            
-            if state.training_process and state.training_process.is_alive():
-                state.training_process.terminate()
-                state.training_process.join()
-
-        threading.Thread(target=monitor_output).start()
-        return jsonify({"status": "Success", "message": "Training avviato"})
-    return jsonify({"status": "Error", "message": "Training già in corso"}), 400
-
-def run_export(output_queue: multiprocessing.Queue, obb_scaleX: float, obb_scaleY: float, obb_scaleZ: float) -> None:
     """
-    Esegue il processo di esportazione del modello.
+    Avvia (o accoda, se sono già attivi altri training) il processo di training.
+    Con keyframes=1 il training usa solo i keyframe (frame nitidi e non duplicati), con preset
+    (preview, standard, quality) si scelgono iterazioni, downscale e budget di tempo. Con
+    incremental=1, se il dataset estende quello di un training precedente, il training riparte
+    dal suo checkpoint con un breve raffinamento invece che da zero.
     """
-    try:
-        export_command = get_export_command(obb_scaleX, obb_scaleY, obb_scaleZ)
-        run_command_in_conda_env(export_command, output_queue)
-    except Exception as e:
-        output_queue.put(f"Errore nel processo di esportazione: {str(e)}")
-        logger.error("Errore nel processo di esportazione: %s", e)
-    finally:
-        output_queue.put(None)
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    preset = request.args.get("preset")
+    if preset is not None and preset not in TRAINING_PRESETS:
+        return jsonify({"status": "Error", "message": "Preset di training non valido"}), 400
+    if not job.state.is_training:
+        scheduler.submit_training(job, keyframes=request.args.get("keyframes", "0") in ("1", "true"),
+                                  preset=preset,
+                                  incremental=request.args.get("incremental", "0") in ("1", "true"))
+        return jsonify({"status": "Success", "message": "Training avviato", "job_id": job.job_id})
+    return jsonify({"status": "Error", "message": "Training già in corso"}), 400
 
-@app.route("/start_export", methods=["POST"])
-def start_export():
-    """Avvia il processo di esportazione."""
-    if state.is_exporting:
-        return jsonify({"status": "Error", "message": "Esportazione già in corso"}), 401
+def parse_export_scale():
+    """
+    Legge le scale dell'OBB (x, y, z) dal body JSON della richiesta. Se il body è vuoto o non
+    contiene nessuna scala le scale sono None, e l'export usa l'OBB calcolato dalle pose.
 
+    Returns:
+        tuple: Scale lette e None, oppure None e la risposta di errore
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() if request.get_data() else {}
         obb_scale_x = data.get("x")
         obb_scale_y = data.get("y")
         obb_scale_z = data.get("z")
         
+        if all(x is None for x in [obb_scale_x, obb_scale_y, obb_scale_z]):
+            return (None, None, None), None
         if any(x is None for x in [obb_scale_x, obb_scale_y, obb_scale_z]):
-            return jsonify({"status": "Error", "message": "Parametri di scala mancanti"}), 404
+            return None, (jsonify({"status": "Error", "message": "Parametri di scala mancanti"}), 404)
         else: 
             if obb_scale_x <= 0 or obb_scale_y <= 0 or obb_scale_z <= 0:
-                return jsonify({"status": "Error", "message": "Parametri non validi (devono essere > 0)"}), 404
+                return None, (jsonify({"status": "Error", "message": "Parametri non validi (devono essere > 0)"}), 404)
 
-    except (ValueError, TypeError):
-        return jsonify({"status": "Error", "message": "Parametri di scala non validi"}), 404
+    except (ValueError, TypeError, AttributeError):
+        return None, (jsonify({"status": "Error", "message": "Parametri di scala non validi"}), 404)
+    return (obb_scale_x, obb_scale_y, obb_scale_z), None
 
-    state.is_exporting = True
-    state.export_completed = False
-    output_queue = multiprocessing.Queue()
-    state.export_process = multiprocessing.Process(
-        target=run_export, 
-        args=(output_queue, obb_scale_x, obb_scale_y, obb_scale_z)
-    )
-    state.export_process.start()
-    def monitor_export():
-        success = False
-        last_update_time = time.time()
-        while state.is_exporting:
-            try:
-                current_time = time.time()
-                if current_time - last_update_time > 900:  # 15 minutes timeout
-                    logger.error("Timeout: il processo di esportazione ha superato i 15 minuti senza aggiornamenti")
-                    break
-                line = output_queue.get(timeout=1)
-                if line is None:
-                    success = True
-                    break
-                logger.info(line.strip())
-                if "Error" in line:
-                    break
-                last_update_time = current_time  # Reset the timer on new output
-            except queue.Empty:
-                pass
-        
-        state.is_exporting = False
-        state.export_completed = success
-        if state.export_process and state.export_process.is_alive():
-            state.export_process.terminate()
-            state.export_process.join()
+@app.route("/start_export", methods=["POST"])
+def start_export():
+    """
+    Avvia (o accoda) il processo di esportazione. Senza scale nel body l'OBB è quello
+    calcolato dalle pose delle camere (centro, rotazione e dimensioni della scena).
+    """
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    if job.state.is_exporting:
+        return jsonify({"status": "Error", "message": "Esportazione già in corso"}), 401
+
+    scale, error = parse_export_scale()
+    if error:
+        return error
 
-    threading.Thread(target=monitor_export).start()
-    return jsonify({"status": "Success", "message": "Esportazione avviata"})
+    scheduler.submit_export(job, *scale)
+    return jsonify({"status": "Success", "message": "Esportazione avviata", "job_id": job.job_id})
+
+@app.route("/runs")
+def list_runs():
+    """Elenca i training registrati (filtrabili con job_id) con checkpoint, durata ed export."""
+    return jsonify({"status": "Success", "runs": run_registry.list_runs(request.args.get("job_id"))})
+
+@app.route("/runs/<run_id>")
+def get_run(run_id: str):
+    """Restituisce un training registrato."""
+    run = run_registry.get_run(run_id)
+    if run is None:
+        return jsonify({"status": "Error", "message": "Training non trovato"}), 404
+    return jsonify({"status": "Success", "run": run})
+
+@app.route("/runs/<run_id>/export", methods=["POST"])
+def export_run(run_id: str):
+    """Avvia (o accoda) l'esportazione di un training specifico, anche non recente."""
+    run = run_registry.get_run(run_id)
+    if run is None:
+        return jsonify({"status": "Error", "message": "Training non trovato"}), 404
+    if not run["checkpoints"]:
+        return jsonify({"status": "Error", "message": "Il training non ha checkpoint"}), 409
+    job = scheduler.restore_job(run["job_id"], run["data_folder"], run["output_folder"], run["export_folder"])
+    if job.state.is_exporting:
+        return jsonify({"status": "Error", "message": "Esportazione già in corso"}), 401
+
+    scale, error = parse_export_scale()
+    if error:
+        return error
+
+    scheduler.submit_export(job, *scale, run_id=run_id)
+    return jsonify({"status": "Success", "message": "Esportazione avviata", "job_id": job.job_id,
+                    "run_id": run_id})
 
 @app.route("/export_progress")
 def get_export_progress():
-    """Controlla lo stato dell'esportazione."""
+    """
+    Controlla lo stato dell'esportazione. Durante l'export il campo stages riporta lo stato
+    delle due fasi (pointcloud: anteprima, mesh: mesh Poisson).
+    """
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    state = job.state
     if state.export_completed:
         return jsonify({"status": "Success", "message": "Esportazione completata"}), 204
     elif state.is_exporting:
-        return jsonify({"status": "In Progress", "message": "Esportazione in corso"})
+        preview_ready = job.export_stages.get("pointcloud") == "completed"
+        return jsonify({"status": "In Progress",
+                        "message": "Anteprima disponibile" if preview_ready else "Esportazione in corso",
+                        "stages": job.export_stages})
     else:
         return jsonify({"status": "Error", "message": "Nessuna esportazione in corso"}), 400
 
 @app.route("/stop_training")
 def stop_training():
-    """Interrompe il processo di training."""
+    """Interrompe il processo di training (o lo rimuove dalla coda)."""
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    state = job.state
     if state.is_training or state.training_process:
         state.is_training = False
         state.is_completed = False
@@ -585,6 +4105,10 @@ def stop_training():
 @app.route("/training_progress")
 def get_training_progress():
     """Controlla lo stato del training."""
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    state = job.state
     if state.is_error == 1:
         state.is_training = False
         return jsonify({"status": "Error", "message": "Numero di immagini insufficienti (<50)"}), 400
@@ -602,13 +4126,58 @@ def get_training_progress():
         return jsonify({"status": "Error", "message": "Nessun training in corso"}), 400
     return jsonify({"status": "In Progress", "progress": state.training_progress})
 
+@app.route("/training_log")
+def get_training_log():
+    """Restituisce le ultime righe di output di ns-train (parametro tail, default 50) e lo stato estratto."""
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
+    try:
+        tail = int(request.args.get("tail", 50))
+    except ValueError:
+        return jsonify({"status": "Error", "message": "Parametro tail non valido"}), 400
+    lines = list(job.training_log)
+    lines = lines[-tail:] if tail > 0 else []
+    return jsonify({"status": "Success", "training": asdict(job.training_status), "lines": lines})
+
 @app.route("/get_mesh")
 def get_mesh():
-    """Scarica il modello 3D esportato."""
+    """
+    Scarica il modello 3D esportato. Lo ZIP viene creato una sola volta per export; le richieste
+    supportano ETag/If-None-Match (304) e Range (206) per riprendere i download interrotti.
+    Il parametro lod (0 = mesh completa, default) seleziona una versione semplificata, il
+    parametro format (zip, default, o glb) il formato: GLB è un unico file binario con la
+    texture incorporata, più piccolo e veloce da caricare sul client. Durante un export
+    progressivo, finché la mesh non è pronta, viene servita l'anteprima a nuvola di punti (per
+    ogni lod); l'header X-Export-Stage indica quale delle due è stata restituita. Se la mesh
+    Poisson fallisce la route risponde 404 invece di continuare a servire l'anteprima.
+    """
+    job = resolve_job()
+    if job is None:
+        return job_not_found()
     try:
-        file_path = create_zip_file(config.EXPORT_FOLDER, config.DATA_FOLDER, "mesh.zip")
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True), 200
+        level = int(request.args.get("lod", 0))
+    except ValueError:
+        level = -1
+    if not 0 <= level <= len(config.MESH_LOD_FACES):
+        return jsonify({"status": "Error", "message": "Livello di dettaglio non valido"}), 400
+    mesh_format = request.args.get("format", "zip").lower()
+    if mesh_format not in MESH_FORMATS:
+        return jsonify({"status": "Error", "message": "Formato mesh non supportato"}), 400
+    get_artifact, download_name, mimetype = MESH_FORMATS[mesh_format]
+    if job.export_stages.get("mesh") == "error":
+        return jsonify({"status": "Error", "message": "Esportazione della mesh fallita"}), 404
+    folder, stage = job.mesh_folder()
+    try:
+        artifact = get_artifact(lod_folder(folder, level) if stage == "mesh" else folder)
+        if artifact is not None:
+            file_path, etag = artifact
+            response = send_file(file_path, as_attachment=True, download_name=download_name,
+                                 mimetype=mimetype, etag=etag, conditional=True, max_age=0)
+            response.headers["X-Export-Stage"] = stage
+            if response.status_code in (200, 206):
+                mesh_bytes_served.inc(response.content_length or 0, mesh_format)
+            return response
         else:
             return jsonify({"status": "Error", "message": "File mesh non trovato"}), 404
     except (OSError, ValueError) as e:
@@ -627,9 +4196,21 @@ if __name__ == "__main__":
             sys.stdout = stdout
             sys.stderr = stderr
 
-    # Inizializza il multiprocessing
+    # Inizializza il multiprocessing (pool di ridimensionamento)
     multiprocessing.set_start_method("spawn", force=True)
 
+    # Risolve una sola volta l'ambiente Conda di nerfstudio
+    launcher.resolve()
+
+    # Registra i training precedenti al registro e applica la politica di conservazione
+    run_registry.import_existing(scheduler.default_job)
+    run_registry.apply_retention(config.RUN_RETENTION_DAYS, config.RUN_RETENTION_MAX_BYTES)
+
+    # Elimina gli upload rimasti da esecuzioni precedenti (le sessioni sono solo in memoria) e
+    # ripete periodicamente la pulizia per le sessioni abbandonate
+    upload_sessions.sweep(0)
+    upload_sessions.start_sweeper(config.UPLOAD_SWEEP_INTERVAL, preprocessing_in_use)
+
     # Avvia il server
     app.run(debug=False, host="0.0.0.0", port=5000)
     
\ No newline at end of file
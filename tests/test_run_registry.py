@@ -0,0 +1,46 @@
+"""Test della politica di ritenzione del registro dei training."""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serverHoloNerf as server  # noqa: E402
+
+
+def make_run(registry: server.RunRegistry, job: SimpleNamespace, run_id: str, status: str,
+             checkpoint: bool) -> None:
+    """Registra un training simulando la cartella che ns-train crea in outputs."""
+    registry.start_run(run_id, job)
+    run_dir = os.path.join(job.output_folder, "DATA", "nerfacto", run_id)
+    os.makedirs(os.path.join(run_dir, "nerfstudio_models"))
+    with open(os.path.join(run_dir, "config.yml"), "w", encoding="utf-8") as file:
+        file.write("method_name: nerfacto\n")
+    if checkpoint:
+        with open(os.path.join(run_dir, "nerfstudio_models", "step-000001000.ckpt"), "wb") as file:
+            file.write(b"\0" * 1024)
+    registry.finish_run(run_id, status)
+
+
+@pytest.fixture
+def job(tmp_path):
+    return SimpleNamespace(job_id="job", data_folder=str(tmp_path / "DATA"), output_folder=str(tmp_path / "outputs"),
+                           export_folder=str(tmp_path / "exports" / "mesh"), preset=None)
+
+
+@pytest.mark.parametrize("max_age_days, max_bytes", [(0, None), (None, 0)])
+def test_retention_keeps_latest_run_with_checkpoints(tmp_path, job, max_age_days, max_bytes):
+    registry = server.RunRegistry(str(tmp_path / "runs.db"))
+    make_run(registry, job, "older", "completed", checkpoint=True)
+    make_run(registry, job, "old", "completed", checkpoint=True)
+    make_run(registry, job, "failed", "error", checkpoint=False)
+
+    evicted = registry.apply_retention(max_age_days, max_bytes)
+
+    assert "old" not in evicted
+    assert "older" in evicted
+    assert registry.latest_run(job.output_folder)["run_id"] == "old"
+    assert os.path.isdir(registry.get_run("old")["run_dir"])